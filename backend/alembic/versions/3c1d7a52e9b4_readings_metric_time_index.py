@@ -0,0 +1,34 @@
+"""Add (metric_id, reading_time DESC) index for latest-reading lookups.
+
+Revision ID: 3c1d7a52e9b4
+Revises: fbe21847efec
+Create Date: 2026-10-18 09:12:04.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c1d7a52e9b4"
+down_revision: Union[str, Sequence[str], None] = "fbe21847efec"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 新库由 init 迁移按 ORM 元数据建表时已带上该索引，这里需幂等
+    op.create_index(
+        "ix_readings_metric_time_desc",
+        "sensor_readings",
+        ["metric_id", sa.text("reading_time DESC")],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_readings_metric_time_desc", table_name="sensor_readings", if_exists=True)
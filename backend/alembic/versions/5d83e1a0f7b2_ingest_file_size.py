@@ -0,0 +1,38 @@
+"""Record file size on ingest_files for the stat-based import pre-check.
+
+Revision ID: 5d83e1a0f7b2
+Revises: a92f4e6b0c13
+Create Date: 2026-10-18 14:02:37.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d83e1a0f7b2"
+down_revision: Union[str, Sequence[str], None] = "a92f4e6b0c13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(bind, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in sa.inspect(bind).get_columns(table))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if not _has_column(bind, "ingest_files", "file_size"):
+        op.add_column("ingest_files", sa.Column("file_size", sa.BigInteger()))
+    op.create_index("ix_ingest_files_path", "ingest_files", ["path"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_ingest_files_path", table_name="ingest_files", if_exists=True)
+    bind = op.get_bind()
+    if _has_column(bind, "ingest_files", "file_size"):
+        op.drop_column("ingest_files", "file_size")
@@ -0,0 +1,52 @@
+"""Add sensor_latest_values projection (one row per metric) and backfill it.
+
+Revision ID: 7e4b09c2d1f6
+Revises: 3c1d7a52e9b4
+Create Date: 2026-10-18 10:03:41.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7e4b09c2d1f6"
+down_revision: Union[str, Sequence[str], None] = "3c1d7a52e9b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("sensor_latest_values"):
+        op.create_table(
+            "sensor_latest_values",
+            sa.Column("metric_id", sa.Integer(), sa.ForeignKey("sensor_metrics.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("sensor_id", sa.Integer(), sa.ForeignKey("sensors.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("reading_time", sa.DateTime(), nullable=False),
+            sa.Column("value_num", sa.Float()),
+            sa.Column("value_text", sa.Text()),
+            sa.Column("unit", sa.String(50)),
+            sa.Column("source_file_id", sa.Integer(), sa.ForeignKey("ingest_files.id", ondelete="SET NULL")),
+            sa.Column("is_simulated", sa.Boolean()),
+            sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        )
+    op.execute("DELETE FROM sensor_latest_values")
+    op.execute(
+        """
+        INSERT INTO sensor_latest_values
+            (metric_id, sensor_id, reading_time, value_num, value_text, unit, source_file_id, is_simulated, updated_at)
+        SELECT DISTINCT ON (metric_id)
+            metric_id, sensor_id, reading_time, value_num, value_text, unit, source_file_id, is_simulated, now()
+        FROM sensor_readings
+        ORDER BY metric_id, reading_time DESC
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("sensor_latest_values", if_exists=True)
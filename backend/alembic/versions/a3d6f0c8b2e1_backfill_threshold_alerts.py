@@ -0,0 +1,55 @@
+"""Backfill active warn_low/warn_high alerts from the latest values.
+
+/api/warnings reads active alerts instead of comparing the latest values
+with warn_low/warn_high on every request. Alerts are only raised for
+readings written after f52d8b0e7a19, so without a backfill every existing
+threshold breach would disappear until scripts.evaluate_alerts is run.
+This inserts one active implicit-rule alert per metric whose latest value
+is outside its thresholds (the same rows AlertEvaluator would keep).
+Existing active alerts are left as they are. Downgrade keeps the alerts.
+
+Revision ID: a3d6f0c8b2e1
+Revises: f52d8b0e7a19
+Create Date: 2026-10-18 21:12:05.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3d6f0c8b2e1"
+down_revision: Union[str, Sequence[str], None] = "f52d8b0e7a19"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        INSERT INTO alerts
+            (sensor_id, metric_id, reading_time, rule_id, alert_level, alert_type, message,
+             value, threshold, status, is_simulated)
+        SELECT lv.sensor_id, lv.metric_id, lv.reading_time, NULL, 'warning', b.alert_type,
+               s.point_code || ' ' || coalesce(m.name_cn, m.metric_key) || b.label || lv.value_num::text
+                   || coalesce(m.unit, ''),
+               lv.value_num, b.threshold, 'active', coalesce(s.is_simulated, false)
+        FROM sensor_latest_values lv
+        JOIN sensor_metrics m ON m.id = lv.metric_id
+        JOIN sensors s ON s.id = lv.sensor_id
+        CROSS JOIN LATERAL (
+            VALUES ('warn_high', m.warn_high, ' 超限: ', lv.value_num > m.warn_high),
+                   ('warn_low', m.warn_low, ' 低于下限: ', lv.value_num < m.warn_low)
+        ) AS b(alert_type, threshold, label, hit)
+        WHERE lv.value_num IS NOT NULL AND b.hit
+        ON CONFLICT (metric_id, alert_type, (coalesce(rule_id, 0))) WHERE status = 'active' DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 数据迁移：回填的告警与评估产生的告警无法区分，保留
+    pass
@@ -0,0 +1,71 @@
+"""Move per-reading raw_values JSON into source_rows (one row per Excel row).
+
+Readings reference their source row by (source_file_id, reading_time), so
+the JSON that used to be copied onto every metric of an Excel row is
+stored once. Run ``VACUUM FULL sensor_readings`` afterwards to give the
+freed space back to the OS.
+
+Revision ID: a92f4e6b0c13
+Revises: 7e4b09c2d1f6
+Create Date: 2026-10-18 13:26:10.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a92f4e6b0c13"
+down_revision: Union[str, Sequence[str], None] = "7e4b09c2d1f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(bind, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in sa.inspect(bind).get_columns(table))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("source_rows"):
+        op.create_table(
+            "source_rows",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column(
+                "ingest_file_id", sa.Integer(), sa.ForeignKey("ingest_files.id", ondelete="CASCADE"), nullable=False
+            ),
+            sa.Column("reading_time", sa.DateTime(), nullable=False),
+            sa.Column("raw_values", sa.JSON()),
+            sa.UniqueConstraint("ingest_file_id", "reading_time", name="uq_source_rows_file_time"),
+        )
+    if _has_column(bind, "sensor_readings", "raw_values"):
+        op.execute(
+            """
+            INSERT INTO source_rows (ingest_file_id, reading_time, raw_values)
+            SELECT DISTINCT ON (source_file_id, reading_time) source_file_id, reading_time, raw_values
+            FROM sensor_readings
+            WHERE source_file_id IS NOT NULL AND raw_values IS NOT NULL
+            ORDER BY source_file_id, reading_time, id
+            ON CONFLICT (ingest_file_id, reading_time) DO NOTHING
+            """
+        )
+        op.drop_column("sensor_readings", "raw_values")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if not _has_column(bind, "sensor_readings", "raw_values"):
+        op.add_column("sensor_readings", sa.Column("raw_values", sa.JSON()))
+    op.execute(
+        """
+        UPDATE sensor_readings r
+        SET raw_values = s.raw_values
+        FROM source_rows s
+        WHERE s.ingest_file_id = r.source_file_id AND s.reading_time = r.reading_time
+        """
+    )
+    op.drop_table("source_rows", if_exists=True)
@@ -0,0 +1,51 @@
+"""Add the incremental-import watermark to ingest_files.
+
+last_reading_time is backfilled from source_rows; data_rows stays NULL for
+existing files until their next import (the time watermark alone is enough
+to skip already-imported rows).
+
+Revision ID: b6f2c94d1e38
+Revises: 5d83e1a0f7b2
+Create Date: 2026-10-18 14:41:09.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b6f2c94d1e38"
+down_revision: Union[str, Sequence[str], None] = "5d83e1a0f7b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(bind, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in sa.inspect(bind).get_columns(table))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if not _has_column(bind, "ingest_files", "last_reading_time"):
+        op.add_column("ingest_files", sa.Column("last_reading_time", sa.DateTime()))
+    if not _has_column(bind, "ingest_files", "data_rows"):
+        op.add_column("ingest_files", sa.Column("data_rows", sa.Integer()))
+    op.execute(
+        """
+        UPDATE ingest_files f
+        SET last_reading_time = s.max_time
+        FROM (SELECT ingest_file_id, max(reading_time) AS max_time FROM source_rows GROUP BY ingest_file_id) s
+        WHERE s.ingest_file_id = f.id AND f.last_reading_time IS NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    for column in ("data_rows", "last_reading_time"):
+        if _has_column(bind, "ingest_files", column):
+            op.drop_column("ingest_files", column)
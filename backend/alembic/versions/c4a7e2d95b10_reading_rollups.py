@@ -0,0 +1,67 @@
+"""Add hourly/daily reading rollups (sensor_readings_1h / sensor_readings_1d) and backfill them.
+
+Revision ID: c4a7e2d95b10
+Revises: b6f2c94d1e38
+Create Date: 2026-10-18 15:27:52.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a7e2d95b10"
+down_revision: Union[str, Sequence[str], None] = "b6f2c94d1e38"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ROLLUP_TABLES = ("sensor_readings_1h", "sensor_readings_1d")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    for table in ROLLUP_TABLES:
+        if not sa.inspect(bind).has_table(table):
+            op.create_table(
+                table,
+                sa.Column(
+                    "metric_id", sa.Integer(), sa.ForeignKey("sensor_metrics.id", ondelete="CASCADE"), primary_key=True
+                ),
+                sa.Column("bucket_start", sa.DateTime(), primary_key=True),
+                sa.Column("count", sa.Integer(), nullable=False),
+                sa.Column("min", sa.Float()),
+                sa.Column("max", sa.Float()),
+                sa.Column("sum", sa.Float()),
+                sa.Column("last_value", sa.Float()),
+                sa.Column("last_time", sa.DateTime(), nullable=False),
+            )
+        op.execute(f"DELETE FROM {table}")
+    op.execute(
+        """
+        INSERT INTO sensor_readings_1h (metric_id, bucket_start, count, min, max, sum, last_value, last_time)
+        SELECT metric_id, date_trunc('hour', reading_time), count(*), min(value_num), max(value_num),
+               sum(value_num), (array_agg(value_num ORDER BY reading_time DESC))[1], max(reading_time)
+        FROM sensor_readings
+        WHERE value_num IS NOT NULL
+        GROUP BY 1, 2
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO sensor_readings_1d (metric_id, bucket_start, count, min, max, sum, last_value, last_time)
+        SELECT metric_id, date_trunc('day', bucket_start), sum(count), min(min), max(max),
+               sum(sum), (array_agg(last_value ORDER BY last_time DESC))[1], max(last_time)
+        FROM sensor_readings_1h
+        GROUP BY 1, 2
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(ROLLUP_TABLES):
+        op.drop_table(table, if_exists=True)
@@ -0,0 +1,143 @@
+"""Convert sensor_readings to monthly RANGE partitions on reading_time.
+
+Existing heap tables are renamed to sensor_readings_legacy, a partitioned
+parent is created with a composite (id, reading_time) primary key, monthly
+partitions covering the existing data (plus a few months ahead) and a
+DEFAULT partition are attached, rows are copied over and the legacy table
+is dropped. Indexes and the unique constraint are declared on the parent so
+every partition gets its own copy. Databases created from the current ORM
+metadata are already partitioned; only the partitions are ensured.
+
+Revision ID: d81b5f3a6c27
+Revises: c4a7e2d95b10
+Create Date: 2026-10-18 16:14:30.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.partitions import add_months, create_default_partition_sql, create_partition_sql, month_start
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d81b5f3a6c27"
+down_revision: Union[str, Sequence[str], None] = "c4a7e2d95b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONTHS_AHEAD = 3
+
+
+def _relkind(bind, table: str):
+    return bind.execute(sa.text("SELECT relkind FROM pg_class WHERE relname = :t").bindparams(t=table)).scalar()
+
+
+def _ensure_monthly_partitions(bind, first: date, last: date) -> None:
+    month = first
+    while month <= last:
+        # default 分区里已有该月数据时不能直接建分区，留给 scripts.manage_partitions ensure 搬迁后挂载
+        in_default = bind.execute(
+            sa.text(
+                "SELECT EXISTS (SELECT 1 FROM sensor_readings_default WHERE reading_time >= :lo AND reading_time < :hi)"
+            ).bindparams(lo=month, hi=add_months(month, 1))
+        ).scalar()
+        if not in_default:
+            op.execute(create_partition_sql(month))
+        month = add_months(month, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    this_month = month_start(date.today())
+    if _relkind(bind, "sensor_readings") == "p":
+        op.execute(create_default_partition_sql())
+        _ensure_monthly_partitions(bind, this_month, add_months(this_month, MONTHS_AHEAD))
+        return
+
+    op.execute("ALTER TABLE sensor_readings RENAME TO sensor_readings_legacy")
+    op.execute("ALTER TABLE sensor_readings_legacy RENAME CONSTRAINT sensor_readings_pkey TO sensor_readings_legacy_pkey")
+    op.execute(
+        "ALTER TABLE sensor_readings_legacy RENAME CONSTRAINT uq_readings_metric_time_file TO uq_readings_legacy_file"
+    )
+    op.execute("ALTER INDEX IF EXISTS ix_readings_metric_time_desc RENAME TO ix_readings_legacy_metric_time")
+    op.execute(
+        """
+        CREATE TABLE sensor_readings (
+            id integer NOT NULL DEFAULT nextval('sensor_readings_id_seq'),
+            sensor_id integer NOT NULL REFERENCES sensors (id),
+            metric_id integer NOT NULL REFERENCES sensor_metrics (id),
+            reading_time timestamp without time zone NOT NULL,
+            value_num double precision,
+            value_text text,
+            unit varchar(50),
+            quality_flag varchar(20) NOT NULL,
+            remark text,
+            source_file_id integer REFERENCES ingest_files (id),
+            is_simulated boolean NOT NULL,
+            CONSTRAINT sensor_readings_pkey PRIMARY KEY (id, reading_time),
+            CONSTRAINT uq_readings_metric_time_file UNIQUE (metric_id, reading_time, source_file_id)
+        ) PARTITION BY RANGE (reading_time)
+        """
+    )
+    op.execute("ALTER SEQUENCE sensor_readings_id_seq OWNED BY sensor_readings.id")
+    op.execute("CREATE INDEX ix_readings_metric_time_desc ON sensor_readings (metric_id, reading_time DESC)")
+    op.execute(create_default_partition_sql())
+
+    bounds = bind.execute(sa.text("SELECT min(reading_time), max(reading_time) FROM sensor_readings_legacy")).one()
+    first = month_start(bounds[0]) if bounds[0] else this_month
+    last = max(month_start(bounds[1]) if bounds[1] else this_month, this_month)
+    _ensure_monthly_partitions(bind, min(first, this_month), add_months(last, MONTHS_AHEAD))
+
+    op.execute(
+        """
+        INSERT INTO sensor_readings
+            (id, sensor_id, metric_id, reading_time, value_num, value_text, unit, quality_flag, remark,
+             source_file_id, is_simulated)
+        SELECT id, sensor_id, metric_id, reading_time, value_num, value_text, unit, quality_flag, remark,
+               source_file_id, is_simulated
+        FROM sensor_readings_legacy
+        """
+    )
+    op.execute("DROP TABLE sensor_readings_legacy")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if _relkind(bind, "sensor_readings") != "p":
+        return
+    op.execute("ALTER TABLE sensor_readings RENAME TO sensor_readings_partitioned")
+    op.execute(
+        "ALTER TABLE sensor_readings_partitioned RENAME CONSTRAINT sensor_readings_pkey TO sensor_readings_partitioned_pkey"
+    )
+    op.execute(
+        "ALTER TABLE sensor_readings_partitioned RENAME CONSTRAINT uq_readings_metric_time_file TO uq_readings_partitioned_file"
+    )
+    op.execute("ALTER INDEX ix_readings_metric_time_desc RENAME TO ix_readings_partitioned_metric_time")
+    op.execute(
+        """
+        CREATE TABLE sensor_readings (
+            id integer NOT NULL DEFAULT nextval('sensor_readings_id_seq') PRIMARY KEY,
+            sensor_id integer NOT NULL REFERENCES sensors (id),
+            metric_id integer NOT NULL REFERENCES sensor_metrics (id),
+            reading_time timestamp without time zone NOT NULL,
+            value_num double precision,
+            value_text text,
+            unit varchar(50),
+            quality_flag varchar(20) NOT NULL,
+            remark text,
+            source_file_id integer REFERENCES ingest_files (id),
+            is_simulated boolean NOT NULL,
+            CONSTRAINT uq_readings_metric_time_file UNIQUE (metric_id, reading_time, source_file_id)
+        )
+        """
+    )
+    op.execute("ALTER SEQUENCE sensor_readings_id_seq OWNED BY sensor_readings.id")
+    op.execute("CREATE INDEX ix_readings_metric_time_desc ON sensor_readings (metric_id, reading_time DESC)")
+    op.execute("INSERT INTO sensor_readings SELECT * FROM sensor_readings_partitioned")
+    op.execute("DROP TABLE sensor_readings_partitioned CASCADE")
@@ -0,0 +1,53 @@
+"""Add secondary indexes for the reading list/latest/filter queries.
+
+- sensor_readings (sensor_id, reading_time DESC): readings filtered by sensor
+- sensor_readings (reading_time, id): keyset pagination/export without filters
+- sensor_readings (reading_time, id) WHERE is_simulated: simulated-only listing
+- sensor_metrics (metric_key): metric_key lookups across sensors
+
+Indexes on the partitioned parent cascade to every partition.
+
+Revision ID: e3a9c71f5b48
+Revises: d81b5f3a6c27
+Create Date: 2026-10-18 16:48:05.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3a9c71f5b48"
+down_revision: Union[str, Sequence[str], None] = "d81b5f3a6c27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 新库由 init 迁移按 ORM 元数据建表时已带上这些索引，这里需幂等
+    op.create_index(
+        "ix_readings_sensor_time_desc",
+        "sensor_readings",
+        ["sensor_id", sa.text("reading_time DESC")],
+        if_not_exists=True,
+    )
+    op.create_index("ix_readings_time_id", "sensor_readings", ["reading_time", "id"], if_not_exists=True)
+    op.create_index(
+        "ix_readings_simulated_time_id",
+        "sensor_readings",
+        ["reading_time", "id"],
+        postgresql_where=sa.text("is_simulated"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_sensor_metrics_metric_key", "sensor_metrics", ["metric_key"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_sensor_metrics_metric_key", table_name="sensor_metrics", if_exists=True)
+    op.drop_index("ix_readings_simulated_time_id", table_name="sensor_readings", if_exists=True)
+    op.drop_index("ix_readings_time_id", table_name="sensor_readings", if_exists=True)
+    op.drop_index("ix_readings_sensor_time_desc", table_name="sensor_readings", if_exists=True)
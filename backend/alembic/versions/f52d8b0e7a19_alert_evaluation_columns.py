@@ -0,0 +1,58 @@
+"""Add metric targeting to alert rules and metric/time keys to alerts.
+
+alert_rules.metric_key limits a rule to one metric. alerts gain metric_id
+and reading_time (readings written through COPY have no id to reference),
+plus a partial unique index that allows one active alert per
+(metric, alert type, rule). Existing rows are left untouched; run
+scripts.evaluate_alerts to populate alerts from historical readings.
+
+Revision ID: f52d8b0e7a19
+Revises: e3a9c71f5b48
+Create Date: 2026-10-18 17:26:41.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f52d8b0e7a19"
+down_revision: Union[str, Sequence[str], None] = "e3a9c71f5b48"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(bind, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in sa.inspect(bind).get_columns(table))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if not _has_column(bind, "alert_rules", "metric_key"):
+        op.add_column("alert_rules", sa.Column("metric_key", sa.String(length=50)))
+    if not _has_column(bind, "alerts", "metric_id"):
+        op.add_column("alerts", sa.Column("metric_id", sa.Integer()))
+    if not _has_column(bind, "alerts", "reading_time"):
+        op.add_column("alerts", sa.Column("reading_time", sa.DateTime()))
+    op.create_index(
+        "uq_alerts_active",
+        "alerts",
+        ["metric_id", "alert_type", sa.text("coalesce(rule_id, 0)")],
+        unique=True,
+        postgresql_where=sa.text("status = 'active'"),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    op.drop_index("uq_alerts_active", table_name="alerts", if_exists=True)
+    for column in ("reading_time", "metric_id"):
+        if _has_column(bind, "alerts", column):
+            op.drop_column("alerts", column)
+    if _has_column(bind, "alert_rules", "metric_key"):
+        op.drop_column("alert_rules", "metric_key")
@@ -1,7 +1,8 @@
 from fastapi import APIRouter
-from .v1 import sensors, readings, products
+from .v1 import sensors, readings, products, ingest
 
 api_router = APIRouter()
 api_router.include_router(sensors.router, prefix="/sensors", tags=["sensors"])
 api_router.include_router(readings.router, prefix="/readings", tags=["readings"])
 api_router.include_router(products.router, prefix="/products", tags=["products"])
+api_router.include_router(ingest.router, prefix="/ingest", tags=["ingest"])
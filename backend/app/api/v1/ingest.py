@@ -0,0 +1,76 @@
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+
+from app.config import get_settings
+from app.utils.ingest import (
+    HAS_MSGPACK,
+    MAX_ERRORS_REPORTED,
+    PayloadError,
+    build_rows,
+    decode_payload,
+    flatten_records,
+    ingest_writer,
+    metric_key_cache,
+)
+
+router = APIRouter()
+
+
+@router.post("", status_code=202)
+async def ingest_readings(
+    request: Request,
+    wait: bool = Query(False, description="等待本批写入提交后再返回（返回实际插入行数）"),
+):
+    """实时读数接入：JSON / NDJSON / MessagePack，按 device_id|point_code + metric_key 写入 sensor_readings。
+
+    默认入队即返回 202；写入缓冲已满时返回 429 与 Retry-After；服务关闭中或 wait=true 时写库失败返回 503。
+    """
+    received = datetime.utcnow()
+    try:
+        records = decode_payload(await request.body(), request.headers.get("content-type", ""))
+    except PayloadError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc))
+    max_rows = get_settings().ingest_max_rows
+    if len(records) > max_rows:
+        raise HTTPException(status_code=413, detail=f"too many readings in one request (max {max_rows})")
+
+    points, errors = flatten_records(records, received)
+    refs = await metric_key_cache.resolve((device, metric_key) for device, metric_key, *_ in points)
+    rows, unknown = build_rows(points, refs)
+    if rows and not ingest_writer.has_room(len(rows)):
+        ingest_writer.counters["rows_rejected"] += len(rows)
+        retry_after = ingest_writer.retry_after()
+        return JSONResponse(
+            status_code=429,
+            headers={"Retry-After": str(retry_after)},
+            content={"detail": "ingest queue is full", "retry_after": retry_after, "pending": ingest_writer.pending},
+        )
+    body = {
+        "accepted": len(rows),
+        "invalid": len(errors),
+        "unknown": len(points) - len(rows),
+        "errors": errors[:MAX_ERRORS_REPORTED],
+        "unknown_keys": [{"device": device, "metric_key": key} for device, key in unknown[:MAX_ERRORS_REPORTED]],
+    }
+    if wait:
+        try:
+            body["inserted"] = await ingest_writer.put(rows, wait_commit=True)
+        except Exception as exc:  # 写入方已关闭，或本批重试后仍写库失败
+            raise HTTPException(status_code=503, detail=f"readings were not written: {type(exc).__name__}: {exc}")
+        return JSONResponse(status_code=200, content=body)
+    if not ingest_writer.offer(rows):
+        # has_room 已检查过，此时只可能是服务正在关闭
+        raise HTTPException(status_code=503, detail="ingest writer is shutting down")
+    return body
+
+
+@router.get("/stats")
+async def ingest_stats():
+    """实时接入统计：写入速率、缓冲占用、提交延迟分位数、ingest lag 与 metric 键缓存"""
+    return {
+        "writer": ingest_writer.stats(),
+        "metric_key_cache": metric_key_cache.stats(),
+        "msgpack": HAS_MSGPACK,
+    }
@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_session
+from app.database import get_read_session
 from app.models import ModelProduct, RasterProduct, VectorProduct
 from app.schemas.sensor import ProductOut
+from app.utils.cache import cached
 
 router = APIRouter()
 
 
 @router.get("/models", response_model=list[ProductOut])
-async def list_model_products(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+@cached("v1_products_models")
+async def list_model_products(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     stmt = select(ModelProduct)
     if is_simulated is not None:
         stmt = stmt.where(ModelProduct.is_simulated == is_simulated)
@@ -32,7 +34,8 @@ async def list_model_products(is_simulated: bool | None = None, session: AsyncSe
 
 
 @router.get("/rasters", response_model=list[ProductOut])
-async def list_raster_products(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+@cached("v1_products_rasters")
+async def list_raster_products(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     stmt = select(RasterProduct)
     if is_simulated is not None:
         stmt = stmt.where(RasterProduct.is_simulated == is_simulated)
@@ -55,7 +58,8 @@ async def list_raster_products(is_simulated: bool | None = None, session: AsyncS
 
 
 @router.get("/vectors", response_model=list[ProductOut])
-async def list_vector_products(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+@cached("v1_products_vectors")
+async def list_vector_products(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     stmt = select(VectorProduct)
     if is_simulated is not None:
         stmt = stmt.where(VectorProduct.is_simulated == is_simulated)
@@ -1,27 +1,42 @@
+import base64
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import select, desc
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_session
-from app.models import SensorReading, SensorMetric
-from app.schemas.sensor import SensorReadingOut
+from app.database import get_read_session
+from app.models import SensorReading, SensorMetric, SourceRow
+from app.schemas.sensor import ReadingSeriesOut, SensorReadingOut
+from app.utils.downsample import AGGREGATES, BUCKETS, bucket_stmt, lttb, raw_points_stmt
+from app.utils.rollups import pick_rollup, rollup_bucket_stmt
+from app.utils.reading_export import EXPORT_COLUMNS, MEDIA_TYPES, export_stream, supported_formats
 
 router = APIRouter()
 
 
-@router.get("", response_model=list[SensorReadingOut])
-async def list_readings(
-    limit: int = 100,
-    sensor_id: Optional[int] = None,
-    metric_key: Optional[str] = None,
-    start: Optional[datetime] = Query(None),
-    end: Optional[datetime] = Query(None),
-    is_simulated: Optional[bool] = None,
-    session: AsyncSession = Depends(get_session),
-):
-    stmt = select(SensorReading).join(SensorMetric)
+def _encode_cursor(reading_time: datetime, reading_id: int) -> str:
+    """keyset 游标：(reading_time, id) 编码为 URL 安全的不透明字符串。"""
+    return base64.urlsafe_b64encode(f"{reading_time.isoformat()}|{reading_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        ts, reading_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(ts), int(reading_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _apply_filters(
+    stmt: Select,
+    sensor_id: Optional[int],
+    metric_key: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    is_simulated: Optional[bool],
+) -> Select:
     if sensor_id:
         stmt = stmt.where(SensorReading.sensor_id == sensor_id)
     if metric_key:
@@ -32,8 +47,53 @@ async def list_readings(
         stmt = stmt.where(SensorReading.reading_time <= end)
     if is_simulated is not None:
         stmt = stmt.where(SensorReading.is_simulated == is_simulated)
-    stmt = stmt.order_by(desc(SensorReading.reading_time)).limit(limit)
-    rows = (await session.execute(stmt)).scalars().all()
+    return stmt
+
+
+def _apply_keyset(stmt: Select, order: str, cursor: Optional[str]) -> Select:
+    """按 (reading_time, id) 排序，并从游标之后继续（不使用 OFFSET）。"""
+    key = tuple_(SensorReading.reading_time, SensorReading.id)
+    if cursor:
+        reading_time, reading_id = _decode_cursor(cursor)
+        after = tuple_(reading_time, reading_id)
+        stmt = stmt.where(key < after if order == "desc" else key > after)
+        # 行比较不参与分区裁剪，单独补一个 reading_time 范围条件
+        if order == "desc":
+            stmt = stmt.where(SensorReading.reading_time <= reading_time)
+        else:
+            stmt = stmt.where(SensorReading.reading_time >= reading_time)
+    if order == "desc":
+        return stmt.order_by(SensorReading.reading_time.desc(), SensorReading.id.desc())
+    return stmt.order_by(SensorReading.reading_time.asc(), SensorReading.id.asc())
+
+
+@router.get("", response_model=list[SensorReadingOut])
+async def list_readings(
+    response: Response,
+    limit: int = Query(100, ge=1, le=10000),
+    sensor_id: Optional[int] = None,
+    metric_key: Optional[str] = None,
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    is_simulated: Optional[bool] = None,
+    include_raw: bool = Query(False, description="同时返回 Excel 源数据行的原始值"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    order: Literal["desc", "asc"] = Query("desc", description="按 (reading_time, id) 排序方向"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """读数列表，keyset 分页：还有下一页时在 X-Next-Cursor 响应头返回游标。"""
+    stmt = select(SensorReading).join(SensorMetric)
+    if include_raw:
+        stmt = stmt.add_columns(SourceRow.raw_values).outerjoin(SensorReading.source_row)
+    stmt = _apply_filters(stmt, sensor_id, metric_key, start, end, is_simulated)
+    # 多取一行判断是否还有下一页
+    stmt = _apply_keyset(stmt, order, cursor).limit(limit + 1)
+    result = await session.execute(stmt)
+    rows = result.all() if include_raw else [(r, None) for r in result.scalars().all()]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        response.headers["X-Next-Cursor"] = _encode_cursor(last.reading_time, last.id)
     return [
         SensorReadingOut(
             id=r.id,
@@ -43,6 +103,101 @@ async def list_readings(
             value_num=r.value_num,
             unit=r.unit,
             is_simulated=r.is_simulated,
+            raw_values=raw_values,
+        )
+        for r, raw_values in rows
+    ]
+
+
+@router.get("/export")
+async def export_readings(
+    format: Literal["ndjson", "csv", "arrow"] = Query("ndjson"),
+    sensor_id: Optional[int] = None,
+    metric_key: Optional[str] = None,
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    is_simulated: Optional[bool] = None,
+    order: Literal["asc", "desc"] = Query("asc"),
+):
+    """批量导出读数（服务端游标分批读取、流式编码），适合拉取整段历史。"""
+    if format not in supported_formats():
+        raise HTTPException(status_code=501, detail="Arrow export requires pyarrow")
+    columns = [
+        SensorMetric.metric_key if name == "metric_key" else getattr(SensorReading, name) for name in EXPORT_COLUMNS
+    ]
+    stmt = select(*columns).join(SensorMetric, SensorMetric.id == SensorReading.metric_id)
+    stmt = _apply_keyset(_apply_filters(stmt, sensor_id, metric_key, start, end, is_simulated), order, None)
+    filename = f"readings-{sensor_id or 'all'}.{format}"
+    return StreamingResponse(
+        export_stream(stmt, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/aggregate", response_model=list[ReadingSeriesOut])
+async def aggregate_readings(
+    sensor_id: Optional[int] = None,
+    metric_key: Optional[str] = None,
+    metric_id: Optional[int] = None,
+    bucket: Literal["1h", "1d", "1w"] = Query("1h", description="时间桶（date_trunc 对齐到小时/天/周）"),
+    agg: str = Query("avg,min,max,last", description=f"逗号分隔，可选 {','.join(AGGREGATES)}"),
+    mode: Literal["bucket", "lttb"] = Query("bucket", description="lttb：按点数预算保留曲线形状的原始点"),
+    points: int = Query(1000, ge=3, le=20000, description="lttb 模式下每个 metric 的点数上限"),
+    start: Optional[datetime] = Query(None, description="起始时间（含）"),
+    end: Optional[datetime] = Query(None, description="结束时间（不含）"),
+    from_raw: bool = Query(False, description="强制从明细表聚合，不读汇总表"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """长时间序列降采样：SQL 分桶聚合或 LTTB，每个 metric 一条序列。
+
+    分桶模式下，时间范围与桶边界对齐时读取满足分辨率的最粗汇总表（sensor_readings_1d/1h），否则聚合明细。
+    """
+    if metric_id is None and sensor_id is None:
+        raise HTTPException(status_code=400, detail="sensor_id or metric_id is required")
+    aggs = [a.strip() for a in agg.split(",") if a.strip()]
+    unknown = [a for a in aggs if a not in AGGREGATES]
+    if mode == "bucket" and (not aggs or unknown):
+        raise HTTPException(status_code=400, detail=f"Unsupported agg: {','.join(unknown) or agg}")
+
+    metric_stmt = select(SensorMetric).order_by(SensorMetric.id)
+    if metric_id is not None:
+        metric_stmt = metric_stmt.where(SensorMetric.id == metric_id)
+    if sensor_id is not None:
+        metric_stmt = metric_stmt.where(SensorMetric.sensor_id == sensor_id)
+    if metric_key:
+        metric_stmt = metric_stmt.where(SensorMetric.metric_key == metric_key)
+    metrics = (await session.execute(metric_stmt)).scalars().all()
+    if not metrics:
+        return []
+
+    series: dict[int, list[dict]] = {m.id: [] for m in metrics}
+    rollup = None
+    if mode == "lttb":
+        for m in metrics:
+            rows = (await session.execute(raw_points_stmt(m.id, start, end))).all()
+            keep = lttb([t.timestamp() for t, _ in rows], [v for _, v in rows], points)
+            series[m.id] = [{"t": rows[i][0], "value": rows[i][1]} for i in keep]
+    else:
+        metric_ids = [m.id for m in metrics]
+        rollup = None if from_raw else pick_rollup(bucket, start, end)
+        if rollup:
+            stmt = rollup_bucket_stmt(rollup, metric_ids, bucket, aggs, start, end)
+        else:
+            stmt = bucket_stmt(metric_ids, bucket, aggs, start, end)
+        result = await session.execute(stmt)
+        for row in result.mappings():
+            series[row["metric_id"]].append({"t": row["bucket_start"], **{a: row[a] for a in aggs}})
+
+    return [
+        ReadingSeriesOut(
+            metric_id=m.id,
+            metric_key=m.metric_key,
+            unit=m.unit,
+            mode=mode,
+            bucket=bucket if mode == "bucket" else None,
+            source="raw" if mode == "lttb" or rollup is None else f"rollup_{rollup}",
+            points=series[m.id],
         )
-        for r in rows
+        for m in metrics
     ]
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_session
+from app.database import get_read_session
 from app.models import Sensor, SensorMetric
 from app.schemas.sensor import SensorOut, SensorMetricOut
 from geoalchemy2.shape import to_shape
@@ -10,7 +10,7 @@ router = APIRouter()
 
 
 @router.get("", response_model=list[SensorOut])
-async def list_sensors(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+async def list_sensors(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     stmt = select(Sensor)
     if is_simulated is not None:
         stmt = stmt.where(Sensor.is_simulated == is_simulated)
@@ -30,7 +30,7 @@ async def list_sensors(is_simulated: bool | None = None, session: AsyncSession =
 
 
 @router.get("/{sensor_id}/metrics", response_model=list[SensorMetricOut])
-async def list_sensor_metrics(sensor_id: int, session: AsyncSession = Depends(get_session)):
+async def list_sensor_metrics(sensor_id: int, session: AsyncSession = Depends(get_read_session)):
     stmt = select(SensorMetric).where(SensorMetric.sensor_id == sensor_id)
     metrics = (await session.execute(stmt)).scalars().all()
     return [
@@ -10,6 +10,51 @@ class Settings(BaseSettings):
     api_prefix: str = "/api"
     enable_seed_data: bool = False
     debug: bool = True
+    # 数据库连接池；每个进程最多 db_pool_size + db_max_overflow 个连接，多 worker 部署时注意 max_connections
+    db_echo: bool = False
+    db_pool_size: int = 20
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 10.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 500
+    db_application_name: str = "water-twin-backend"
+    # 只读副本（可选）：GET 接口优先读副本，复制延迟超过 replica_max_lag_seconds 或不可达时回退主库
+    database_url_replica: str | None = None
+    replica_max_lag_seconds: float = 5.0
+    replica_lag_check_seconds: float = 2.0
+    # 本地联调用：不查询复制状态，把该值当作副本延迟
+    replica_simulated_lag_seconds: float | None = None
+    # 看板接口进程内响应缓存
+    cache_enabled: bool = True
+    cache_ttl_seconds: float = 10.0
+    cache_max_entries: int = 256
+    # 数据目录索引：未安装 watchfiles 时按此间隔比对目录 mtime
+    dir_index_poll_seconds: float = 5.0
+    dir_index_watch: bool = True
+    # read_excel_data 解析结果缓存（内存预算 MB；Parquet 旁路目录需 pyarrow，留空则不落盘）
+    workbook_cache_max_mb: int = 256
+    workbook_cache_sidecar_dir: str | None = None
+    # 写入读数时评估告警规则（alert_rules + 指标 warn_low/warn_high），/api/warnings 读取 active 告警
+    alerts_enabled: bool = True
+    # sensor_readings 月分区：服务启动时预建当前月及未来 N 个月（失败只记日志）；
+    # 保留期不会自动执行，由 manage_partitions retention 读取以下两项作为默认值（建议定时任务）
+    readings_partitions_ahead: int = 3
+    readings_retention_months: int | None = None
+    readings_retention_policy: str = "archive"
+    # /api/stream 实时推送：memory 仅本进程；postgres 经 LISTEN/NOTIFY 跨 worker / 跨进程
+    stream_backend: str = "memory"
+    stream_channel: str = "water_twin_stream"
+    stream_queue_size: int = 256
+    # 队列满时 drop_oldest 丢弃最旧消息并提示客户端 resync；close 直接断开慢客户端
+    stream_drop_policy: str = "drop_oldest"
+    stream_heartbeat_seconds: float = 15.0
+    # POST /api/v1/ingest：进程内写入缓冲按条数/时间攒批，超过 ingest_max_pending 条时返回 429
+    ingest_batch_size: int = 5000
+    ingest_flush_interval: float = 0.2
+    ingest_max_pending: int = 200_000
+    ingest_max_rows: int = 50_000
+    ingest_use_copy: bool = True
 
     class Config:
         env_file = ".env"
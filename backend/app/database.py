@@ -1,6 +1,8 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from app.config import get_settings
+from app.utils.pool_metrics import PoolMetrics
+from app.utils.replica import ReplicaRouter
 
 
 settings = get_settings()
@@ -10,17 +12,61 @@ class Base(DeclarativeBase):
     """Base class for all ORM models."""
 
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    future=True,
-)
+def _connect_args(url: str, application_name: str) -> dict:
+    if not url.startswith("postgresql+asyncpg"):
+        return {}
+    return {
+        # SQLAlchemy 侧的预编译语句 LRU 与 asyncpg 自身的语句缓存；经 PgBouncer 事务池时两者都需设为 0
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+        "statement_cache_size": settings.db_statement_cache_size,
+        "server_settings": {"application_name": application_name},
+    }
+
+
+def _create_engine(url: str, application_name: str):
+    return create_async_engine(
+        url,
+        echo=settings.db_echo,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=_connect_args(url, application_name),
+    )
+
+
+def _session_factory(bind) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(bind=bind, expire_on_commit=False, autoflush=False, class_=AsyncSession)
+
+
+engine = _create_engine(settings.database_url, settings.db_application_name)
 
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine,
-    expire_on_commit=False,
-    autoflush=False,
-    class_=AsyncSession,
+pool_metrics = PoolMetrics().attach(engine)
+
+# 只读引擎与主引擎共用连接池，事务以 BEGIN READ ONLY 开启（asyncpg 直接带在 BEGIN 上，不多一次往返）
+read_engine = engine.execution_options(postgresql_readonly=True)
+
+AsyncSessionLocal = _session_factory(engine)
+
+ReadSessionLocal = _session_factory(read_engine)
+
+# 可选只读副本：GET 接口经 replica_router 路由，延迟超限或不可达时回退主库的只读会话
+replica_engine = None
+replica_pool_metrics = None
+ReplicaSessionLocal = None
+if settings.database_url_replica:
+    replica_engine = _create_engine(settings.database_url_replica, f"{settings.db_application_name}-replica")
+    replica_pool_metrics = PoolMetrics().attach(replica_engine)
+    ReplicaSessionLocal = _session_factory(replica_engine.execution_options(postgresql_readonly=True))
+
+replica_router = ReplicaRouter(
+    ReadSessionLocal,
+    ReplicaSessionLocal,
+    replica_engine,
+    max_lag_seconds=settings.replica_max_lag_seconds,
+    check_seconds=settings.replica_lag_check_seconds,
+    simulated_lag_seconds=settings.replica_simulated_lag_seconds,
 )
 
 
@@ -28,3 +74,9 @@ async def get_session() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
 
+
+async def get_read_session() -> AsyncSession:
+    """GET 接口使用的只读会话：优先副本，否则主库；误写会被数据库拒绝（read-only transaction）。"""
+    factory = await replica_router.session_factory()
+    async with factory() as session:
+        yield session
@@ -1,19 +1,67 @@
+import asyncio
+import contextlib
+import logging
 import os
-from fastapi import FastAPI, HTTPException, Query, Depends
+from datetime import datetime
+from typing import Literal
+from fastapi import FastAPI, HTTPException, Query, Depends, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import select, desc, or_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from .utils.scanner import scan_data_directory, DATA_ROOT
-from .utils.reader import read_excel_data
+from .utils.scanner import directory_index, DATA_ROOT
+from .utils.reader import read_excel_data, workbook_cache, query_excel_data, iter_ndjson
 from .utils.stats import calculate_overview_stats, get_warning_data
 from .utils.mock_data import get_mock_flood_events, get_mock_rain_grid_frames, get_mock_iot_devices, get_mock_3d_resources
-from app.database import get_session
-from app.models import Sensor, SensorMetric, SensorReading, ModelProduct, RasterProduct, VectorProduct
+from .utils.latest_readings import fetch_latest_readings
+from .utils.cache import cached, response_cache
+from .utils.alerting import LEVEL_COLORS, active_alerts_stmt, count_alerts_since_stmt
+from .utils.broker import TOPICS, SubscriptionClosed, broker
+from .utils.ingest import ingest_writer
+from .utils.partitions import ensure_partitions
+from app.config import get_settings
+from app.database import AsyncSessionLocal, engine, get_read_session, pool_metrics, replica_engine, replica_pool_metrics, replica_router
+from app.models import ModelProduct, RasterProduct, VectorProduct
 from app.api.router import api_router
 from app.schemas.data import WaterLevelOut, RainfallOut, StatsOut, WarningOut, MetricLatestOut
 
-app = FastAPI(title="Water Digital Twin Backend", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+
+async def _prepare_partitions() -> None:
+    """启动时预建当前月及未来 N 个月的读数分区；数据库不可用时只记录日志，不阻止启动。"""
+    try:
+        async with AsyncSessionLocal() as session:
+            created = await ensure_partitions(session, get_settings().readings_partitions_ahead)
+            await session.commit()
+    except Exception:
+        logger.exception("failed to pre-create sensor_readings partitions")
+        return
+    if created:
+        logger.info("created sensor_readings partitions: %s", ", ".join(created))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动时构建数据目录索引，并在可用时启动 watchfiles 监听（否则查询时按 mtime 轮询刷新）
+    await asyncio.to_thread(directory_index.build)
+    watcher = asyncio.create_task(directory_index.watch()) if get_settings().dir_index_watch else None
+    await _prepare_partitions()
+    await broker.start()
+    ingest_writer.start()
+    try:
+        yield
+    finally:
+        # 先写完接入缓冲，再停止推送
+        await ingest_writer.close()
+        await broker.stop()
+        if watcher is not None:
+            watcher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await watcher
+
+
+app = FastAPI(title="Water Digital Twin Backend", version="1.0.0", lifespan=lifespan)
 app.include_router(api_router, prefix="/api/v1")
 
 # ... (existing CORS and root endpoints) ...
@@ -29,7 +77,7 @@ async def get_rain_frames():
     return get_mock_rain_grid_frames()
 
 @app.get("/api/iot_devices")
-async def get_iot_devices(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+async def get_iot_devices(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     """获取IoT设备列表（数据库，如果无记录则回退模拟数据）"""
     from app.models.sensor import SimulatedDevice
 
@@ -68,30 +116,12 @@ async def _latest_readings_for_metric(
     is_simulated: bool | None = None,
     warn_only: bool = False,
 ):
-    metrics_stmt = select(SensorMetric).options(selectinload(SensorMetric.sensor))
-    if metric_keys:
-        metrics_stmt = metrics_stmt.where(SensorMetric.metric_key.in_(metric_keys))
-    if warn_only:
-        metrics_stmt = metrics_stmt.where(or_(SensorMetric.warn_low.is_not(None), SensorMetric.warn_high.is_not(None)))
-    if is_simulated is not None:
-        metrics_stmt = metrics_stmt.join(Sensor).where(Sensor.is_simulated == is_simulated)
-    metrics_res = (await session.execute(metrics_stmt)).scalars().all()
-    results = []
-    for metric in metrics_res:
-        sensor = metric.sensor
-        reading_stmt = (
-            select(SensorReading)
-            .where(SensorReading.metric_id == metric.id)
-            .order_by(desc(SensorReading.reading_time))
-            .limit(1)
-        )
-        reading = (await session.execute(reading_stmt)).scalars().first()
-        results.append((sensor, metric, reading))
-    return results
+    return await fetch_latest_readings(session, metric_keys, is_simulated, warn_only)
 
 
 @app.get("/api/water_levels", response_model=list[WaterLevelOut])
-async def api_water_levels(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+@cached("water_levels")
+async def api_water_levels(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     """获取水位数据（数据库）"""
     rows = await _latest_readings_for_metric(session, ["water_level"], is_simulated)
     return [
@@ -108,7 +138,8 @@ async def api_water_levels(is_simulated: bool | None = None, session: AsyncSessi
 
 
 @app.get("/api/rainfall_data", response_model=list[RainfallOut])
-async def api_rainfall(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+@cached("rainfall_data")
+async def api_rainfall(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     """获取雨量数据（数据库）"""
     rows = await _latest_readings_for_metric(session, ["rainfall"], is_simulated)
     return [
@@ -125,7 +156,8 @@ async def api_rainfall(is_simulated: bool | None = None, session: AsyncSession =
 
 
 @app.get("/api/model_products")
-async def api_model_products(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+@cached("model_products")
+async def api_model_products(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     stmt = select(ModelProduct)
     if is_simulated is not None:
         stmt = stmt.where(ModelProduct.is_simulated == is_simulated)
@@ -148,7 +180,8 @@ async def api_model_products(is_simulated: bool | None = None, session: AsyncSes
 
 
 @app.get("/api/raster_products")
-async def api_raster_products(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+@cached("raster_products")
+async def api_raster_products(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     stmt = select(RasterProduct)
     if is_simulated is not None:
         stmt = stmt.where(RasterProduct.is_simulated == is_simulated)
@@ -172,7 +205,8 @@ async def api_raster_products(is_simulated: bool | None = None, session: AsyncSe
 
 
 @app.get("/api/vector_products")
-async def api_vector_products(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+@cached("vector_products")
+async def api_vector_products(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     stmt = select(VectorProduct)
     if is_simulated is not None:
         stmt = stmt.where(VectorProduct.is_simulated == is_simulated)
@@ -195,7 +229,8 @@ async def api_vector_products(is_simulated: bool | None = None, session: AsyncSe
 
 
 @app.get("/api/pore_pressures", response_model=list[MetricLatestOut])
-async def api_pore_pressures(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+@cached("pore_pressures")
+async def api_pore_pressures(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     """获取渗压计最新读数"""
     rows = await _latest_readings_for_metric(session, ["pore_pressure"], is_simulated)
     return [
@@ -213,7 +248,8 @@ async def api_pore_pressures(is_simulated: bool | None = None, session: AsyncSes
 
 
 @app.get("/api/stress_data", response_model=list[MetricLatestOut])
-async def api_stress(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+@cached("stress_data")
+async def api_stress(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     """获取应力计最新读数"""
     rows = await _latest_readings_for_metric(session, ["stress"], is_simulated)
     return [
@@ -251,14 +287,125 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "fastapi"}
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """响应缓存命中/未命中统计"""
+    return response_cache.stats()
+
+@app.get("/api/db/pool/stats")
+async def db_pool_stats():
+    """数据库连接池占用与累计借出/失效计数（配置了只读副本时同时返回副本池与路由统计）"""
+    stats = {"primary": pool_metrics.stats(engine), "replica_router": replica_router.stats()}
+    if replica_engine is not None:
+        stats["replica"] = replica_pool_metrics.stats(replica_engine)
+    return stats
+
+def _stream_topics(topics: str | None) -> list[str] | None:
+    if not topics:
+        return None
+    selected = [t.strip() for t in topics.split(",") if t.strip()]
+    unknown = sorted(set(selected) - set(TOPICS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown topics: {', '.join(unknown)}")
+    return selected
+
+@app.get("/api/stream")
+async def stream_events(topics: str | None = Query(None, description="逗号分隔的主题（readings,alerts），为空订阅全部")):
+    """实时推送（SSE）：readings / alerts 增量，空闲时发送心跳注释；收到 resync 事件应重新拉取快照"""
+    selected = _stream_topics(topics)
+    heartbeat = get_settings().stream_heartbeat_seconds
+
+    async def events():
+        # 在生成器内订阅：客户端在响应开始前断开时不会留下订阅
+        sub = broker.subscribe(selected)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = await sub.next(heartbeat)
+                except SubscriptionClosed:
+                    break
+                dropped = sub.take_dropped()
+                if dropped:
+                    yield f'event: resync\ndata: {{"dropped":{dropped}}}\n\n'
+                if message is None:
+                    yield ": heartbeat\n\n"
+                else:
+                    yield f"id: {message.seq}\nevent: {message.topic}\ndata: {message.encoded}\n\n"
+        finally:
+            broker.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/api/stream/ws")
+async def stream_events_ws(websocket: WebSocket, topics: str | None = None):
+    """实时推送（WebSocket）：消息为 {"event", "id", "data"}，与 SSE 相同的主题、心跳与 resync 语义"""
+    selected = _stream_topics(topics)
+    heartbeat = get_settings().stream_heartbeat_seconds
+    await websocket.accept()
+    sub = broker.subscribe(selected)
+    try:
+        while True:
+            message = await sub.next(heartbeat)
+            dropped = sub.take_dropped()
+            if dropped:
+                await websocket.send_text(f'{{"event":"resync","dropped":{dropped}}}')
+            if message is None:
+                await websocket.send_text('{"event":"heartbeat"}')
+            else:
+                await websocket.send_text(
+                    f'{{"event":"{message.topic}","id":{message.seq},"data":{message.encoded}}}'
+                )
+    except (WebSocketDisconnect, SubscriptionClosed):
+        pass
+    finally:
+        broker.unsubscribe(sub)
+
+@app.get("/api/stream/stats")
+async def stream_stats():
+    """实时推送 broker 状态：后端、订阅者数、排队/丢弃计数"""
+    return broker.stats()
+
+@app.post("/api/cache/invalidate")
+async def cache_invalidate(route: str | None = None):
+    """手动清理响应缓存（独立进程导入数据后可调用）"""
+    return {"removed": response_cache.invalidate(route)}
+
 @app.get("/api/stations")
 async def get_stations():
-    """获取监测站点目录结构"""
-    return scan_data_directory()
+    """获取监测站点目录结构（内存目录索引）"""
+    return directory_index.tree()
+
+@app.get("/api/stations/index")
+async def get_station_index_stats():
+    """目录索引状态：文件/目录数、测点前缀、重建次数、是否由 watcher 驱动"""
+    return directory_index.stats()
+
+@app.get("/api/data/cache/stats")
+async def get_data_cache_stats():
+    """Excel 解析结果缓存的命中/淘汰统计"""
+    return workbook_cache.stats()
 
 @app.get("/api/data")
-async def get_station_data(path: str = Query(..., description="文件的绝对路径或相对路径")):
-    """读取指定 Excel 文件的数据"""
+async def get_station_data(
+    path: str = Query(..., description="文件的绝对路径或相对路径"),
+    offset: int = Query(0, ge=0, description="跳过的行数（时间过滤之后）"),
+    limit: int | None = Query(None, ge=1, le=10000, description="返回行数上限"),
+    columns: str | None = Query(None, description="逗号分隔的列名投影"),
+    start: datetime | None = Query(None, description="首列时间 >= start"),
+    end: datetime | None = Query(None, description="首列时间 <= end"),
+    format: Literal["json", "ndjson"] = Query("json", description="ndjson 时逐块流式返回记录"),
+):
+    """读取指定 Excel 文件的数据
+
+    不带分页/投影/过滤参数且 format=json 时返回整表（兼容旧前端）；否则返回切片，
+    meta 中带 total 与 next_offset（无更多数据时为 null）。ndjson 模式下分页信息放在
+    X-Total-Count / X-Next-Offset 响应头。
+    """
     # 安全检查：防止路径遍历攻击
     # 如果传的是相对路径，拼接 DATA_ROOT
     target_path = path
@@ -274,19 +421,47 @@ async def get_station_data(path: str = Query(..., description="文件的绝对
     
     if not os.path.exists(target_path):
         raise HTTPException(status_code=404, detail="File not found")
-        
-    result = read_excel_data(target_path)
-    
-    if "error" in result:
-        raise HTTPException(status_code=500, detail=result["error"])
-        
-    return result
+
+    column_list = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    if format == "json" and not (offset or limit or column_list or start or end):
+        result = read_excel_data(target_path)
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
+        return result
+
+    try:
+        frame, total = query_excel_data(target_path, offset, limit, column_list, start, end)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {e.args[0]}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    next_offset = offset + len(frame) if offset + len(frame) < total else None
+
+    if format == "ndjson":
+        headers = {"X-Total-Count": str(total)}
+        if next_offset is not None:
+            headers["X-Next-Offset"] = str(next_offset)
+        return StreamingResponse(iter_ndjson(frame), media_type="application/x-ndjson", headers=headers)
+
+    return {
+        "columns": frame.columns.tolist(),
+        "data": frame.to_dict(orient="records"),
+        "meta": {
+            "filename": os.path.basename(target_path),
+            "row_count": len(frame),
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset,
+        },
+    }
 
 async def _latest_by_metric(session: AsyncSession, metric_key: str):
     return await _latest_readings_for_metric(session, [metric_key], is_simulated=None)
 
 @app.get("/api/stats", response_model=StatsOut)
-async def get_overview_stats(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
+@cached("stats")
+async def get_overview_stats(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
     """获取项目总览统计数据（优先 DB，无数据时回退旧逻辑）"""
     water_rows = await _latest_readings_for_metric(session, ["water_level"], is_simulated)
     rain_rows = await _latest_readings_for_metric(session, ["rainfall"], is_simulated)
@@ -303,10 +478,12 @@ async def get_overview_stats(is_simulated: bool | None = None, session: AsyncSes
         if rain_rows
         else 0
     )
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    today_alerts = await session.scalar(count_alerts_since_stmt(today, is_simulated))
     stats = {
         "online_devices": online_devices,
         "total_devices": total_devices,
-        "today_alerts": 0,
+        "today_alerts": today_alerts or 0,
         "reservoir_capacity_percent": 0,
         "average_rainfall_mm": avg_rain,
     }
@@ -314,36 +491,21 @@ async def get_overview_stats(is_simulated: bool | None = None, session: AsyncSes
 
 
 @app.get("/api/warnings", response_model=list[WarningOut])
-async def get_all_warnings(is_simulated: bool | None = None, session: AsyncSession = Depends(get_session)):
-    """获取所有告警信息（依据 warn_low/warn_high，包含渗压/应力/水位/雨量等设置了阈值的指标）"""
-    rows = await _latest_readings_for_metric(session, None, is_simulated, warn_only=True)
-    warnings = []
-    for sensor, metric, reading in rows:
-        if not reading or reading.value_num is None:
-            continue
-        value = reading.value_num
-        if metric.warn_high is not None and value > metric.warn_high:
-            warnings.append(
-                {
-                    "sensor_id": sensor.id,
-                    "metric": metric.metric_key,
-                    "level": "Yellow",
-                    "message": f"{sensor.point_code} {metric.name_cn or metric.metric_key} 超限: {value}{metric.unit or ''}",
-                    "time": reading.reading_time.isoformat(),
-                    "is_simulated": sensor.is_simulated,
-                }
-            )
-        if metric.warn_low is not None and value < metric.warn_low:
-            warnings.append(
-                {
-                    "sensor_id": sensor.id,
-                    "metric": metric.metric_key,
-                    "level": "Yellow",
-                    "message": f"{sensor.point_code} {metric.name_cn or metric.metric_key} 低于下限: {value}{metric.unit or ''}",
-                    "time": reading.reading_time.isoformat(),
-                    "is_simulated": sensor.is_simulated,
-                }
-            )
+@cached("warnings")
+async def get_all_warnings(is_simulated: bool | None = None, session: AsyncSession = Depends(get_read_session)):
+    """获取当前 active 告警（由写入读数时的告警评估维护，见 app/utils/alerting.py）"""
+    rows = (await session.execute(active_alerts_stmt(is_simulated))).all()
+    warnings = [
+        {
+            "sensor_id": sensor.id,
+            "metric": metric.metric_key,
+            "level": LEVEL_COLORS.get(alert.alert_level, "Yellow"),
+            "message": alert.message or "",
+            "time": alert.reading_time.isoformat() if alert.reading_time else None,
+            "is_simulated": alert.is_simulated,
+        }
+        for alert, sensor, metric in rows
+    ]
     if warnings:
         return warnings
     # 回退旧逻辑，补全字段
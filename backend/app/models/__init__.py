@@ -1,7 +1,7 @@
 from app.database import Base
 from .facility import MonitoringFacility, MonitoringSection, SensorType, ChainageCoordinate
 from .sensor import Sensor, SensorMetric, IngestFile, SimulatedDevice
-from .reading import SensorReading
+from .reading import SensorReading, SensorLatestValue, SourceRow, SensorReadingHourly, SensorReadingDaily
 from .alert import AlertRule, Alert
 from .product import RasterProduct, VectorProduct, ModelProduct
 
@@ -16,6 +16,10 @@ __all__ = [
     "IngestFile",
     "SimulatedDevice",
     "SensorReading",
+    "SensorLatestValue",
+    "SourceRow",
+    "SensorReadingHourly",
+    "SensorReadingDaily",
     "AlertRule",
     "Alert",
     "RasterProduct",
@@ -1,5 +1,6 @@
 from typing import Optional
-from sqlalchemy import Integer, ForeignKey, String, Text, Boolean
+from datetime import datetime
+from sqlalchemy import Integer, ForeignKey, String, Text, Boolean, DateTime, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 from app.database import Base
 
@@ -11,7 +12,10 @@ class AlertRule(Base):
     sensor_type_id: Mapped[Optional[int]] = mapped_column(Integer)
     sensor_id: Mapped[Optional[int]] = mapped_column(Integer)
     rule_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    # high / low / rate；为空时有阈值按 high，仅有 rate_threshold 按 rate
     rule_type: Mapped[Optional[str]] = mapped_column(String(50))
+    # 作用的指标；为空表示该测点/类型下的全部指标
+    metric_key: Mapped[Optional[str]] = mapped_column(String(50))
     warning_threshold: Mapped[Optional[float]] = mapped_column()
     alert_threshold: Mapped[Optional[float]] = mapped_column()
     critical_threshold: Mapped[Optional[float]] = mapped_column()
@@ -22,10 +26,24 @@ class AlertRule(Base):
 
 class Alert(Base):
     __tablename__ = "alerts"
+    __table_args__ = (
+        # 同一指标、同一规则（隐式 warn_low/warn_high 规则 rule_id 为空）最多一条 active 告警
+        Index(
+            "uq_alerts_active",
+            "metric_id",
+            "alert_type",
+            text("coalesce(rule_id, 0)"),
+            unique=True,
+            postgresql_where=text("status = 'active'"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     sensor_id: Mapped[Optional[int]] = mapped_column(Integer)
+    metric_id: Mapped[Optional[int]] = mapped_column(Integer)
     reading_id: Mapped[Optional[int]] = mapped_column(Integer)
+    # 触发告警的（最近一条越限）读数时间；读数经 COPY 写入时拿不到 id，按 (metric_id, reading_time) 定位
+    reading_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
     rule_id: Mapped[Optional[int]] = mapped_column(Integer)
     alert_level: Mapped[str] = mapped_column(String(20))
     alert_type: Mapped[Optional[str]] = mapped_column(String(50))
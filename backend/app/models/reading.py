@@ -1,6 +1,6 @@
 from typing import Optional
 from datetime import datetime
-from sqlalchemy import Integer, ForeignKey, String, Text, UniqueConstraint, Boolean, JSON, DateTime
+from sqlalchemy import Integer, ForeignKey, String, Text, UniqueConstraint, Boolean, JSON, DateTime, Index, text, func, event, DDL
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
@@ -9,16 +9,25 @@ class SensorReading(Base):
     __tablename__ = "sensor_readings"
     __table_args__ = (
         UniqueConstraint("metric_id", "reading_time", "source_file_id", name="uq_readings_metric_time_file"),
+        # 最新读数查询（LATERAL ... ORDER BY reading_time DESC LIMIT 1）按 metric 倒序探测
+        Index("ix_readings_metric_time_desc", "metric_id", text("reading_time DESC")),
+        # 按测点列出读数（/api/v1/readings?sensor_id=...）
+        Index("ix_readings_sensor_time_desc", "sensor_id", text("reading_time DESC")),
+        # 不带测点/指标过滤时的 keyset 分页与导出，排序键 (reading_time, id)
+        Index("ix_readings_time_id", "reading_time", "id"),
+        # 模拟数据占比小，is_simulated=true 的列表查询走部分索引
+        Index("ix_readings_simulated_time_id", "reading_time", "id", postgresql_where=text("is_simulated")),
+        # 按 reading_time 月度范围分区，分区由 app.utils.partitions 维护；分区表的主键/唯一约束须包含分区键
+        {"postgresql_partition_by": "RANGE (reading_time)"},
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     sensor_id: Mapped[int] = mapped_column(ForeignKey("sensors.id"), nullable=False)
     metric_id: Mapped[int] = mapped_column(ForeignKey("sensor_metrics.id"), nullable=False)
-    reading_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    reading_time: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
     value_num: Mapped[Optional[float]] = mapped_column()
     value_text: Mapped[Optional[str]] = mapped_column(Text)
     unit: Mapped[Optional[str]] = mapped_column(String(50))
-    raw_values: Mapped[Optional[dict]] = mapped_column(JSON)
     quality_flag: Mapped[str] = mapped_column(String(20), default="normal")
     remark: Mapped[Optional[str]] = mapped_column(Text)
     source_file_id: Mapped[Optional[int]] = mapped_column(ForeignKey("ingest_files.id"))
@@ -26,3 +35,69 @@ class SensorReading(Base):
 
     sensor: Mapped["Sensor"] = relationship(back_populates="readings")
     metric: Mapped["SensorMetric"] = relationship(back_populates="readings")
+    # 源数据行按 (source_file_id, reading_time) 关联，同一 Excel 行的多个 metric 共用一条
+    source_row: Mapped[Optional["SourceRow"]] = relationship(
+        primaryjoin="and_(foreign(SensorReading.source_file_id) == SourceRow.ingest_file_id, "
+        "foreign(SensorReading.reading_time) == SourceRow.reading_time)",
+        viewonly=True,
+        uselist=False,
+    )
+
+
+# create_all 建出的分区父表没有分区，先挂一个 default 分区保证可写；月分区由 app.utils.partitions 按需创建
+event.listen(
+    SensorReading.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS sensor_readings_default PARTITION OF sensor_readings DEFAULT").execute_if(
+        dialect="postgresql"
+    ),
+)
+
+
+class SourceRow(Base):
+    """Excel 源数据行（清洗后的整行原始值），每个文件每个观测时间只存一次。"""
+
+    __tablename__ = "source_rows"
+    __table_args__ = (UniqueConstraint("ingest_file_id", "reading_time", name="uq_source_rows_file_time"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    ingest_file_id: Mapped[int] = mapped_column(ForeignKey("ingest_files.id", ondelete="CASCADE"), nullable=False)
+    reading_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    raw_values: Mapped[Optional[dict]] = mapped_column(JSON)
+
+
+class SensorLatestValue(Base):
+    """每个 metric 的最新读数投影，由导入/实时写入在更新的 reading_time 到达时 upsert。"""
+
+    __tablename__ = "sensor_latest_values"
+
+    metric_id: Mapped[int] = mapped_column(ForeignKey("sensor_metrics.id", ondelete="CASCADE"), primary_key=True)
+    sensor_id: Mapped[int] = mapped_column(ForeignKey("sensors.id", ondelete="CASCADE"), nullable=False)
+    reading_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    value_num: Mapped[Optional[float]] = mapped_column()
+    value_text: Mapped[Optional[str]] = mapped_column(Text)
+    unit: Mapped[Optional[str]] = mapped_column(String(50))
+    source_file_id: Mapped[Optional[int]] = mapped_column(ForeignKey("ingest_files.id", ondelete="SET NULL"))
+    is_simulated: Mapped[bool] = mapped_column(Boolean, default=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+
+
+class _ReadingRollup:
+    """按 (metric_id, 时间桶) 汇总的数值读数（仅 value_num 非空的行），avg = sum / count。"""
+
+    metric_id: Mapped[int] = mapped_column(ForeignKey("sensor_metrics.id", ondelete="CASCADE"), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False)
+    min: Mapped[Optional[float]] = mapped_column()
+    max: Mapped[Optional[float]] = mapped_column()
+    sum: Mapped[Optional[float]] = mapped_column()
+    last_value: Mapped[Optional[float]] = mapped_column()
+    last_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class SensorReadingHourly(_ReadingRollup, Base):
+    __tablename__ = "sensor_readings_1h"
+
+
+class SensorReadingDaily(_ReadingRollup, Base):
+    __tablename__ = "sensor_readings_1d"
@@ -1,15 +1,18 @@
 from typing import Optional
-from datetime import date
+from datetime import date, datetime
 from sqlalchemy import (
     String,
     Integer,
+    BigInteger,
     ForeignKey,
     Text,
     UniqueConstraint,
     Boolean,
     Date,
+    DateTime,
     Float,
     JSON,
+    Index,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from geoalchemy2 import Geometry
@@ -50,7 +53,11 @@ class Sensor(Base):
 
 class SensorMetric(Base):
     __tablename__ = "sensor_metrics"
-    __table_args__ = (UniqueConstraint("sensor_id", "metric_key", name="uq_sensor_metric_key"),)
+    __table_args__ = (
+        UniqueConstraint("sensor_id", "metric_key", name="uq_sensor_metric_key"),
+        # 按 metric_key 跨测点查询（最新读数、读数列表的 metric_key 过滤）；唯一约束以 sensor_id 开头用不上
+        Index("ix_sensor_metrics_metric_key", "metric_key"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     sensor_id: Mapped[int] = mapped_column(ForeignKey("sensors.id"), nullable=False)
@@ -72,11 +79,15 @@ class IngestFile(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     sensor_id: Mapped[Optional[int]] = mapped_column(ForeignKey("sensors.id"))
-    path: Mapped[str] = mapped_column(String, nullable=False)
+    path: Mapped[str] = mapped_column(String, nullable=False, index=True)
     sheet: Mapped[Optional[str]] = mapped_column(String(100))
     checksum: Mapped[Optional[str]] = mapped_column(String(128))
     file_mtime: Mapped[Optional[str]] = mapped_column(String(50))
+    file_size: Mapped[Optional[int]] = mapped_column(BigInteger)
     rows_imported: Mapped[Optional[int]] = mapped_column(Integer)
+    # 增量导入水位线：已导入的最大观测时间与表头以下的数据行数
+    last_reading_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    data_rows: Mapped[Optional[int]] = mapped_column(Integer)
     status: Mapped[str] = mapped_column(String(20), default="success")
     message: Mapped[Optional[str]] = mapped_column(Text)
     is_simulated: Mapped[bool] = mapped_column(Boolean, default=False)
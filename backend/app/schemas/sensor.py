@@ -31,11 +31,22 @@ class SensorReadingOut(BaseModel):
     value_num: Optional[float] = None
     unit: Optional[str] = None
     is_simulated: bool
+    raw_values: Optional[dict] = None
 
     class Config:
         json_encoders = {datetime: lambda v: v.isoformat() if v else None}
 
 
+class ReadingSeriesOut(BaseModel):
+    metric_id: int
+    metric_key: str
+    unit: Optional[str] = None
+    mode: str  # bucket | lttb
+    bucket: Optional[str] = None
+    source: Optional[str] = None  # raw | rollup_1h | rollup_1d
+    points: list[dict[str, Any]]  # bucket: {"t", <agg>...}；lttb: {"t", "value"}
+
+
 class ProductOut(BaseModel):
     id: int
     domain: Optional[str] = None
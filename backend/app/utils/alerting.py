@@ -0,0 +1,561 @@
+"""
+告警评估：每批新写入的读数评估一次规则，结果写入 ``alerts``，``/api/warnings`` 只读 active 告警。
+
+- 规则来源：``alert_rules``（按 sensor_id / sensor_type_id 建索引，可用 metric_key 限定指标）
+  以及 ``sensor_metrics.warn_low/warn_high`` 隐式规则（alert_type 为 warn_low/warn_high，rule_id 为空）；
+- 阈值规则按 critical -> alert -> warning 取最严重的越限级别；rate 规则在每个指标的滑动窗口内
+  比较当前值与 ``rate_period_hours`` 前的值，变化量绝对值超过 ``rate_threshold`` 即告警；
+- 一段连续越限（episode）对应一条告警：持续越限时更新同一条 active 告警（级别只升不降），
+  回到正常范围时置为 resolved；批内已结束的 episode 直接写为 resolved；
+- 去重：部分唯一索引 ``uq_alerts_active`` 保证同一 (metric, alert_type, rule) 最多一条 active；
+- 只评估比该指标已知最新读数更新的读数（``sensor_latest_values``），因此写入方须在
+  ``upsert_latest_values`` 之前调用 ``evaluate``；补导更早的历史数据不会产生告警，需要时用
+  ``scripts/evaluate_alerts.py`` 重放；
+- 每次状态变化（新建 / 更新 / 解除）在提交后以 ``alerts`` 主题推送给 ``/api/stream`` 订阅者；
+- 进程内的水位线与 rate 滑动窗口先暂存在 ``session.info``，提交后才生效：写入方回滚重试或拆批时，
+  重新评估的读数不会因水位线已前移而被跳过，窗口也不会重复追加同一批点；
+- 提交的事务中有告警状态变化时，同时失效 ``warnings`` / ``stats`` 响应缓存（实时写入方、模拟器、
+  MQTT 适配器与导入器都经由这里，无需各自失效）。
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import Select, event, func, insert as sa_insert, literal_column, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import Alert, AlertRule, Sensor, SensorLatestValue, SensorMetric, SensorReading
+from app.utils.broker import publish_on_commit
+from app.utils.cache import invalidate_cache
+
+
+LEVELS = ("warning", "alert", "critical")
+LEVEL_RANK = {level: rank for rank, level in enumerate(LEVELS)}
+# /api/warnings 沿用的颜色级别
+LEVEL_COLORS = {"warning": "Yellow", "alert": "Orange", "critical": "Red"}
+RULES_TTL_SECONDS = 60.0
+# 并发写入方同时新建 active 告警时，冲突一方覆盖的列
+UPSERT_COLUMNS = ("alert_level", "message", "value", "threshold", "reading_time")
+
+# session.info 中暂存的评估器状态（提交后并入 AlertEvaluator）
+STATE_KEY = "alert_state"
+# 读 alerts 的缓存路由（app/main.py），告警状态变化提交后失效
+CACHED_ROUTES = ("warnings", "stats")
+
+Point = Tuple[datetime, float]
+EpisodeKey = Tuple[str, int]
+
+
+@dataclass(frozen=True)
+class Rule:
+    rule_id: Optional[int]
+    alert_type: str  # warn_high / warn_low / high / low / rate
+    thresholds: Tuple[Tuple[str, float], ...]  # (级别, 阈值)，从最严重到最轻
+    rate_period: Optional[timedelta] = None
+    metric_key: Optional[str] = None
+
+    @property
+    def key(self) -> EpisodeKey:
+        return self.alert_type, self.rule_id or 0
+
+    @property
+    def is_rate(self) -> bool:
+        return self.alert_type == "rate"
+
+    def check(self, observed: float) -> Optional[Tuple[str, float]]:
+        """返回 (级别, 阈值)，未越限时为 None；rate 规则的 observed 为周期内变化量。"""
+        for level, threshold in self.thresholds:
+            if self.alert_type in ("low", "warn_low"):
+                hit = observed < threshold
+            elif self.is_rate:
+                hit = abs(observed) > threshold
+            else:
+                hit = observed > threshold
+            if hit:
+                return level, threshold
+        return None
+
+
+@dataclass
+class MetricInfo:
+    metric_id: int
+    sensor_id: int
+    sensor_type_id: Optional[int]
+    metric_key: str
+    label: str
+    unit: Optional[str]
+    warn_low: Optional[float]
+    warn_high: Optional[float]
+    is_simulated: bool
+
+
+@dataclass
+class Episode:
+    rule: Optional[Rule]
+    level: str
+    value: float
+    threshold: float
+    reading_time: datetime
+    alert: Optional[Alert] = None  # 已存在的 active 告警
+    changed: bool = False
+
+
+@dataclass
+class PendingState:
+    """一个事务内评估产生、尚未提交的水位线与 rate 窗口，以及是否有告警状态变化。"""
+
+    watermarks: Dict[int, datetime] = field(default_factory=dict)
+    windows: Dict[int, Deque[Point]] = field(default_factory=dict)
+    changed: bool = False
+
+
+@dataclass
+class EvaluationResult:
+    evaluated: int = 0
+    raised: int = 0
+    updated: int = 0
+    resolved: int = 0
+    # 状态有变化的告警（ORM 对象或待插入的行），提交后推送
+    changes: List[Union[Alert, Dict[str, Any]]] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(evaluated=self.evaluated, raised=self.raised, updated=self.updated, resolved=self.resolved)
+
+
+def rule_from_row(row: AlertRule) -> Optional[Rule]:
+    thresholds = tuple(
+        (level, value)
+        for level, value in (
+            ("critical", row.critical_threshold),
+            ("alert", row.alert_threshold),
+            ("warning", row.warning_threshold),
+        )
+        if value is not None
+    )
+    rule_type = row.rule_type or ("high" if thresholds else "rate")
+    if rule_type == "rate":
+        if row.rate_threshold is None or not row.rate_period_hours:
+            return None
+        period = timedelta(hours=row.rate_period_hours)
+        return Rule(row.id, "rate", (("warning", row.rate_threshold),), period, row.metric_key)
+    if rule_type not in ("high", "low") or not thresholds:
+        return None
+    return Rule(row.id, rule_type, thresholds, metric_key=row.metric_key)
+
+
+class AlertEvaluator:
+    def __init__(self, rules_ttl_seconds: float = RULES_TTL_SECONDS):
+        self.rules_ttl_seconds = rules_ttl_seconds
+        self._rules_loaded_at = float("-inf")
+        self._rules_by_sensor: Dict[int, List[Rule]] = {}
+        self._rules_by_type: Dict[int, List[Rule]] = {}
+        self._global_rules: List[Rule] = []
+        self._metrics: Dict[int, MetricInfo] = {}
+        # 每个有 rate 规则的指标保留最长周期内的 (时间, 值)
+        self._windows: Dict[int, Deque[Point]] = {}
+        self._watermarks: Dict[int, datetime] = {}
+        self.totals = EvaluationResult()
+
+    def invalidate(self) -> None:
+        """规则或指标阈值变更后调用，下次评估时重新加载。"""
+        self._rules_loaded_at = float("-inf")
+        self._metrics.clear()
+
+    def _pending(self, session: AsyncSession) -> PendingState:
+        states: Dict[int, Tuple[AlertEvaluator, PendingState]] = session.info.setdefault(STATE_KEY, {})
+        if id(self) not in states:
+            states[id(self)] = (self, PendingState())
+        return states[id(self)][1]
+
+    def _watermarks_for(self, session: AsyncSession) -> Dict[int, datetime]:
+        """已提交的水位线叠加本事务暂存的水位线。"""
+        return {**self._watermarks, **self._pending(session).watermarks}
+
+    def _window(self, pending: PendingState, metric_id: int) -> Deque[Point]:
+        """本事务使用的窗口副本，回滚时丢弃。"""
+        if metric_id not in pending.windows:
+            pending.windows[metric_id] = deque(self._windows.get(metric_id, ()))
+        return pending.windows[metric_id]
+
+    def _commit_state(self, pending: PendingState) -> None:
+        for metric_id, t in pending.watermarks.items():
+            current = self._watermarks.get(metric_id)
+            if current is None or t > current:
+                self._watermarks[metric_id] = t
+        self._windows.update(pending.windows)
+
+    async def _load_rules(self, session: AsyncSession) -> None:
+        if time.monotonic() - self._rules_loaded_at < self.rules_ttl_seconds:
+            return
+        by_sensor: Dict[int, List[Rule]] = {}
+        by_type: Dict[int, List[Rule]] = {}
+        global_rules: List[Rule] = []
+        for row in (await session.scalars(select(AlertRule).where(AlertRule.enabled.is_(True)))).all():
+            rule = rule_from_row(row)
+            if rule is None:
+                continue
+            if row.sensor_id is not None:
+                by_sensor.setdefault(row.sensor_id, []).append(rule)
+            elif row.sensor_type_id is not None:
+                by_type.setdefault(row.sensor_type_id, []).append(rule)
+            else:
+                global_rules.append(rule)
+        self._rules_by_sensor, self._rules_by_type, self._global_rules = by_sensor, by_type, global_rules
+        self._rules_loaded_at = time.monotonic()
+
+    async def _load_metrics(self, session: AsyncSession, metric_ids: Iterable[int]) -> None:
+        missing = [m for m in metric_ids if m not in self._metrics]
+        if not missing:
+            return
+        stmt = select(SensorMetric, Sensor).join(SensorMetric.sensor).where(SensorMetric.id.in_(missing))
+        for metric, sensor in (await session.execute(stmt)).all():
+            self._metrics[metric.id] = MetricInfo(
+                metric_id=metric.id,
+                sensor_id=sensor.id,
+                sensor_type_id=sensor.sensor_type_id,
+                metric_key=metric.metric_key,
+                label=f"{sensor.point_code} {metric.name_cn or metric.metric_key}",
+                unit=metric.unit,
+                warn_low=metric.warn_low,
+                warn_high=metric.warn_high,
+                is_simulated=sensor.is_simulated,
+            )
+
+    def rules_for(self, info: MetricInfo) -> List[Rule]:
+        rules = []
+        if info.warn_high is not None:
+            rules.append(Rule(None, "warn_high", (("warning", info.warn_high),)))
+        if info.warn_low is not None:
+            rules.append(Rule(None, "warn_low", (("warning", info.warn_low),)))
+        explicit = (
+            self._rules_by_sensor.get(info.sensor_id, [])
+            + self._rules_by_type.get(info.sensor_type_id, [])
+            + self._global_rules
+        )
+        rules.extend(r for r in explicit if r.metric_key is None or r.metric_key == info.metric_key)
+        return rules
+
+    async def _load_watermarks(self, session: AsyncSession, metric_ids: List[int]) -> Dict[int, datetime]:
+        stmt = select(SensorLatestValue.metric_id, SensorLatestValue.reading_time).where(
+            SensorLatestValue.metric_id.in_(metric_ids)
+        )
+        marks = {m: t for m, t in (await session.execute(stmt)).all() if t is not None}
+        for metric_id, t in self._watermarks_for(session).items():
+            if metric_id in marks and t > marks[metric_id]:
+                marks[metric_id] = t
+        return marks
+
+    async def _preload_windows(
+        self, session: AsyncSession, series: Dict[int, List[Point]], periods: Dict[int, timedelta]
+    ) -> None:
+        """首次见到的 rate 指标：从库里取首个新读数之前一个周期内的历史点（写入本事务的窗口副本）。"""
+        pending = self._pending(session)
+        cold = [m for m in periods if m not in self._windows and m not in pending.windows]
+        for metric_id in periods:
+            self._window(pending, metric_id)
+        if not cold:
+            return
+        lo = min(series[m][0][0] - periods[m] for m in cold)
+        hi = max(series[m][0][0] for m in cold)
+        stmt = (
+            select(SensorReading.metric_id, SensorReading.reading_time, SensorReading.value_num)
+            .where(
+                SensorReading.metric_id.in_(cold),
+                SensorReading.value_num.is_not(None),
+                SensorReading.reading_time >= lo,
+                SensorReading.reading_time < hi,
+            )
+            .order_by(SensorReading.metric_id, SensorReading.reading_time)
+        )
+        for metric_id, t, value in (await session.execute(stmt)).all():
+            first = series[metric_id][0][0]
+            if first - periods[metric_id] <= t < first:
+                pending.windows[metric_id].append((t, value))
+
+    @staticmethod
+    def _change(window: Deque[Point], period: timedelta, t: datetime, value: float) -> Optional[float]:
+        baseline = next((v for pt, v in window if pt >= t - period and pt < t), None)
+        return None if baseline is None else value - baseline
+
+    async def evaluate(
+        self, session: AsyncSession, rows: Iterable[Dict[str, Any]], replay: bool = False
+    ) -> Dict[str, int]:
+        """评估一批新读数（dict，含 metric_id / reading_time / value_num），返回计数。
+
+        replay=True 时不参考 sensor_latest_values 水位线（用于按时间顺序重放历史读数）。
+        """
+        series: Dict[int, List[Point]] = {}
+        for row in rows:
+            if row.get("value_num") is not None and row.get("reading_time") is not None:
+                series.setdefault(row["metric_id"], []).append((row["reading_time"], float(row["value_num"])))
+        if not series:
+            return EvaluationResult().as_dict()
+
+        await self._load_rules(session)
+        await self._load_metrics(session, series)
+        marks = self._watermarks_for(session) if replay else await self._load_watermarks(session, list(series))
+        for metric_id in list(series):
+            mark = marks.get(metric_id)
+            points = sorted(p for p in series[metric_id] if mark is None or p[0] > mark)
+            if points and metric_id in self._metrics:
+                series[metric_id] = points
+            else:
+                del series[metric_id]
+        if not series:
+            return EvaluationResult().as_dict()
+
+        rules = {m: self.rules_for(self._metrics[m]) for m in series}
+        periods = {
+            m: max(r.rate_period for r in rs if r.is_rate) for m, rs in rules.items() if any(r.is_rate for r in rs)
+        }
+        await self._preload_windows(session, series, periods)
+        active_stmt = select(Alert).where(Alert.metric_id.in_(list(series)), Alert.status == "active")
+        active: Dict[int, Dict[EpisodeKey, Alert]] = {}
+        for alert in (await session.scalars(active_stmt)).all():
+            active.setdefault(alert.metric_id, {})[(alert.alert_type, alert.rule_id or 0)] = alert
+
+        result = EvaluationResult()
+        pending = self._pending(session)
+        inserts: List[Dict[str, Any]] = []
+        upserts: List[Dict[str, Any]] = []
+        for metric_id, points in series.items():
+            period = periods.get(metric_id)
+            self._evaluate_metric(
+                self._metrics[metric_id],
+                points,
+                rules[metric_id],
+                period,
+                self._window(pending, metric_id) if period is not None else None,
+                active.get(metric_id, {}),
+                inserts,
+                upserts,
+                result,
+            )
+            pending.watermarks[metric_id] = points[-1][0]
+            result.evaluated += len(points)
+
+        if inserts:
+            await session.execute(sa_insert(Alert), inserts)
+        if upserts:
+            stmt = insert(Alert).values(upserts)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Alert.metric_id, Alert.alert_type, func.coalesce(Alert.rule_id, literal_column("0"))],
+                index_where=text("status = 'active'"),
+                set_={col: stmt.excluded[col] for col in UPSERT_COLUMNS},
+                where=Alert.reading_time <= stmt.excluded.reading_time,
+            )
+            await session.execute(stmt)
+        await session.flush()
+        publish_on_commit(session, "alerts", map(alert_event, result.changes))
+        if result.changes:
+            self._pending(session).changed = True
+        for name in ("evaluated", "raised", "updated", "resolved"):
+            setattr(self.totals, name, getattr(self.totals, name) + getattr(result, name))
+        return result.as_dict()
+
+    def _evaluate_metric(
+        self,
+        info: MetricInfo,
+        points: List[Point],
+        rules: List[Rule],
+        period: Optional[timedelta],
+        window: Optional[Deque[Point]],
+        active: Dict[EpisodeKey, Alert],
+        inserts: List[Dict[str, Any]],
+        upserts: List[Dict[str, Any]],
+        result: EvaluationResult,
+    ) -> None:
+        by_key = {rule.key: rule for rule in rules}
+        episodes: Dict[EpisodeKey, Episode] = {}
+        for key, alert in active.items():
+            rule = by_key.get(key)
+            episode = Episode(rule, alert.alert_level, alert.value, alert.threshold, alert.reading_time, alert)
+            if episode.rule is None:
+                # 规则已删除/停用或阈值被清空：直接结束
+                self._close(info, episode, points[0][0], inserts, result)
+                continue
+            episodes[key] = episode
+
+        for t, value in points:
+            if window is not None:
+                while window and window[0][0] < t - period:
+                    window.popleft()
+            for rule in rules:
+                observed = value
+                if rule.is_rate:
+                    observed = self._change(window, rule.rate_period, t, value)
+                    if observed is None:
+                        continue
+                hit = rule.check(observed)
+                episode = episodes.get(rule.key)
+                if hit is not None:
+                    level, threshold = hit
+                    if episode is None:
+                        episodes[rule.key] = Episode(rule, level, observed, threshold, t, changed=True)
+                        continue
+                    if LEVEL_RANK[level] >= LEVEL_RANK.get(episode.level, 0):
+                        episode.level, episode.threshold = level, threshold
+                    episode.value, episode.reading_time, episode.changed = observed, t, True
+                elif episode is not None:
+                    self._close(info, episode, t, inserts, result)
+                    del episodes[rule.key]
+            if window is not None:
+                window.append((t, value))
+
+        for episode in episodes.values():
+            if not episode.changed:
+                continue
+            if episode.alert is not None:
+                self._apply(info, episode, episode.alert)
+                result.updated += 1
+                result.changes.append(episode.alert)
+            else:
+                upserts.append(self._row(info, episode, "active"))
+                result.raised += 1
+                result.changes.append(upserts[-1])
+
+    def _close(
+        self,
+        info: MetricInfo,
+        episode: Episode,
+        resolved_at: datetime,
+        inserts: List[Dict[str, Any]],
+        result: EvaluationResult,
+    ) -> None:
+        if episode.alert is not None:
+            if episode.changed:
+                self._apply(info, episode, episode.alert)
+            episode.alert.status = "resolved"
+            episode.alert.resolved_at = resolved_at.isoformat()
+            result.changes.append(episode.alert)
+        else:
+            inserts.append({**self._row(info, episode, "resolved"), "resolved_at": resolved_at.isoformat()})
+            result.raised += 1
+            result.changes.append(inserts[-1])
+        result.resolved += 1
+
+    def _message(self, info: MetricInfo, episode: Episode) -> str:
+        unit = info.unit or ""
+        alert_type = episode.rule.alert_type if episode.rule else ""
+        if alert_type in ("low", "warn_low"):
+            return f"{info.label} 低于下限: {episode.value:g}{unit}"
+        if alert_type == "rate":
+            hours = episode.rule.rate_period.total_seconds() / 3600
+            return f"{info.label} {hours:g}h 内变化 {episode.value:+g}{unit}"
+        return f"{info.label} 超限: {episode.value:g}{unit}"
+
+    def _apply(self, info: MetricInfo, episode: Episode, alert: Alert) -> None:
+        alert.alert_level = episode.level
+        alert.value = episode.value
+        alert.threshold = episode.threshold
+        alert.reading_time = episode.reading_time
+        alert.message = self._message(info, episode)
+
+    def _row(self, info: MetricInfo, episode: Episode, status: str) -> Dict[str, Any]:
+        return dict(
+            sensor_id=info.sensor_id,
+            metric_id=info.metric_id,
+            rule_id=episode.rule.rule_id,
+            alert_level=episode.level,
+            alert_type=episode.rule.alert_type,
+            message=self._message(info, episode),
+            value=episode.value,
+            threshold=episode.threshold,
+            reading_time=episode.reading_time,
+            status=status,
+            resolved_at=None,
+            is_simulated=info.is_simulated,
+        )
+
+    def reset(self, metric_ids: Optional[Iterable[int]] = None) -> None:
+        """清空滑动窗口与水位线（重放前调用）。"""
+        if metric_ids is None:
+            self._windows.clear()
+            self._watermarks.clear()
+            return
+        for metric_id in metric_ids:
+            self._windows.pop(metric_id, None)
+            self._watermarks.pop(metric_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.totals.as_dict(),
+            "metrics_cached": len(self._metrics),
+            "rate_windows": len(self._windows),
+            "rules": sum(map(len, self._rules_by_sensor.values()))
+            + sum(map(len, self._rules_by_type.values()))
+            + len(self._global_rules),
+        }
+
+
+alert_evaluator = AlertEvaluator()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    changed = False
+    for evaluator, pending in (session.info.pop(STATE_KEY, None) or {}).values():
+        evaluator._commit_state(pending)
+        changed = changed or pending.changed
+    if changed:
+        # 告警新建/更新/解除后，/api/warnings 与 /api/stats 的缓存结果已过期
+        for route in CACHED_ROUTES:
+            invalidate_cache(route)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_transaction_end(session: Session, transaction) -> None:
+    # 回滚 / 未提交即关闭：丢弃暂存的水位线与窗口
+    if transaction.parent is None:
+        session.info.pop(STATE_KEY, None)
+
+
+def alert_event(alert: Union[Alert, Dict[str, Any]]) -> Dict[str, Any]:
+    """``alerts`` 推送事件；新插入的行没有 id。"""
+    get = alert.get if isinstance(alert, dict) else lambda name: getattr(alert, name, None)
+    reading_time = get("reading_time")
+    return {
+        "id": get("id"),
+        "sensor_id": get("sensor_id"),
+        "metric_id": get("metric_id"),
+        "rule_id": get("rule_id"),
+        "alert_type": get("alert_type"),
+        "level": get("alert_level"),
+        "color": LEVEL_COLORS.get(get("alert_level")),
+        "status": get("status"),
+        "value": get("value"),
+        "threshold": get("threshold"),
+        "message": get("message"),
+        "reading_time": reading_time.isoformat() if reading_time else None,
+        "resolved_at": get("resolved_at"),
+        "is_simulated": get("is_simulated"),
+    }
+
+
+def active_alerts_stmt(is_simulated: Optional[bool] = None) -> Select:
+    """(Alert, Sensor, SensorMetric) 的 active 告警，按触发读数时间倒序。"""
+    stmt = (
+        select(Alert, Sensor, SensorMetric)
+        .join(Sensor, Sensor.id == Alert.sensor_id)
+        .join(SensorMetric, SensorMetric.id == Alert.metric_id)
+        .where(Alert.status == "active")
+        .order_by(Alert.reading_time.desc(), Alert.id.desc())
+    )
+    if is_simulated is not None:
+        stmt = stmt.where(Alert.is_simulated == is_simulated)
+    return stmt
+
+
+def count_alerts_since_stmt(since: datetime, is_simulated: Optional[bool] = None) -> Select:
+    """since 之后触发的告警条数（含已恢复的）。"""
+    stmt = select(func.count()).select_from(Alert).where(Alert.reading_time >= since)
+    if is_simulated is not None:
+        stmt = stmt.where(Alert.is_simulated == is_simulated)
+    return stmt
@@ -0,0 +1,366 @@
+"""
+实时推送：单一生产者、多订阅者的扇出 broker，供 ``/api/stream``（SSE）与 ``/api/stream/ws`` 使用。
+
+- 主题：``readings``（本批实际更新了 ``sensor_latest_values`` 的指标最新值）与
+  ``alerts``（告警新建 / 更新 / 解除）；
+- 写入方在事务内调用 ``publish_on_commit(session, topic, items)`` 暂存事件：提交成功后才发布，
+  回滚或未提交即关闭会话时丢弃；每条消息只序列化一次，各订阅者共享同一份编码；
+- 每个订阅者一个有界队列（``stream_queue_size``）：``drop_oldest`` 策略下队列满时丢弃最旧的消息并计数，
+  下一条消息前先给该客户端发 ``resync`` 事件，提示重新拉取快照；``close`` 策略直接断开慢客户端；
+- 后端：``memory`` 只在本进程内扇出；``postgres`` 在提交的同一事务内 ``pg_notify``，每个 worker
+  用一条专用连接 LISTEN 后在本进程扇出，适用于多 worker、导入脚本与 API 分进程部署。
+  NOTIFY 负载上限 8000 字节，事件按条目拆成多条通知；监听连接断开重连后向所有订阅者发 ``resync``。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+
+logger = logging.getLogger(__name__)
+
+TOPICS = ("readings", "alerts")
+POLICIES = ("drop_oldest", "close")
+# pg_notify 负载上限为 8000 字节，留出信封余量
+NOTIFY_PAYLOAD_LIMIT = 7800
+RECONNECT_SECONDS = (1.0, 2.0, 5.0, 10.0)
+# session.info 中暂存待发布事件的键
+STAGED_KEY = "broker_events"
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+@dataclass(frozen=True)
+class Message:
+    seq: int
+    topic: str
+    encoded: str  # JSON 数组，所有订阅者共享
+
+
+class SubscriptionClosed(Exception):
+    """订阅已被 broker 关闭（close 策略下的慢客户端，或 broker 停止）。"""
+
+
+class Subscription:
+    def __init__(self, topics: Optional[FrozenSet[str]], maxsize: int, policy: str):
+        self.topics = topics
+        self.policy = policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.delivered = 0
+        self.closed = False
+        self._reported = 0
+
+    def wants(self, topic: str) -> bool:
+        return self.topics is None or topic in self.topics
+
+    def offer(self, message: Message) -> bool:
+        """非阻塞投递；返回 False 表示丢弃了消息（队列满）。"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+        self.dropped += 1
+        if self.policy == "close":
+            self.close()
+        else:
+            self.queue.get_nowait()
+            self.queue.put_nowait(message)
+        return False
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        # 唤醒等待中的消费者
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    def take_dropped(self) -> int:
+        """上次调用以来新丢弃的消息数（>0 时应先发 resync）。"""
+        count, self._reported = self.dropped - self._reported, self.dropped
+        return count
+
+    async def next(self, timeout: float) -> Optional[Message]:
+        """下一条消息；timeout 秒内没有消息时返回 None（调用方发心跳）。"""
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            if self.closed:
+                raise SubscriptionClosed()
+            return None
+        if message is None:
+            raise SubscriptionClosed()
+        self.delivered += 1
+        return message
+
+
+class MemoryBackend:
+    """进程内后端：提交后直接在本进程扇出。"""
+
+    name = "memory"
+    transactional = False
+
+    def __init__(self) -> None:
+        self.broker: Optional[Broker] = None
+
+    async def start(self, broker: "Broker") -> None:
+        self.broker = broker
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, topic: str, items: List[Any]) -> None:
+        self.broker.dispatch(topic, items)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name}
+
+
+class PostgresNotifyBackend:
+    """LISTEN/NOTIFY 后端：写入方在事务内 pg_notify，每个进程一条专用连接 LISTEN 后本地扇出。"""
+
+    name = "postgres"
+    transactional = True
+
+    def __init__(self, database_url: str, channel: str):
+        # asyncpg 直连，不占用 SQLAlchemy 连接池
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self.broker: Optional[Broker] = None
+        self.conn = None
+        self.connected = False
+        self.reconnects = 0
+        self.received = 0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lost: Optional[asyncio.Event] = None
+        self._lock = asyncio.Lock()
+
+    def payloads(self, topic: str, items: List[Any]) -> Iterator[str]:
+        """按条目拆分成不超过 NOTIFY_PAYLOAD_LIMIT 字节的 JSON 负载。"""
+        head = f'{{"topic":{_dumps(topic)},"items":['
+        size, chunk = len(head.encode()), []
+        for item in items:
+            encoded = _dumps(item)
+            item_size = len(encoded.encode()) + 1
+            if size + item_size + 2 > NOTIFY_PAYLOAD_LIMIT and chunk:
+                yield head + ",".join(chunk) + "]}"
+                size, chunk = len(head.encode()), []
+            if len(head.encode()) + item_size + 2 > NOTIFY_PAYLOAD_LIMIT:
+                logger.warning("stream event too large for NOTIFY, dropped: topic=%s", topic)
+                continue
+            chunk.append(encoded)
+            size += item_size
+        if chunk:
+            yield head + ",".join(chunk) + "]}"
+
+    def stage(self, session: Session, events: List[Tuple[str, List[Any]]]) -> None:
+        # 在 before_commit 中执行：NOTIFY 随事务提交投递，回滚则一并撤销
+        stmt = text("SELECT pg_notify(:channel, :payload)")
+        for topic, items in events:
+            for payload in self.payloads(topic, items):
+                session.execute(stmt, {"channel": self.channel, "payload": payload})
+
+    async def publish(self, topic: str, items: List[Any]) -> None:
+        import asyncpg
+
+        if not self.connected:
+            conn = await asyncpg.connect(self.dsn)
+            try:
+                await self._notify(conn, topic, items)
+            finally:
+                await conn.close()
+            return
+        # 监听连接同一时刻只能执行一条语句
+        async with self._lock:
+            await self._notify(self.conn, topic, items)
+
+    async def _notify(self, conn, topic: str, items: List[Any]) -> None:
+        for payload in self.payloads(topic, items):
+            await conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    def _on_notify(self, conn, pid, channel, payload: str) -> None:
+        self.received += 1
+        try:
+            message = json.loads(payload)
+            self.broker.dispatch(message["topic"], message["items"])
+        except (ValueError, KeyError, TypeError) as exc:
+            logger.warning("invalid stream notification: %s", exc)
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        delays = itertools.chain(RECONNECT_SECONDS, itertools.repeat(RECONNECT_SECONDS[-1]))
+        first = True
+        while True:
+            try:
+                self.conn = await asyncpg.connect(self.dsn)
+                self._lost = asyncio.Event()
+                self.conn.add_termination_listener(lambda conn: self._lost.set())
+                await self.conn.add_listener(self.channel, self._on_notify)
+                self.connected, self.last_error = True, None
+                delays = itertools.chain(RECONNECT_SECONDS, itertools.repeat(RECONNECT_SECONDS[-1]))
+                if not first:
+                    # 断线期间的通知已丢失
+                    self.reconnects += 1
+                    self.broker.resync_all()
+                first = False
+                await self._lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # 数据库不可达：按退避间隔重连
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                first = False
+            self.connected = False
+            await asyncio.sleep(next(delays))
+
+    async def start(self, broker: "Broker") -> None:
+        self.broker = broker
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.conn is not None and not self.conn.is_closed():
+            await self.conn.close()
+        self.connected = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "channel": self.channel,
+            "connected": self.connected,
+            "received": self.received,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+
+class Broker:
+    def __init__(self, backend=None, queue_size: int = 256, policy: str = "drop_oldest"):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown drop policy: {policy}")
+        self.backend = backend or MemoryBackend()
+        self.queue_size = queue_size
+        self.policy = policy
+        self.subscribers: Set[Subscription] = set()
+        self._seq = itertools.count(1)
+        self.counters: Counter = Counter()
+
+    async def start(self) -> None:
+        await self.backend.start(self)
+
+    async def stop(self) -> None:
+        for sub in list(self.subscribers):
+            sub.close()
+        await self.backend.stop()
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None) -> Subscription:
+        sub = Subscription(frozenset(topics) if topics is not None else None, self.queue_size, self.policy)
+        self.subscribers.add(sub)
+        self.counters["subscribed"] += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self.subscribers.discard(sub)
+        sub.close()
+
+    def dispatch(self, topic: str, items: List[Any]) -> Optional[Message]:
+        """本进程扇出（须在事件循环线程调用）；没有订阅者时不编码。"""
+        targets = [sub for sub in self.subscribers if sub.wants(topic)]
+        self.counters["published"] += 1
+        if not targets:
+            return None
+        message = Message(next(self._seq), topic, _dumps(items))
+        for sub in targets:
+            if not sub.offer(message):
+                self.counters["dropped"] += 1
+                if sub.closed:
+                    self.subscribers.discard(sub)
+                    self.counters["closed_slow"] += 1
+        return message
+
+    def resync_all(self) -> None:
+        """通知所有订阅者重新拉取快照（上游事件可能丢失）。"""
+        for sub in self.subscribers:
+            sub.dropped += 1
+
+    async def publish(self, topic: str, items: Iterable[Any]) -> None:
+        """事务之外直接发布。"""
+        items = list(items)
+        if items:
+            await self.backend.publish(topic, items)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.stats(),
+            "policy": self.policy,
+            "queue_size": self.queue_size,
+            "subscribers": len(self.subscribers),
+            "queued": sum(sub.queue.qsize() for sub in self.subscribers),
+            **{name: self.counters[name] for name in ("subscribed", "published", "dropped", "closed_slow")},
+        }
+
+
+def publish_on_commit(session, topic: str, items: Iterable[Any]) -> None:
+    """在会话中暂存事件（AsyncSession 或 Session），提交成功后发布。"""
+    items = list(items)
+    if items:
+        session.info.setdefault(STAGED_KEY, []).append((topic, items))
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session: Session) -> None:
+    if broker.backend.transactional and session.info.get(STAGED_KEY):
+        broker.backend.stage(session, session.info.pop(STAGED_KEY))
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    for topic, items in session.info.pop(STAGED_KEY, None) or ():
+        broker.dispatch(topic, items)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_transaction_end(session: Session, transaction) -> None:
+    # 回滚 / 未提交即关闭：丢弃暂存事件
+    if transaction.parent is None:
+        session.info.pop(STAGED_KEY, None)
+
+
+def _create_broker() -> Broker:
+    from app.config import get_settings
+
+    settings = get_settings()
+    if settings.stream_backend == "postgres":
+        backend = PostgresNotifyBackend(settings.database_url, settings.stream_channel)
+    elif settings.stream_backend == "memory":
+        backend = MemoryBackend()
+    else:
+        raise ValueError(f"unknown stream backend: {settings.stream_backend}")
+    return Broker(backend, queue_size=settings.stream_queue_size, policy=settings.stream_drop_policy)
+
+
+broker = _create_broker()
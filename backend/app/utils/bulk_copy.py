@@ -0,0 +1,122 @@
+"""
+基于 PostgreSQL COPY 的批量写入（sensor_readings / source_rows）。
+
+流程：asyncpg ``copy_records_to_table`` 写入会话级临时表，再用一条
+``INSERT ... SELECT ... ON CONFLICT DO NOTHING`` 合并进目标表，
+避免逐条编译 SQL、绑定参数的开销。与 SQLAlchemy 会话共用同一连接和事务。
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+READING_STAGE = "_stage_sensor_readings"
+SOURCE_ROW_STAGE = "_stage_source_rows"
+
+READING_COLUMNS = (
+    "sensor_id",
+    "metric_id",
+    "reading_time",
+    "value_num",
+    "value_text",
+    "unit",
+    "quality_flag",
+    "remark",
+    "source_file_id",
+    "is_simulated",
+)
+
+SOURCE_ROW_COLUMNS = ("ingest_file_id", "reading_time", "raw_values")
+
+READING_STAGE_DDL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {READING_STAGE} (
+    sensor_id integer,
+    metric_id integer,
+    reading_time timestamp,
+    value_num double precision,
+    value_text text,
+    unit varchar(50),
+    quality_flag varchar(20),
+    remark text,
+    source_file_id integer,
+    is_simulated boolean
+) ON COMMIT DELETE ROWS
+"""
+
+SOURCE_ROW_STAGE_DDL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {SOURCE_ROW_STAGE} (
+    ingest_file_id integer,
+    reading_time timestamp,
+    raw_values json
+) ON COMMIT DELETE ROWS
+"""
+
+
+def _to_record(obj: Dict[str, Any], columns: Sequence[str]) -> tuple:
+    record = []
+    for col in columns:
+        value = obj.get(col)
+        if col == "raw_values" and value is not None:
+            value = json.dumps(value, ensure_ascii=False, default=str)
+        record.append(value)
+    return tuple(record)
+
+
+async def _copy_and_merge(
+    session: AsyncSession,
+    stage: str,
+    stage_ddl: str,
+    target: str,
+    conflict: str,
+    objs: List[Dict[str, Any]],
+    columns: Sequence[str],
+) -> int:
+    if not objs:
+        return 0
+    await session.execute(text(stage_ddl))
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        stage,
+        records=[_to_record(obj, columns) for obj in objs],
+        columns=list(columns),
+    )
+    cols = ", ".join(columns)
+    result = await session.execute(
+        text(f"INSERT INTO {target} ({cols}) SELECT {cols} FROM {stage} ON CONFLICT ({conflict}) DO NOTHING")
+    )
+    await session.execute(text(f"TRUNCATE {stage}"))
+    return max(result.rowcount or 0, 0)
+
+
+async def copy_readings(
+    session: AsyncSession, objs: List[Dict[str, Any]], columns: Sequence[str] = READING_COLUMNS
+) -> int:
+    """COPY 到临时表后合并进 sensor_readings，返回实际插入行数（冲突跳过的不计）。"""
+    return await _copy_and_merge(
+        session,
+        READING_STAGE,
+        READING_STAGE_DDL,
+        "sensor_readings",
+        "metric_id, reading_time, source_file_id",
+        objs,
+        columns,
+    )
+
+
+async def copy_source_rows(session: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+    """COPY 到临时表后合并进 source_rows，返回实际插入行数。"""
+    return await _copy_and_merge(
+        session,
+        SOURCE_ROW_STAGE,
+        SOURCE_ROW_STAGE_DDL,
+        "source_rows",
+        "ingest_file_id, reading_time",
+        rows,
+        SOURCE_ROW_COLUMNS,
+    )
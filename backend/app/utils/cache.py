@@ -0,0 +1,135 @@
+"""
+进程内响应缓存：按路由 + 查询参数缓存看板接口的返回值。
+
+- TTL 与容量来自 Settings（cache_ttl_seconds / cache_max_entries），cache_enabled=false 时直通；
+- 同一 key 的并发未命中只执行一次加载（single-flight），其余请求等待同一结果；
+  共享的加载任务自行打开只读会话，不复用首个请求的会话依赖（该请求断开时会话会被关闭并归还连接池）；
+- 写入方（ExcelImporter、种子脚本）写库后调用 ``invalidate_cache``；加载期间发生失效的结果不会写回；
+- 命中/未命中/合并/淘汰计数通过 ``/api/cache/stats`` 暴露，便于评估容量与 TTL。
+
+注意：缓存是进程内的，独立进程中的导入脚本无法直接清理 API 进程的缓存，
+此时依赖 TTL 自然过期，或调用 ``POST /api/cache/invalidate``。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import replica_router
+
+
+class ResponseCache:
+    def __init__(self, ttl_seconds: float, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get_or_set(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        generation = self._generation
+        task = asyncio.ensure_future(loader())
+        self._inflight[key] = task
+        try:
+            value = await asyncio.shield(task)
+        finally:
+            self._inflight.pop(key, None)
+        if generation == self._generation:
+            self._store(key, value)
+        return value
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        if len(self._entries) >= self.max_entries:
+            for k in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                del self._entries[k]
+                self.evictions += 1
+        while len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+            self.evictions += 1
+        self._entries[key] = (now + self.ttl_seconds, value)
+
+    def invalidate(self, route: Optional[str] = None) -> int:
+        """清理全部缓存或某个路由的缓存，返回清理条目数。"""
+        self._generation += 1
+        self.invalidations += 1
+        if route is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        keys = [k for k in self._entries if isinstance(k, tuple) and k and k[0] == route]
+        for k in keys:
+            del self._entries[k]
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+_settings = get_settings()
+response_cache = ResponseCache(_settings.cache_ttl_seconds, _settings.cache_max_entries)
+
+
+def invalidate_cache(route: Optional[str] = None) -> int:
+    """写入路径的失效钩子：导入/种子/实时写入完成后调用。"""
+    return response_cache.invalidate(route)
+
+
+def cached(route: str):
+    """缓存 FastAPI 路由的返回值，key 为 (route, 排序后的查询参数)；未命中时用独立的只读会话替换 AsyncSession 依赖。"""
+
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not _settings.cache_enabled:
+                return await func(*args, **kwargs)
+            params = tuple(sorted((k, v) for k, v in kwargs.items() if not isinstance(v, AsyncSession)))
+            session_args = [k for k, v in kwargs.items() if isinstance(v, AsyncSession)]
+
+            async def load():
+                if not session_args:
+                    return await func(*args, **kwargs)
+                factory = await replica_router.session_factory()
+                async with factory() as session:
+                    return await func(*args, **{**kwargs, **{k: session for k in session_args}})
+
+            return await response_cache.get_or_set((route, params), load)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,362 @@
+"""
+IoT 设备模拟器：按 ``simulated_devices.freq_sec`` 周期为每台设备生成读数，经 ``BatchedReadingWriter`` 写入。
+
+- 调度：单个哈希时间轮（``TimerWheel``），每个 tick 只处理到期槽位中的设备，数千台设备共用一个协程；
+  首次触发在一个周期内随机错开，避免所有设备同一时刻上报；
+- 信号：水位/流量为均值回归的缓慢漂移 + 噪声，温度叠加日变化正弦，雨量为随机降雨过程
+  （开始概率 + 指数衰减的雨强），闸门状态偶尔切换；每台设备独立的随机数种子，结果可复现；
+- ``time_scale`` > 1 时模拟时钟按倍速推进（读数时间与上报周期同比压缩），用于压测；
+- 设备映射：``station_id`` 对应已有测点（如种子数据的 hyd_001）时写入该测点，否则以 device_id 建模拟测点；
+  metric 由设备的 ``metrics``（waterLevel -> water_level）逐个建立，读数来源为测点的实时来源。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import SimulatedDevice
+from app.utils.dimension_cache import DimensionCache
+from app.utils.reading_writer import BatchedReadingWriter, ensure_live_sources
+
+
+# metric_key -> (名称, 单位, 测点类型)
+METRIC_PROFILES: Dict[str, Tuple[str, Optional[str], str]] = {
+    "water_level": ("水位", "m", "water_level"),
+    "flow": ("流量", "m³/s", "water_level"),
+    "rainfall": ("降雨量", "mm", "rain"),
+    "temperature": ("温度", "℃", "temperature"),
+    "gate_status": ("闸门状态", None, "iot_terminal"),
+}
+SYNTHETIC_METRICS = (["waterLevel", "flow"], ["rainfall"], ["temperature"], ["waterLevel", "temperature"])
+SYNTHETIC_PREFIX = "sim_load_"
+
+
+def metric_key_of(name: str) -> str:
+    """设备上报的指标名（waterLevel）-> metric_key（water_level）。"""
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name).lower()
+
+
+# --- 信号 ---
+
+
+class DriftSignal:
+    """均值回归随机游走 + 白噪声（水位、流量等缓变量）。"""
+
+    def __init__(self, rng: random.Random, mean: float, drift: float, noise: float, reversion: float = 0.02):
+        self.rng, self.mean, self.drift, self.noise, self.reversion = rng, mean, drift, noise, reversion
+        self.level = mean + rng.gauss(0, drift * 10)
+
+    def __call__(self, t: datetime) -> float:
+        self.level += self.reversion * (self.mean - self.level) + self.rng.gauss(0, self.drift)
+        return round(self.level + self.rng.gauss(0, self.noise), 3)
+
+
+class DiurnalSignal:
+    """日变化正弦（午后最高）+ 噪声。"""
+
+    def __init__(self, rng: random.Random, mean: float, amplitude: float, noise: float, peak_hour: float = 15.0):
+        self.rng, self.mean, self.amplitude, self.noise, self.peak_hour = rng, mean, amplitude, noise, peak_hour
+
+    def __call__(self, t: datetime) -> float:
+        hour = t.hour + t.minute / 60 + t.second / 3600
+        value = self.mean + self.amplitude * math.cos(2 * math.pi * (hour - self.peak_hour) / 24)
+        return round(value + self.rng.gauss(0, self.noise), 2)
+
+
+class RainSignal:
+    """降雨过程：无雨时每次采样以 start_probability 开始一场雨，雨强按 decay 指数衰减至结束。"""
+
+    def __init__(self, rng: random.Random, start_probability: float, mean_intensity: float, decay: float = 0.85):
+        self.rng, self.start_probability = rng, start_probability
+        self.mean_intensity, self.decay = mean_intensity, decay
+        self.intensity = 0.0
+
+    def __call__(self, t: datetime) -> float:
+        if self.intensity < 0.05:
+            self.intensity = 0.0
+            if self.rng.random() < self.start_probability:
+                self.intensity = self.rng.expovariate(1 / self.mean_intensity)
+        else:
+            self.intensity *= self.decay * self.rng.uniform(0.8, 1.2)
+        return round(self.intensity, 2)
+
+
+class ToggleSignal:
+    """0/1 状态量，每次采样以 probability 切换。"""
+
+    def __init__(self, rng: random.Random, probability: float):
+        self.rng, self.probability = rng, probability
+        self.state = 0.0
+
+    def __call__(self, t: datetime) -> float:
+        if self.rng.random() < self.probability:
+            self.state = 1.0 - self.state
+        return self.state
+
+
+def signal_for(metric_key: str, rng: random.Random) -> Callable[[datetime], float]:
+    if metric_key == "water_level":
+        return DriftSignal(rng, mean=rng.uniform(900, 1200), drift=0.02, noise=0.005)
+    if metric_key == "flow":
+        return DriftSignal(rng, mean=rng.uniform(50, 800), drift=2.0, noise=0.5)
+    if metric_key == "rainfall":
+        return RainSignal(rng, start_probability=0.02, mean_intensity=rng.uniform(2, 8))
+    if metric_key == "temperature":
+        return DiurnalSignal(rng, mean=rng.uniform(8, 22), amplitude=rng.uniform(4, 9), noise=0.3)
+    if metric_key == "gate_status":
+        return ToggleSignal(rng, probability=0.01)
+    return DriftSignal(rng, mean=rng.uniform(10, 100), drift=0.1, noise=0.05)
+
+
+# --- 调度 ---
+
+
+class TimerWheel:
+    """哈希时间轮：到期 tick 对 slots 取模落槽，每次 advance 只扫描当前槽。"""
+
+    def __init__(self, slots: int = 1024):
+        self.slots: List[List[Tuple[int, Any]]] = [[] for _ in range(slots)]
+        self.current = 0
+        self.size = 0
+
+    def schedule(self, item: Any, ticks: int) -> None:
+        due = self.current + max(1, ticks)
+        self.slots[due % len(self.slots)].append((due, item))
+        self.size += 1
+
+    def advance(self) -> List[Any]:
+        """前进一个 tick，返回到期的条目（未到期的多轮条目留在槽中）。"""
+        self.current += 1
+        index = self.current % len(self.slots)
+        slot = self.slots[index]
+        if not slot:
+            return []
+        due = [item for tick, item in slot if tick <= self.current]
+        if len(due) < len(slot):
+            self.slots[index] = [(tick, item) for tick, item in slot if tick > self.current]
+        else:
+            self.slots[index] = []
+        self.size -= len(due)
+        return due
+
+
+@dataclass
+class SimMetric:
+    metric_id: int
+    metric_key: str
+    unit: Optional[str]
+    signal: Callable[[datetime], float]
+
+
+@dataclass
+class DeviceSpec:
+    device_id: str
+    sensor_id: int
+    source_id: int
+    freq_sec: float
+    is_simulated: bool
+    metrics: List[SimMetric] = field(default_factory=list)
+
+
+async def provision_devices(
+    session: AsyncSession, devices: Sequence[SimulatedDevice], seed: int = 0
+) -> List[DeviceSpec]:
+    """为设备建立（或复用）测点、metric 与实时来源，批量创建缺失的维度行。"""
+    dims = DimensionCache(session)
+    await dims.load()
+    facility_id = await dims.ensure_one("facility", dict(code="SIM_FAC", name="模拟设施", is_simulated=True))
+    section_id = await dims.ensure_one(
+        "section",
+        dict(facility_id=facility_id, code="SIM_SEC", name="模拟断面", section_type="simulated", is_simulated=True),
+    )
+    type_codes = sorted({profile[2] for profile in METRIC_PROFILES.values()})
+    type_ids = dict(
+        zip(
+            type_codes,
+            await dims.ensure("sensor_type", [dict(code=c, name=c, unit=None, is_simulated=True) for c in type_codes]),
+        )
+    )
+
+    keys = {d.device_id: [metric_key_of(m) for m in (d.metrics or [])] for d in devices}
+
+    def station_sensor(d: SimulatedDevice) -> Optional[int]:
+        return dims.get("sensor", d.station_id) if d.station_id else None
+
+    sensor_rows = []
+    for d in devices:
+        if station_sensor(d) is not None:
+            continue
+        profile = METRIC_PROFILES.get(keys[d.device_id][0] if keys[d.device_id] else "", (None, None, "iot_terminal"))
+        sensor_rows.append(
+            dict(
+                section_id=section_id,
+                sensor_type_id=type_ids[profile[2]],
+                point_code=d.device_id,
+                install_location_desc=d.name,
+                reading_device=d.protocol,
+                status="active",
+                is_simulated=True,
+            )
+        )
+    if sensor_rows:
+        await dims.ensure("sensor", sensor_rows)
+    sensor_of = {d.device_id: station_sensor(d) or dims.get("sensor", d.device_id) for d in devices}
+
+    metric_rows = []
+    for d in devices:
+        for key in keys[d.device_id]:
+            name, unit, _ = METRIC_PROFILES.get(key, (key, None, ""))
+            metric_rows.append(
+                dict(
+                    sensor_id=sensor_of[d.device_id],
+                    metric_key=key,
+                    name_cn=name,
+                    unit=unit,
+                    data_type="number",
+                    is_simulated=True,
+                )
+            )
+    metric_ids = await dims.ensure("metric", metric_rows) if metric_rows else []
+    metric_of = {(row["sensor_id"], row["metric_key"]): (mid, row["unit"]) for row, mid in zip(metric_rows, metric_ids)}
+
+    sources = await ensure_live_sources(
+        session, {sensor_of[d.device_id]: (d.station_id or d.device_id, d.is_simulated) for d in devices}
+    )
+    await session.commit()
+    dims.commit()
+
+    specs = []
+    for d in devices:
+        rng = random.Random(f"{seed}:{d.device_id}")
+        sensor_id = sensor_of[d.device_id]
+        spec = DeviceSpec(d.device_id, sensor_id, sources[sensor_id], float(d.freq_sec or 60), d.is_simulated)
+        for key in keys[d.device_id]:
+            metric_id, unit = metric_of[(sensor_id, key)]
+            spec.metrics.append(SimMetric(metric_id, key, unit, signal_for(key, rng)))
+        specs.append(spec)
+    return specs
+
+
+async def create_synthetic_devices(session: AsyncSession, count: int, freq_sec: int) -> None:
+    """压测用：补足 count 台 sim_load_* 设备（已存在的跳过）。"""
+    rows = [
+        dict(
+            device_id=f"{SYNTHETIC_PREFIX}{i:05d}",
+            name=f"压测设备-{i:05d}",
+            protocol="simulated",
+            station_id=None,
+            metrics=SYNTHETIC_METRICS[i % len(SYNTHETIC_METRICS)],
+            freq_sec=freq_sec,
+            status="online",
+            is_simulated=True,
+        )
+        for i in range(1, count + 1)
+    ]
+    for i in range(0, len(rows), 1000):
+        stmt = insert(SimulatedDevice).values(rows[i : i + 1000]).on_conflict_do_nothing(index_elements=["device_id"])
+        await session.execute(stmt)
+    await session.commit()
+
+
+async def load_devices(session: AsyncSession, synthetic_only: bool = False) -> List[SimulatedDevice]:
+    """在线（status 非 offline）的模拟设备。"""
+    stmt = select(SimulatedDevice).where(SimulatedDevice.status.is_distinct_from("offline")).order_by(SimulatedDevice.id)
+    if synthetic_only:
+        stmt = stmt.where(SimulatedDevice.device_id.startswith(SYNTHETIC_PREFIX))
+    return list((await session.scalars(stmt)).all())
+
+
+class DeviceSimulator:
+    def __init__(
+        self,
+        writer: BatchedReadingWriter,
+        devices: Sequence[DeviceSpec],
+        tick: float = 0.1,
+        time_scale: float = 1.0,
+        seed: int = 0,
+    ):
+        self.writer = writer
+        self.devices = list(devices)
+        self.tick = tick
+        self.time_scale = time_scale
+        self.wheel = TimerWheel()
+        self.rng = random.Random(seed)
+        self.ticks = 0
+        self.late_ticks = 0
+        self.readings = 0
+        self.started_at: Optional[float] = None
+        self.sim_start = datetime.utcnow()
+
+    def _period(self, device: DeviceSpec) -> int:
+        return max(1, round(device.freq_sec / self.time_scale / self.tick))
+
+    def sim_now(self) -> datetime:
+        elapsed = time.monotonic() - (self.started_at or time.monotonic())
+        now = self.sim_start + timedelta(seconds=elapsed * self.time_scale)
+        # 截到毫秒，与常见终端时间戳精度一致
+        return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+    def _sample(self, devices: List[DeviceSpec], at: datetime) -> List[Dict[str, Any]]:
+        rows = []
+        for device in devices:
+            for metric in device.metrics:
+                rows.append(
+                    dict(
+                        sensor_id=device.sensor_id,
+                        metric_id=metric.metric_id,
+                        reading_time=at,
+                        value_num=metric.signal(at),
+                        unit=metric.unit,
+                        quality_flag="simulated",
+                        source_file_id=device.source_id,
+                        is_simulated=device.is_simulated,
+                    )
+                )
+            self.wheel.schedule(device, self._period(device))
+        return rows
+
+    async def run(self, duration: Optional[float] = None) -> None:
+        """运行 duration 秒（None 表示直到被取消）。落后时连续推进多个 tick 追赶，并计入 late_ticks。"""
+        for device in self.devices:
+            self.wheel.schedule(device, self.rng.randint(1, self._period(device)))
+        self.started_at = start = time.monotonic()
+        while duration is None or time.monotonic() - start < duration:
+            target = start + (self.ticks + 1) * self.tick
+            delay = target - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -self.tick:
+                self.late_ticks += 1
+            self.ticks += 1
+            due = self.wheel.advance()
+            if not due:
+                continue
+            rows = self._sample(due, self.sim_now())
+            self.readings += len(rows)
+            # 写入方缓冲已满时在此等待，模拟器随之降速（计入 writer 的 backpressure_ms）
+            await self.writer.put(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "devices": len(self.devices),
+            "metrics": sum(len(d.metrics) for d in self.devices),
+            "ticks": self.ticks,
+            "late_ticks": self.late_ticks,
+            "readings": self.readings,
+            "readings_per_second": round(self.readings / elapsed, 1) if elapsed else 0.0,
+            "expected_per_second": round(
+                sum(len(d.metrics) * self.time_scale / d.freq_sec for d in self.devices), 1
+            ),
+        }
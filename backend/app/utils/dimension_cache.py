@@ -0,0 +1,120 @@
+"""
+导入器的维度行身份缓存：SensorType / MonitoringFacility / MonitoringSection /
+ChainageCoordinate / Sensor / SensorMetric 的业务键 -> id。
+
+- 首次使用时每类一条 SELECT 预加载全部键（共 6 条），之后命中不再访问数据库；
+- 缺失的行按类批量 ``INSERT ... ON CONFLICT DO NOTHING RETURNING``，
+  因并发写入而冲突、未返回 id 的再用一条 SELECT 补齐；
+- 本事务新建的 id 先记在 pending 中，``commit()`` 后才并入缓存；事务回滚时调用 ``discard_pending()``，
+  避免缓存里留下已不存在的 id。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.facility import ChainageCoordinate, MonitoringFacility, MonitoringSection, SensorType
+from app.models.sensor import Sensor, SensorMetric
+
+
+# kind -> (模型, 业务键列, ON CONFLICT 目标；None 表示任意唯一约束冲突都跳过)
+DIMENSIONS: Dict[str, Tuple[Any, Tuple[str, ...], Optional[Tuple[str, ...]]]] = {
+    "sensor_type": (SensorType, ("code",), ("code",)),
+    "facility": (MonitoringFacility, ("code",), ("code",)),
+    "section": (MonitoringSection, ("facility_id", "code"), ("facility_id", "code")),
+    # 唯一约束还包含可空的偏移/高程列，按 (facility_id, chainage_normalized) 识别
+    "chainage": (ChainageCoordinate, ("facility_id", "chainage_normalized"), None),
+    # 测点按编号全局识别；唯一约束为 (section_id, point_code)
+    "sensor": (Sensor, ("point_code",), ("section_id", "point_code")),
+    "metric": (SensorMetric, ("sensor_id", "metric_key"), ("sensor_id", "metric_key")),
+}
+
+
+class DimensionCache:
+    def __init__(self, session: AsyncSession | None):
+        self.session = session
+        self._ids: Dict[str, Dict[Tuple, int]] = {kind: {} for kind in DIMENSIONS}
+        self._pending: Dict[str, Dict[Tuple, int]] = {kind: {} for kind in DIMENSIONS}
+        self._loaded = False
+        self.queries = 0
+        self.created = 0
+
+    async def load(self) -> None:
+        """预加载全部维度键；同一键有多行时保留 id 最小的一行。"""
+        if self._loaded:
+            return
+        for kind, (model, key_cols, _) in DIMENSIONS.items():
+            cols = [getattr(model, c) for c in key_cols]
+            rows = (await self.session.execute(select(model.id, *cols).order_by(model.id))).all()
+            self.queries += 1
+            ids = self._ids[kind]
+            for row in rows:
+                ids.setdefault(tuple(row[1:]), row[0])
+        self._loaded = True
+
+    def get(self, kind: str, *key: Hashable) -> Optional[int]:
+        return self._pending[kind].get(key) or self._ids[kind].get(key)
+
+    async def ensure(self, kind: str, rows: Iterable[Dict[str, Any]]) -> List[int]:
+        """返回每行对应的 id（与输入顺序一致），缺失的行批量创建。rows 需包含业务键列且列集合一致。"""
+        await self.load()
+        model, key_cols, conflict = DIMENSIONS[kind]
+        rows = list(rows)
+        keys = [tuple(row[c] for c in key_cols) for row in rows]
+        missing: Dict[Tuple, Dict[str, Any]] = {}
+        for key, row in zip(keys, rows):
+            if self.get(kind, *key) is None:
+                missing.setdefault(key, row)
+        if missing:
+            await self._create(kind, model, key_cols, conflict, missing)
+        return [self.get(kind, *key) for key in keys]
+
+    async def ensure_one(self, kind: str, row: Dict[str, Any]) -> int:
+        return (await self.ensure(kind, [row]))[0]
+
+    async def _create(
+        self,
+        kind: str,
+        model: Any,
+        key_cols: Sequence[str],
+        conflict: Optional[Sequence[str]],
+        missing: Dict[Tuple, Dict[str, Any]],
+    ) -> None:
+        cols = [getattr(model, c) for c in key_cols]
+        stmt = insert(model).values(list(missing.values()))
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict)) if conflict else stmt.on_conflict_do_nothing()
+        result = await self.session.execute(stmt.returning(model.id, *cols))
+        self.queries += 1
+        pending = self._pending[kind]
+        for row in result.all():
+            pending[tuple(row[1:])] = row[0]
+            self.created += 1
+        # 冲突跳过的行（其他进程刚写入，或命中业务键之外的唯一约束）再查一次
+        unresolved = [key for key in missing if key not in pending]
+        if unresolved:
+            stmt = select(model.id, *cols).where(tuple_(*cols).in_(unresolved)).order_by(model.id)
+            for row in (await self.session.execute(stmt)).all():
+                pending.setdefault(tuple(row[1:]), row[0])
+            self.queries += 1
+
+    def commit(self) -> None:
+        """会话提交后调用：本事务新建的 id 并入缓存。"""
+        for kind, pending in self._pending.items():
+            self._ids[kind].update(pending)
+            pending.clear()
+
+    def discard_pending(self) -> None:
+        """会话回滚后调用：丢弃本事务新建的 id。"""
+        for pending in self._pending.values():
+            pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queries": self.queries,
+            "created": self.created,
+            **{kind: len(ids) for kind, ids in self._ids.items()},
+        }
@@ -0,0 +1,99 @@
+"""
+读数降采样：SQL 时间桶聚合 + LTTB（Largest-Triangle-Three-Buckets）。
+
+- ``bucket_stmt``：``date_trunc`` 分桶，按需计算 avg/min/max/count/last，结果行数 = 桶数；
+- ``lttb``：在点数预算内挑选保留曲线形状的原始点（首尾必留），用于长时间范围的折线图。
+
+时间范围均为半开区间 [start, end)，与整桶边界对齐时可以直接改读汇总表（见 rollups.py）。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import Select, func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+
+from app.models import SensorReading
+
+
+BUCKETS: Dict[str, str] = {"1h": "hour", "1d": "day", "1w": "week"}
+AGGREGATES = ("avg", "min", "max", "count", "last")
+
+
+def _aggregate_columns(aggs: Sequence[str]) -> list:
+    value = SensorReading.value_num
+    columns = {
+        "avg": func.avg(value),
+        "min": func.min(value),
+        "max": func.max(value),
+        "count": func.count(value),
+        # 桶内最后一条：按时间倒序聚合成数组取第一个
+        "last": array_agg(aggregate_order_by(value, SensorReading.reading_time.desc()))[1],
+    }
+    return [columns[a].label(a) for a in aggs]
+
+
+def bucket_stmt(
+    metric_ids: Sequence[int],
+    bucket: str,
+    aggs: Sequence[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Select:
+    """按 (metric_id, 时间桶) 聚合 sensor_readings，返回列 metric_id, bucket_start, *aggs。"""
+    # 桶单位来自白名单，按字面量渲染，保证 SELECT 与 GROUP BY 中是同一表达式（绑定参数会被视为不同表达式）
+    unit = literal_column(f"'{BUCKETS[bucket]}'")
+    bucket_start = func.date_trunc(unit, SensorReading.reading_time).label("bucket_start")
+    stmt = (
+        select(SensorReading.metric_id, bucket_start, *_aggregate_columns(aggs))
+        .where(SensorReading.metric_id.in_(metric_ids), SensorReading.value_num.is_not(None))
+        .group_by(SensorReading.metric_id, bucket_start)
+        .order_by(SensorReading.metric_id, bucket_start)
+    )
+    if start:
+        stmt = stmt.where(SensorReading.reading_time >= start)
+    if end:
+        stmt = stmt.where(SensorReading.reading_time < end)
+    return stmt
+
+
+def raw_points_stmt(metric_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Select:
+    """LTTB 的输入：单个 metric 的 (reading_time, value_num)，按时间升序。"""
+    stmt = (
+        select(SensorReading.reading_time, SensorReading.value_num)
+        .where(SensorReading.metric_id == metric_id, SensorReading.value_num.is_not(None))
+        .order_by(SensorReading.reading_time)
+    )
+    if start:
+        stmt = stmt.where(SensorReading.reading_time >= start)
+    if end:
+        stmt = stmt.where(SensorReading.reading_time < end)
+    return stmt
+
+
+def lttb(x: Sequence[float], y: Sequence[float], threshold: int) -> List[int]:
+    """返回保留点的下标（升序）。x 需单调递增；点数不超过 threshold 时原样返回。"""
+    n = len(x)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:threshold]
+    xs = np.asarray(x, dtype=float)
+    ys = np.asarray(y, dtype=float)
+    # 首尾之外的点均分为 threshold-2 个桶
+    edges = [int(e) for e in np.linspace(1, n - 1, threshold - 1)]
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 下一个桶的平均点（最后一个桶以末点为参照）
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = xs[nlo:nhi].mean(), ys[nlo:nhi].mean()
+        area = np.abs((xs[a] - avg_x) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (avg_y - ys[a]))
+        a = lo + int(area.argmax())
+        selected.append(a)
+    selected.append(n - 1)
+    return selected
@@ -4,8 +4,14 @@ Excel 数据导入器：将真实监测 Excel 文件解析入 PostgreSQL。
 功能要点：
 - 前 6~10 行解析元数据（测点编号、桩号、安装高程等）
 - 自动识别表头行（包含“序号”与“观测日期”/“日期”列）
-- 按传感器前缀映射 metric_key 与单位，未识别列写入 raw_values
-- 幂等：基于 ingest_files 的 (sensor_id, checksum) 跳过重复
+- 按传感器前缀映射 metric_key 与单位，整行原始值写入 source_rows（每行一次，读数按文件+时间关联）
+- 数据区按列解析（整列时间转换/数值转换），读数以列数组形式输出
+- 幂等：解析前按 ingest_files 的 path + file_mtime/file_size 预检，stat 变化才计算 MD5；
+  再基于 (sensor_id, checksum) 跳过重复
+- 增量模式：每个文件一条 ingest_files 记录作为逻辑来源，记录已导入的数据行数与最大观测时间，
+  文件追加后只解析、写入水位线之后的尾部行
+- 维度行（传感器类型、设施、断面、桩号、测点、指标）经 DimensionCache 预加载一次，缺失的批量创建
+- 写入读数后评估告警规则（app.utils.alerting），同步 upsert sensor_latest_values 最新值投影，并增量刷新小时/日汇总表
 """
 
 from __future__ import annotations
@@ -13,30 +19,76 @@ from __future__ import annotations
 import hashlib
 import os
 import re
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, replace
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.facility import MonitoringFacility, MonitoringSection, ChainageCoordinate, SensorType
-from app.models.sensor import Sensor, SensorMetric, IngestFile
-from app.models.reading import SensorReading
+from app.models.sensor import IngestFile
+from app.models.reading import SensorReading, SourceRow
+from app.utils.alerting import alert_evaluator
+from app.utils.latest_readings import upsert_latest_values
+from app.utils.partitions import ensure_partitions_for
+from app.utils.rollups import refresh_rollups
+from app.utils.cache import invalidate_cache
+from app.config import get_settings
+from app.utils.bulk_copy import copy_readings, copy_source_rows
+from app.utils.dimension_cache import DimensionCache
 from sqlalchemy.dialects.postgresql import insert
 
 
 DATA_ROOT_DEFAULT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../安全监测数据-MMK发电引水洞/4 发电引水洞"))
 
 
+@dataclass
+class MetricSeries:
+    """单个 metric 的列数组，与 ParsedExcel.reading_times 按行对齐。"""
+
+    unit: Optional[str]
+    present: List[bool]  # 该行清洗后有值才写入读数
+    value_num: List[Optional[float]]
+    value_text: List[Optional[str]]
+
+
 @dataclass
 class ParsedExcel:
     point_code: str
     sensor_type_code: str
     metadata: Dict[str, Any]
     metric_columns: Dict[str, Dict[str, Any]]  # col_name -> {"metric_key":..., "unit":..., "data_type":...}
-    readings: List[Dict[str, Any]]  # 每行包含 reading_time、metrics:{metric_key:value}、raw_values
+    reading_times: List[datetime]  # 有效观测时间的数据行
+    metrics: Dict[str, MetricSeries]  # metric_key -> 按行对齐的列数组
+    raw_values: List[Dict[str, Any]]  # 每行清洗后的原始值
+    data_rows: int = 0  # 数据区中最后一条有效观测行之后的行号，作为下次增量解析的起点
+    start_row: int = 0  # 本次从数据区第几行开始解析，>0 表示只解析了尾部
+
+    @property
+    def row_count(self) -> int:
+        return len(self.reading_times)
+
+    def since(self, watermark: datetime) -> "ParsedExcel":
+        """只保留观测时间晚于水位线的行。"""
+        keep = [i for i, t in enumerate(self.reading_times) if t > watermark]
+        if len(keep) == len(self.reading_times):
+            return self
+
+        def pick(values: List[Any]) -> List[Any]:
+            return [values[i] for i in keep]
+
+        return replace(
+            self,
+            reading_times=pick(self.reading_times),
+            metrics={
+                key: MetricSeries(s.unit, pick(s.present), pick(s.value_num), pick(s.value_text))
+                for key, s in self.metrics.items()
+            },
+            raw_values=pick(self.raw_values),
+        )
 
 
 class ExcelImporter:
@@ -143,9 +195,24 @@ class ExcelImporter:
         ],
     }
 
-    def __init__(self, session: AsyncSession, data_root: str | None = None):
+    def __init__(
+        self,
+        session: AsyncSession | None,
+        data_root: str | None = None,
+        vectorized: bool = True,
+        use_copy: bool = False,
+        incremental: bool = False,
+    ):
         self.session = session
         self.data_root = data_root or DATA_ROOT_DEFAULT
+        # True 时按 ingest_files 水位线只导入文件尾部新增行，并复用同一条 ingest 记录
+        self.incremental = incremental
+        # True 时读数经 COPY 写入临时表再合并（app.utils.bulk_copy），否则 500 行一批 INSERT
+        self.use_copy = use_copy
+        self._checksums: Dict[str, Tuple[Tuple[str, float, int], str]] = {}
+        self.dimensions = DimensionCache(session)
+        # False 时走逐行 iterrows 的旧解析路径，仅用于对照/基准（scripts.bench_parse_excel）
+        self.vectorized = vectorized
         # 默认告警阈值，可按需调整/接入配置
         self.default_warn = {
             "pore_pressure": {"warn_high": 80},
@@ -154,105 +221,157 @@ class ExcelImporter:
             "rainfall": {"warn_high": 50},
         }
 
-    async def import_file(self, file_path: str) -> Dict[str, Any]:
-        abs_path = file_path
+    def resolve_path(self, file_path: str) -> str:
         if not os.path.isabs(file_path):
-            abs_path = os.path.abspath(os.path.join(self.data_root, file_path))
-        if not os.path.exists(abs_path):
-            return {"status": "skipped", "reason": "file_not_found", "path": abs_path}
+            return os.path.abspath(os.path.join(self.data_root, file_path))
+        return file_path
 
-        parsed = self._parse_excel(abs_path)
-        sensor_type = await self._get_or_create_sensor_type(parsed.sensor_type_code)
-        facility = await self._get_or_create_facility()
-        section = await self._get_or_create_section(facility.id)
-        chainage_id = await self._get_or_create_chainage(facility.id, parsed.metadata)
-        sensor = await self._get_or_create_sensor(section.id, sensor_type.id, chainage_id, parsed)
+    async def precheck(self, file_path: str, force: bool = False) -> Optional[Dict[str, Any]]:
+        """解析前的变更检测：文件未变化时返回 skipped 结果，需要导入时返回 None。
 
-        checksum = self._checksum(abs_path)
-        mtime = str(os.path.getmtime(abs_path))
-        ingest = await self._get_or_create_ingest(sensor.id, abs_path, checksum, mtime)
+        先比对 ingest_files 中同路径记录的 file_mtime/file_size（只 stat，不读文件）；
+        stat 变化时才计算 MD5，内容未变（如仅 touch）则回写新的 stat 并跳过。
+        """
+        abs_path = self.resolve_path(file_path)
+        if not os.path.exists(abs_path):
+            return {"status": "skipped", "reason": "file_not_found", "path": abs_path}
+        if force:
+            return None
+        stat = os.stat(abs_path)
+        mtime, size = str(stat.st_mtime), stat.st_size
+        ingests = (
+            await self.session.scalars(
+                select(IngestFile)
+                .where(
+                    IngestFile.path == os.path.relpath(abs_path, self.data_root),
+                    IngestFile.status == "success",
+                    IngestFile.rows_imported > 0,
+                )
+                .order_by(IngestFile.id.desc())
+            )
+        ).all()
+        if not ingests:
+            return None
+        latest = ingests[0]
+        if latest.file_mtime == mtime and latest.file_size == size:
+            return {"status": "skipped", "reason": "unchanged", "path": abs_path}
+        checksum = self._file_checksum(abs_path, stat)
+        if any(i.checksum == checksum for i in ingests):
+            latest.file_mtime, latest.file_size = mtime, size
+            await self.session.commit()
+            return {"status": "skipped", "reason": "unchanged_content", "path": abs_path}
+        return None
+
+    async def parse_window(self, file_path: str) -> Tuple[int, Optional[datetime]]:
+        """增量解析窗口 (跳过的数据行数, 观测时间水位线)；非增量模式或首次导入为 (0, None)。"""
+        return self._window(await self._incremental_source(self.resolve_path(file_path)))
+
+    async def import_file(
+        self, file_path: str, parsed: Optional[ParsedExcel] = None, force: bool = False
+    ) -> Dict[str, Any]:
+        """导入单个文件；parsed 可由进程池预先解析（见 parse_excel_file），否则在当前进程解析。
+
+        force=True 时跳过变更检测，并对已导入过的同内容文件复用原 ingest 记录重新写入（读数按唯一键去重）；
+        增量模式下 force 会整表解析。预先解析的 parsed 应按 parse_window 的窗口解析。
+        """
+        abs_path = self.resolve_path(file_path)
+        skipped = await self.precheck(abs_path, force=force)
+        if skipped is not None:
+            return skipped
+
+        source = await self._incremental_source(abs_path)
+        if parsed is None:
+            skip_rows, watermark = self._window(source) if not force else (0, None)
+            parsed = self._parse_excel(abs_path, skip_rows=skip_rows, after=watermark)
+        windowed = source is not None and not force and (parsed.start_row > 0 or source.last_reading_time is not None)
+        if windowed and parsed.data_rows < parsed.start_row:
+            # 文件变短说明不是单纯追加（被重写/删行），整表重新解析写入同一来源，读数按唯一键去重
+            parsed, windowed = self._parse_excel(abs_path), False
+        # 上一个文件失败回滚时，其新建的维度 id 已不存在
+        self.dimensions.discard_pending()
+        sensor_id = await self._ensure_dimensions(parsed)
+
+        if source is not None and source.sensor_id != sensor_id:
+            # 同一路径换成了别的测点，不能沿用原来源的水位线
+            source = None
+            if windowed:
+                parsed = self._parse_excel(abs_path)
+
+        stat = os.stat(abs_path)
+        checksum = self._file_checksum(abs_path, stat)
+        if source is not None:
+            ingest = await self._advance_source(source, checksum, stat)
+        else:
+            ingest = await self._get_or_create_ingest(sensor_id, abs_path, checksum, stat, force)
         if ingest is None:
-            return {"status": "skipped", "reason": "duplicate_checksum", "path": abs_path, "sensor": sensor.point_code}
-
-        metric_map = await self._ensure_metrics(sensor.id, parsed.metric_columns)
-        rows_inserted = await self._insert_readings(sensor.id, metric_map, parsed.readings, ingest.id)
-
-        ingest.rows_imported = rows_inserted
+            await self.session.commit()
+            self.dimensions.commit()
+            return {"status": "skipped", "reason": "duplicate_checksum", "path": abs_path, "sensor": parsed.point_code}
+
+        metric_map = await self._ensure_metrics(sensor_id, parsed.metric_columns)
+        started = time.perf_counter()
+        rows_inserted = await self._insert_readings(sensor_id, metric_map, parsed, ingest.id)
+
+        # force 重导复用原记录时读数大多因唯一键跳过，累加避免把 rows_imported 写成 0
+        ingest.rows_imported = (ingest.rows_imported or 0) + rows_inserted
+        ingest.data_rows = parsed.data_rows
+        if parsed.reading_times:
+            newest = max(parsed.reading_times)
+            if ingest.last_reading_time is None or newest > ingest.last_reading_time:
+                ingest.last_reading_time = newest
         await self.session.commit()
-        return {"status": "success", "path": abs_path, "sensor": sensor.point_code, "rows": rows_inserted}
+        self.dimensions.commit()
+        elapsed = time.perf_counter() - started
+        invalidate_cache()
+        return {
+            "status": "success",
+            "path": abs_path,
+            "sensor": parsed.point_code,
+            "rows": rows_inserted,
+            "parsed_rows": parsed.row_count,
+            "start_row": parsed.start_row,
+            "insert_seconds": round(elapsed, 3),
+            "rows_per_sec": round(rows_inserted / elapsed) if elapsed > 0 else None,
+        }
 
     # --- DB helpers ---
 
-    async def _get_or_create_sensor_type(self, code: str) -> SensorType:
-        st = await self.session.scalar(select(SensorType).where(SensorType.code == code))
-        if st:
-            return st
-        # fallback: create with minimal info
-        st = SensorType(code=code, name=code, unit=None, is_simulated=False)
-        self.session.add(st)
-        await self.session.flush()
-        return st
-
-    async def _get_or_create_facility(self) -> MonitoringFacility:
-        code = "MMK-FDYSD"
-        facility = await self.session.scalar(select(MonitoringFacility).where(MonitoringFacility.code == code))
-        if facility:
-            return facility
-        facility = MonitoringFacility(code=code, name="MMK 发电引水洞", facility_type="tunnel", is_simulated=False)
-        self.session.add(facility)
-        await self.session.flush()
-        return facility
-
-    async def _get_or_create_section(self, facility_id: int) -> MonitoringSection:
-        section = await self.session.scalar(
-            select(MonitoringSection).where(MonitoringSection.facility_id == facility_id, MonitoringSection.code == "SEC-1")
+    async def _ensure_dimensions(self, parsed: ParsedExcel) -> int:
+        """传感器类型 -> 设施 -> 断面 -> 桩号 -> 测点，命中缓存时不访问数据库，返回 sensor_id。"""
+        dims = self.dimensions
+        code = parsed.sensor_type_code
+        sensor_type_id = await dims.ensure_one(
+            "sensor_type", dict(code=code, name=code, unit=None, is_simulated=False)
         )
-        if section:
-            return section
-        section = MonitoringSection(
-            facility_id=facility_id,
-            code="SEC-1",
-            name="发电引水洞",
-            section_type="tunnel",
-            is_simulated=False,
+        facility_id = await dims.ensure_one(
+            "facility", dict(code="MMK-FDYSD", name="MMK 发电引水洞", facility_type="tunnel", is_simulated=False)
         )
-        self.session.add(section)
-        await self.session.flush()
-        return section
-
-    async def _get_or_create_chainage(self, facility_id: int, metadata: Dict[str, Any]) -> Optional[int]:
-        raw = metadata.get("install_chainage_raw")
-        if not raw:
-            return None
-        chainage_normalized, chainage_value, direction = self._normalize_chainage(raw)
-        existing = await self.session.scalar(
-            select(ChainageCoordinate).where(
-                ChainageCoordinate.facility_id == facility_id,
-                ChainageCoordinate.chainage_normalized == chainage_normalized,
-            )
-        )
-        if existing:
-            return existing.id
-        cc = ChainageCoordinate(
-            facility_id=facility_id,
-            chainage_raw=raw,
-            chainage_normalized=chainage_normalized,
-            chainage_value=chainage_value,
-            chainage_direction=direction,
-            elevation=self._to_float(metadata.get("install_elevation")),
-            is_simulated=False,
+        section_id = await dims.ensure_one(
+            "section",
+            dict(facility_id=facility_id, code="SEC-1", name="发电引水洞", section_type="tunnel", is_simulated=False),
         )
-        self.session.add(cc)
-        await self.session.flush()
-        return cc.id
+        chainage_id = None
+        raw = parsed.metadata.get("install_chainage_raw")
+        if raw:
+            chainage_normalized, chainage_value, direction = self._normalize_chainage(raw)
+            chainage_id = await dims.ensure_one(
+                "chainage",
+                dict(
+                    facility_id=facility_id,
+                    chainage_raw=raw,
+                    chainage_normalized=chainage_normalized,
+                    chainage_value=chainage_value,
+                    chainage_direction=direction,
+                    elevation=self._to_float(parsed.metadata.get("install_elevation")),
+                    is_simulated=False,
+                ),
+            )
+        return await dims.ensure_one("sensor", self._sensor_row(section_id, sensor_type_id, chainage_id, parsed))
 
-    async def _get_or_create_sensor(
+    def _sensor_row(
         self, section_id: int, sensor_type_id: int, chainage_id: Optional[int], parsed: ParsedExcel
-    ) -> Sensor:
-        sensor = await self.session.scalar(select(Sensor).where(Sensor.point_code == parsed.point_code))
-        if sensor:
-            return sensor
-        sensor = Sensor(
+    ) -> Dict[str, Any]:
+        return dict(
             section_id=section_id,
             sensor_type_id=sensor_type_id,
             chainage_id=chainage_id,
@@ -270,19 +389,20 @@ class ExcelImporter:
             source_file=parsed.metadata.get("source_file"),
             is_simulated=False,
         )
-        self.session.add(sensor)
-        await self.session.flush()
-        return sensor
 
-    async def _get_or_create_ingest(self, sensor_id: int, path: str, checksum: str, mtime: str) -> Optional[IngestFile]:
+    async def _get_or_create_ingest(
+        self, sensor_id: int, path: str, checksum: str, stat: os.stat_result, force: bool = False
+    ) -> Optional[IngestFile]:
+        mtime = str(stat.st_mtime)
         exists = await self.session.scalar(
             select(IngestFile).where(IngestFile.sensor_id == sensor_id, IngestFile.checksum == checksum)
         )
         if exists:
             # 允许重导 rows_imported=0 的记录
-            if exists.rows_imported and exists.rows_imported > 0:
+            if exists.rows_imported and exists.rows_imported > 0 and not force:
                 return None
             exists.file_mtime = mtime
+            exists.file_size = stat.st_size
             exists.status = "success"
             return exists
         ingest = IngestFile(
@@ -290,6 +410,7 @@ class ExcelImporter:
             path=os.path.relpath(path, self.data_root),
             checksum=checksum,
             file_mtime=mtime,
+            file_size=stat.st_size,
             status="success",
             is_simulated=False,
         )
@@ -297,64 +418,114 @@ class ExcelImporter:
         await self.session.flush()
         return ingest
 
+    async def _incremental_source(self, abs_path: str) -> Optional[IngestFile]:
+        """增量模式下该文件的逻辑来源：同路径最近一条已成功导入的 ingest 记录。"""
+        if not self.incremental:
+            return None
+        return await self.session.scalar(
+            select(IngestFile)
+            .where(
+                IngestFile.path == os.path.relpath(abs_path, self.data_root),
+                IngestFile.status == "success",
+                IngestFile.rows_imported > 0,
+            )
+            .order_by(IngestFile.id.desc())
+            .limit(1)
+        )
+
+    @staticmethod
+    def _window(source: Optional[IngestFile]) -> Tuple[int, Optional[datetime]]:
+        if source is None:
+            return 0, None
+        return source.data_rows or 0, source.last_reading_time
+
+    async def _advance_source(self, source: IngestFile, checksum: str, stat: os.stat_result) -> Optional[IngestFile]:
+        """文件追加后沿用原 ingest 记录，只更新 checksum 与 stat；新内容与该测点的其他记录重复时返回 None。"""
+        if checksum != source.checksum:
+            other = await self.session.scalar(
+                select(IngestFile.id).where(
+                    IngestFile.sensor_id == source.sensor_id,
+                    IngestFile.checksum == checksum,
+                    IngestFile.id != source.id,
+                )
+            )
+            if other is not None:
+                return None
+        source.checksum = checksum
+        source.file_mtime = str(stat.st_mtime)
+        source.file_size = stat.st_size
+        return source
+
     async def _ensure_metrics(self, sensor_id: int, metric_columns: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
-        metric_ids: Dict[str, int] = {}
+        """该测点的全部 metric 一次批量 get-or-create。"""
+        rows = []
         for m in metric_columns.values():
             metric_key = m["metric_key"]
-            unit = m.get("unit")
-            metric = await self.session.scalar(
-                select(SensorMetric).where(SensorMetric.sensor_id == sensor_id, SensorMetric.metric_key == metric_key)
-            )
-            if not metric:
-                warn_cfg = self.default_warn.get(metric_key, {})
-                metric = SensorMetric(
+            warn_cfg = self.default_warn.get(metric_key, {})
+            rows.append(
+                dict(
                     sensor_id=sensor_id,
                     metric_key=metric_key,
                     name_cn=m.get("name") or metric_key,
-                    unit=unit,
+                    unit=m.get("unit"),
                     data_type=m.get("data_type") or "number",
                     warn_low=warn_cfg.get("warn_low"),
                     warn_high=warn_cfg.get("warn_high"),
                     is_simulated=False,
                 )
-                self.session.add(metric)
-                await self.session.flush()
-            metric_ids[metric_key] = metric.id
-        return metric_ids
+            )
+        if not rows:
+            return {}
+        ids = await self.dimensions.ensure("metric", rows)
+        return {row["metric_key"]: metric_id for row, metric_id in zip(rows, ids)}
 
-    async def _insert_readings(
+    def _build_reading_objs(
         self,
         sensor_id: int,
         metric_ids: Dict[str, int],
-        rows: List[Dict[str, Any]],
-        ingest_id: int,
-    ) -> int:
+        parsed: ParsedExcel,
+        ingest_id: Optional[int],
+    ) -> List[Dict[str, Any]]:
+        """把列数组展开为 sensor_readings 行（行优先，与逐行解析时的写入顺序一致）。"""
+        series = [(metric_ids[key], s) for key, s in parsed.metrics.items() if metric_ids.get(key)]
         objs: List[Dict[str, Any]] = []
-        for row in rows:
-            reading_time: datetime = row["reading_time"]
-            raw_values = row.get("raw_values")
-            for metric_key, value in row.get("metrics", {}).items():
-                metric_id = metric_ids.get(metric_key)
-                if not metric_id:
+        for i, reading_time in enumerate(parsed.reading_times):
+            for metric_id, s in series:
+                if not s.present[i]:
                     continue
-                val_num, val_text = self._split_value(value)
                 objs.append(
                     dict(
                         sensor_id=sensor_id,
                         metric_id=metric_id,
                         reading_time=reading_time,
-                        value_num=val_num,
-                        value_text=val_text,
-                        unit=row.get("units", {}).get(metric_key),
-                        raw_values=raw_values,
+                        value_num=s.value_num[i],
+                        value_text=s.value_text[i],
+                        unit=s.unit,
                         source_file_id=ingest_id,
                         is_simulated=False,
                         quality_flag="normal",
                         remark=None,
                     )
                 )
+        return objs
+
+    async def _insert_readings(
+        self,
+        sensor_id: int,
+        metric_ids: Dict[str, int],
+        parsed: ParsedExcel,
+        ingest_id: int,
+    ) -> int:
+        objs = self._build_reading_objs(sensor_id, metric_ids, parsed, ingest_id)
         if not objs:
             return 0
+        await self._insert_source_rows(parsed, ingest_id)
+        # 历史文件的月份可能还没有分区，先建好，避免读数落入 default 分区
+        await ensure_partitions_for(self.session, objs)
+        if self.use_copy:
+            total = await copy_readings(self.session, objs)
+            await self._after_insert(objs)
+            return total
         total = 0
         chunk_size = 500
         for i in range(0, len(objs), chunk_size):
@@ -367,11 +538,43 @@ class ExcelImporter:
             result = await self.session.execute(stmt)
             # rowcount may be -1 depending on driver; fallback to len(chunk)
             total += result.rowcount if result.rowcount and result.rowcount > 0 else len(chunk)
+        await self._after_insert(objs)
         return total
 
+    async def _after_insert(self, objs: List[Dict[str, Any]]) -> None:
+        # 告警评估以 sensor_latest_values 为水位线，须在更新投影之前
+        if get_settings().alerts_enabled:
+            await alert_evaluator.evaluate(self.session, objs)
+        await upsert_latest_values(self.session, objs)
+        await refresh_rollups(self.session, objs)
+
+    async def _insert_source_rows(self, parsed: ParsedExcel, ingest_id: int) -> int:
+        """整行原始值写入 source_rows，每行一次（读数按 (source_file_id, reading_time) 关联）。"""
+        rows = [
+            {"ingest_file_id": ingest_id, "reading_time": reading_time, "raw_values": raw}
+            for reading_time, raw in zip(parsed.reading_times, parsed.raw_values)
+        ]
+        if not rows:
+            return 0
+        if self.use_copy:
+            return await copy_source_rows(self.session, rows)
+        chunk_size = 1000
+        for i in range(0, len(rows), chunk_size):
+            stmt = (
+                insert(SourceRow)
+                .values(rows[i : i + chunk_size])
+                .on_conflict_do_nothing(index_elements=["ingest_file_id", "reading_time"])
+            )
+            await self.session.execute(stmt)
+        return len(rows)
+
     # --- parsing helpers ---
 
-    def _parse_excel(self, path: str) -> ParsedExcel:
+    def _parse_excel(self, path: str, skip_rows: int = 0, after: Optional[datetime] = None) -> ParsedExcel:
+        """解析整个文件；skip_rows/after 为增量窗口，仅清洗、解析数据区第 skip_rows 行之后且晚于 after 的行。
+
+        表头与元数据始终从文件开头读取，工作簿本身仍需完整加载。
+        """
         df = pd.read_excel(path, header=None)
         metadata_rows = df.iloc[:10]
         metadata = self._parse_metadata(metadata_rows)
@@ -393,7 +596,8 @@ class ExcelImporter:
                 headers.append(h_clean)
 
         data_start = header_row + 2 if use_two_rows else header_row + 1
-        data_df = df.iloc[data_start:].reset_index(drop=True)
+        total_rows = max(len(df) - data_start, 0)
+        data_df = df.iloc[data_start + skip_rows :].reset_index(drop=True)
         data_df.columns = headers
 
         point_code = metadata.get("point_code") or self._guess_point_code_from_filename(path)
@@ -402,31 +606,100 @@ class ExcelImporter:
 
         metric_columns = self._map_metric_columns(sensor_prefix, headers)
         time_col = self._find_time_column(headers)
-        readings: List[Dict[str, Any]] = []
+        parse_rows = self._parse_rows_vectorized if self.vectorized else self._parse_rows_iter
+        reading_times, metrics, raw_values, consumed = parse_rows(data_df, headers, time_col, metric_columns)
+        # 水位线停在最后一条有效观测行之后：表尾的备注/空行下次追加时可能被新数据行取代，需要重新解析
+        data_rows = skip_rows + consumed if total_rows >= skip_rows else total_rows
+
+        parsed = ParsedExcel(
+            point_code=point_code,
+            sensor_type_code=sensor_type_code,
+            metadata=metadata,
+            metric_columns=metric_columns,
+            reading_times=reading_times,
+            metrics=metrics,
+            raw_values=raw_values,
+            data_rows=data_rows,
+            start_row=skip_rows,
+        )
+        return parsed.since(after) if after is not None else parsed
 
-        for _, row in data_df.iterrows():
+    def _parse_rows_iter(
+        self,
+        data_df: pd.DataFrame,
+        headers: List[str],
+        time_col: Optional[str],
+        metric_columns: Dict[str, Dict[str, Any]],
+    ) -> Tuple[List[datetime], Dict[str, MetricSeries], List[Dict[str, Any]], int]:
+        """逐行解析（旧路径）：每行每个单元格单独清洗/解析。
+
+        返回 (观测时间, 各 metric 列数组, 原始值, 最后一条有效行之后的行号)。
+        """
+        reading_times: List[datetime] = []
+        raw_values: List[Dict[str, Any]] = []
+        row_metrics: List[Dict[str, Any]] = []
+        consumed = 0
+        for pos, (_, row) in enumerate(data_df.iterrows()):
             raw_dict = {col: self._clean_value(row[col]) for col in headers}
             ts_val = raw_dict.get(time_col) if time_col else None
             reading_time = self._parse_datetime(ts_val)
             if not reading_time:
                 continue
             metrics: Dict[str, Any] = {}
-            units: Dict[str, Any] = {}
             for col, meta in metric_columns.items():
                 val = self._clean_value(row.get(col))
                 if val is None:
                     continue
                 metrics[meta["metric_key"]] = val
-                units[meta["metric_key"]] = meta.get("unit")
-            readings.append({"reading_time": reading_time, "metrics": metrics, "units": units, "raw_values": raw_dict})
-
-        return ParsedExcel(
-            point_code=point_code,
-            sensor_type_code=sensor_type_code,
-            metadata=metadata,
-            metric_columns=metric_columns,
-            readings=readings,
-        )
+            reading_times.append(reading_time)
+            raw_values.append(raw_dict)
+            row_metrics.append(metrics)
+            consumed = pos + 1
+
+        series: Dict[str, MetricSeries] = {}
+        for meta in metric_columns.values():
+            key = meta["metric_key"]
+            if key in series:
+                continue
+            present, nums, texts = [], [], []
+            for metrics in row_metrics:
+                val_num, val_text = self._split_value(metrics.get(key))
+                present.append(key in metrics)
+                nums.append(val_num)
+                texts.append(val_text)
+            series[key] = MetricSeries(unit=meta.get("unit"), present=present, value_num=nums, value_text=texts)
+        return reading_times, series, raw_values, consumed
+
+    def _parse_rows_vectorized(
+        self,
+        data_df: pd.DataFrame,
+        headers: List[str],
+        time_col: Optional[str],
+        metric_columns: Dict[str, Dict[str, Any]],
+    ) -> Tuple[List[datetime], Dict[str, MetricSeries], List[Dict[str, Any]], int]:
+        """按列解析：整列清洗、一次性时间转换与数值转换，结果与逐行解析一致。"""
+        columns = {col: self._clean_column(self._first_non_null(data_df, col)) for col in dict.fromkeys(headers)}
+        if time_col:
+            times = self._parse_datetime_column(columns[time_col])
+        else:
+            times = pd.Series([pd.NaT] * len(data_df), dtype="datetime64[ns]")
+        keep = times.notna().to_numpy()
+        reading_times = list(times[keep].dt.to_pydatetime())
+
+        merged: Dict[str, pd.Series] = {}
+        units: Dict[str, Optional[str]] = {}
+        for col, meta in metric_columns.items():
+            key = meta["metric_key"]
+            values = columns[col][keep]
+            # 多列映射到同一 metric 时，后面的列有值则覆盖前面的列（与逐行写 dict 相同）
+            merged[key] = values if key not in merged else values.where(values.notna(), merged[key])
+            units.setdefault(key, meta.get("unit"))
+        series = {key: self._split_column(values, units[key]) for key, values in merged.items()}
+
+        raw_df = pd.DataFrame({col: values[keep].to_numpy() for col, values in columns.items()}, dtype=object)
+        raw_values = raw_df.to_dict(orient="records") if columns else [{} for _ in reading_times]
+        kept = keep.nonzero()[0]
+        return reading_times, series, raw_values, int(kept[-1]) + 1 if len(kept) else 0
 
     def _parse_metadata(self, df: pd.DataFrame) -> Dict[str, Any]:
         meta: Dict[str, Any] = {}
@@ -502,6 +775,16 @@ class ExcelImporter:
         text = text.replace("（", "(").replace("）", ")")
         return text.lower()
 
+    def _file_checksum(self, path: str, stat: os.stat_result) -> str:
+        """按 (path, mtime, size) 记忆 MD5，预检与导入阶段只哈希一次。"""
+        key = (path, stat.st_mtime, stat.st_size)
+        cached = self._checksums.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        checksum = self._checksum(path)
+        self._checksums[path] = (key, checksum)
+        return checksum
+
     def _checksum(self, path: str) -> str:
         md5 = hashlib.md5()
         with open(path, "rb") as f:
@@ -517,13 +800,15 @@ class ExcelImporter:
         # Excel 序列
         if isinstance(value, (int, float)):
             try:
-                return pd.to_datetime(value, unit="d", origin="1899-12-30").to_pydatetime()
+                parsed = pd.to_datetime(value, unit="D", origin="1899-12-30")
             except Exception:
                 return None
-        try:
-            return pd.to_datetime(str(value)).to_pydatetime()
-        except Exception:
-            return None
+        else:
+            try:
+                parsed = pd.to_datetime(str(value))
+            except Exception:
+                return None
+        return None if pd.isna(parsed) else parsed.to_pydatetime()
 
     def _parse_date(self, value: Any) -> Optional[datetime.date]:
         if not value:
@@ -558,6 +843,60 @@ class ExcelImporter:
             return value.isoformat()
         return value
 
+    def _first_non_null(self, df: pd.DataFrame, col: str) -> pd.Series:
+        """同名列（重复表头）取每行第一个非空值，对应逐行解析中 row[col] 返回 Series 的情况。"""
+        positions = [i for i, c in enumerate(df.columns) if c == col]
+        values = df.iloc[:, positions[0]].astype(object)
+        for pos in positions[1:]:
+            values = values.where(values.notna(), df.iloc[:, pos].astype(object))
+        return values
+
+    def _clean_column(self, values: pd.Series) -> pd.Series:
+        """整列版 _clean_value：空值 -> None，日期时间 -> ISO 字符串。"""
+        values = values.astype(object)
+        values = values.where(values.notna(), None)
+        is_dt = [isinstance(v, datetime) for v in values]
+        if any(is_dt):
+            values = pd.Series(
+                [v.isoformat() if dt else v for v, dt in zip(values, is_dt)], index=values.index, dtype=object
+            )
+        return values
+
+    def _parse_datetime_column(self, values: pd.Series) -> pd.Series:
+        """整列版 _parse_datetime：数值按 Excel 序列日处理，其余按字符串解析，失败为 NaT。"""
+        numeric = np.array([self._is_number(v) for v in values], dtype=bool)
+        textual = values.notna().to_numpy() & ~numeric
+        result = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+        if numeric.any():
+            serial = values[numeric].astype("float64")
+            result[numeric] = pd.to_datetime(serial, unit="D", origin="1899-12-30", errors="coerce")
+        for pos in textual.nonzero()[0]:
+            if isinstance(values.iloc[pos], bool):
+                # 布尔值在旧逻辑里按 int 走序列日分支，保持逐个解析
+                parsed = self._parse_datetime(values.iloc[pos])
+                result.iloc[pos] = parsed if parsed else pd.NaT
+                textual[pos] = False
+        if textual.any():
+            result[textual] = pd.to_datetime(values[textual].astype(str), format="mixed", errors="coerce")
+        return result
+
+    def _split_column(self, values: pd.Series, unit: Optional[str]) -> MetricSeries:
+        """整列版 _split_value：数值整体转 float，其余（文本等）逐个兜底。"""
+        present = values.notna().to_numpy()
+        numeric = np.array([self._is_number(v) for v in values], dtype=bool)
+        value_num: List[Optional[float]] = [None] * len(values)
+        value_text: List[Optional[str]] = [None] * len(values)
+        if numeric.any():
+            for pos, num in zip(numeric.nonzero()[0], values[numeric].astype("float64").tolist()):
+                value_num[pos] = num
+        for pos in (present & ~numeric).nonzero()[0]:
+            value_num[pos], value_text[pos] = self._split_value(values.iloc[pos])
+        return MetricSeries(unit=unit, present=present.tolist(), value_num=value_num, value_text=value_text)
+
+    @staticmethod
+    def _is_number(value: Any) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and not pd.isna(value)
+
     def _normalize_chainage(self, raw: str) -> Tuple[str, Optional[float], Optional[str]]:
         text = raw.replace(" ", "")
         m = re.search(r"([+-]?\d+(?:\.\d+)?)", text)
@@ -575,3 +914,10 @@ class ExcelImporter:
             return float(val)
         except Exception:
             return None
+
+
+def parse_excel_file(
+    path: str, data_root: str | None = None, skip_rows: int = 0, after: Optional[datetime] = None
+) -> ParsedExcel:
+    """纯解析入口（不访问数据库），可在 ProcessPoolExecutor 子进程中调用。"""
+    return ExcelImporter(session=None, data_root=data_root)._parse_excel(path, skip_rows=skip_rows, after=after)
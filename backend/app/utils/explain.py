@@ -0,0 +1,45 @@
+"""
+EXPLAIN 辅助：把 SQLAlchemy 语句按字面量渲染后取 JSON 执行计划，并提取扫描节点。
+
+供分区裁剪基准（scripts/bench_partition_pruning.py）与查询计划检查脚本使用。
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import Select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def render_sql(stmt: Select) -> str:
+    """按 PostgreSQL 方言把绑定参数渲染为字面量（仅用于诊断，不要用来执行用户输入）。"""
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+async def explain(session: AsyncSession, stmt: Select, analyze: bool = False) -> Dict[str, Any]:
+    """返回 EXPLAIN (FORMAT JSON) 的根计划节点。"""
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    conn = await session.connection()
+    # 走 exec_driver_sql，避免字面量中的 ":00" 之类被 text() 当作绑定参数
+    result = await conn.exec_driver_sql(f"EXPLAIN ({options}) {render_sql(stmt)}")
+    raw = result.scalar_one()
+    plan = json.loads(raw) if isinstance(raw, str) else raw
+    return plan[0]["Plan"]
+
+
+def iter_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from iter_nodes(child)
+
+
+def scanned_relations(plan: Dict[str, Any]) -> List[Dict[str, str]]:
+    """计划中的所有表扫描节点：[{"node": "Index Scan", "relation": "sensor_readings_p202401"}, ...]"""
+    return [
+        {"node": node["Node Type"], "relation": node["Relation Name"]}
+        for node in iter_nodes(plan)
+        if "Relation Name" in node
+    ]
@@ -0,0 +1,313 @@
+"""
+实时接入：``POST /api/v1/ingest`` 的解码、ID 解析与写入缓冲。
+
+- 负载：JSON（数组或 ``{"readings": [...]}``）、NDJSON（每行一条）、MessagePack（需安装 msgpack，可选依赖）；
+  每条记录为 ``{"device_id"|"point_code", "metric_key", "time", "value"}``，或多指标形式
+  ``{"device_id", "time", "values": {"water_level": 1.2, "flow": 30}}``；
+  time 可为 ISO 8601（带时区时转换为 UTC）或 epoch 秒/毫秒，缺省为服务端接收时间；
+  可选 quality_flag 为不超过 20 个字符的字符串，缺省为 ``normal``；
+- 为吞吐手写校验而不逐条构造 pydantic 模型；格式错误的记录按下标报告，不影响同批其他记录；
+- ``MetricKeyCache``：(device_id/point_code, metric_key) -> (sensor_id, metric_id, 实时来源 id)，
+  未命中的键每批一次查询解析（测点编号，或 simulated_devices.device_id -> station_id / device_id 测点），
+  未知键负缓存 ``NEGATIVE_TTL_SECONDS`` 秒；
+- 解析后的读数交给进程内 ``ingest_writer``（``BatchedReadingWriter``）攒批写入；缓冲满时接口返回 429 + Retry-After。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models import Sensor, SensorMetric, SimulatedDevice
+from app.utils.reading_writer import BatchedReadingWriter, ensure_live_sources
+
+try:
+    import msgpack
+
+    HAS_MSGPACK = True
+except ImportError:
+    msgpack = None
+    HAS_MSGPACK = False
+
+
+NEGATIVE_TTL_SECONDS = 30.0
+MAX_ERRORS_REPORTED = 20
+# sensor_readings.quality_flag 为 varchar(20) NOT NULL，COPY / Core insert 都不会套用模型默认值
+DEFAULT_QUALITY_FLAG = "normal"
+QUALITY_FLAG_MAX_LENGTH = 20
+# (device, metric_key, reading_time, value_num, value_text, quality_flag)
+Point = Tuple[str, str, datetime, Optional[float], Optional[str], Optional[str]]
+MetricKey = Tuple[str, str]
+
+
+class PayloadError(ValueError):
+    """负载无法整体解码；status_code 为接口应返回的状态码（400 格式错误 / 415 不支持的格式）。"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# --- 解码 ---
+
+
+def decode_payload(body: bytes, content_type: str) -> List[Any]:
+    """按 Content-Type 解码为记录列表。"""
+    content_type = (content_type or "application/json").split(";")[0].strip().lower()
+    try:
+        if "ndjson" in content_type or "jsonl" in content_type:
+            records = [json.loads(line) for line in body.splitlines() if line.strip()]
+        elif "msgpack" in content_type:
+            if not HAS_MSGPACK:
+                raise PayloadError("msgpack is not installed on the server", 415)
+            records = msgpack.unpackb(body, raw=False, timestamp=3)
+        elif "json" in content_type:
+            records = json.loads(body)
+        else:
+            raise PayloadError(f"unsupported content type: {content_type}", 415)
+    except PayloadError:
+        raise
+    except Exception as exc:
+        raise PayloadError(f"invalid payload: {exc}") from exc
+    if isinstance(records, dict):
+        records = records.get("readings", [records])
+    if not isinstance(records, list):
+        raise PayloadError("payload must be a list of readings or {\"readings\": [...]}")
+    return records
+
+
+def parse_time(value: Any, received: datetime) -> datetime:
+    """ISO 8601 / epoch 秒或毫秒 / datetime -> UTC naive datetime；None 为接收时间。"""
+    if value is None:
+        return received
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = value / 1000 if value > 1e11 else value
+        return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+    elif isinstance(value, str):
+        parsed = datetime.fromisoformat(value)
+    else:
+        raise ValueError(f"invalid time: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_value(value: Any) -> Tuple[Optional[float], Optional[str]]:
+    if isinstance(value, bool):
+        return float(value), None
+    if isinstance(value, (int, float)):
+        number = float(value)
+        if not math.isfinite(number):
+            raise ValueError(f"non-finite value: {value!r}")
+        return number, None
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return None, value
+        return (number, None) if math.isfinite(number) else (None, value)
+    if value is None:
+        return None, None
+    raise ValueError(f"invalid value: {value!r}")
+
+
+def parse_quality(value: Any) -> Optional[str]:
+    """可选的 quality_flag：字符串且不超过 QUALITY_FLAG_MAX_LENGTH；None 由 build_rows 取默认值。"""
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"quality_flag must be a string: {value!r}")
+    if len(value) > QUALITY_FLAG_MAX_LENGTH:
+        raise ValueError(f"quality_flag longer than {QUALITY_FLAG_MAX_LENGTH} characters")
+    return value
+
+
+def flatten_records(records: Iterable[Any], received: datetime) -> Tuple[List[Point], List[Dict[str, Any]]]:
+    """记录 -> 读数点；返回 (points, errors)，errors 为 {"index", "error"}。"""
+    points: List[Point] = []
+    errors: List[Dict[str, Any]] = []
+    for index, record in enumerate(records):
+        try:
+            if not isinstance(record, dict):
+                raise ValueError("reading must be an object")
+            device = record.get("device_id") or record.get("point_code")
+            if not device:
+                raise ValueError("device_id or point_code is required")
+            reading_time = parse_time(record.get("time", record.get("reading_time")), received)
+            quality = parse_quality(record.get("quality_flag"))
+            values = record.get("values")
+            if values is not None:
+                if not isinstance(values, dict) or not values:
+                    raise ValueError("values must be a non-empty object")
+                for metric_key, value in values.items():
+                    points.append((str(device), str(metric_key), reading_time, *parse_value(value), quality))
+                continue
+            metric_key = record.get("metric_key") or record.get("metric")
+            if not metric_key:
+                raise ValueError("metric_key is required")
+            points.append((str(device), str(metric_key), reading_time, *parse_value(record.get("value")), quality))
+        except (ValueError, TypeError, OverflowError) as exc:
+            errors.append({"index": index, "error": str(exc)})
+    return points, errors
+
+
+# --- ID 解析 ---
+
+
+@dataclass(frozen=True)
+class MetricRef:
+    sensor_id: int
+    metric_id: int
+    source_id: int
+    unit: Optional[str]
+    is_simulated: bool
+
+
+class MetricKeyCache:
+    def __init__(
+        self,
+        session_factory: Optional[async_sessionmaker[AsyncSession]] = None,
+        negative_ttl: float = NEGATIVE_TTL_SECONDS,
+    ):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.negative_ttl = negative_ttl
+        self._refs: Dict[MetricKey, MetricRef] = {}
+        self._missing: Dict[MetricKey, float] = {}
+        self._lock = asyncio.Lock()
+        self.counters: Counter = Counter()
+
+    def lookup(self, keys: Iterable[MetricKey]) -> Tuple[Dict[MetricKey, MetricRef], List[MetricKey]]:
+        """只查内存：返回 (命中, 需要查库的键)；负缓存未过期的键两者都不包含。"""
+        found, unresolved = {}, []
+        now = time.monotonic()
+        for key in set(keys):
+            ref = self._refs.get(key)
+            if ref is not None:
+                found[key] = ref
+            elif now - self._missing.get(key, float("-inf")) >= self.negative_ttl:
+                unresolved.append(key)
+        self.counters["hits"] += len(found)
+        return found, unresolved
+
+    async def resolve(self, keys: Iterable[MetricKey]) -> Dict[MetricKey, MetricRef]:
+        found, unresolved = self.lookup(keys)
+        if not unresolved:
+            return found
+        async with self._lock:
+            # 等锁期间其他请求可能已解析
+            pending = [key for key in unresolved if key not in self._refs]
+            if pending:
+                async with self.session_factory() as session:
+                    await self._load(session, pending)
+                    await session.commit()
+        now = time.monotonic()
+        for key in unresolved:
+            if key in self._refs:
+                found[key] = self._refs[key]
+            else:
+                self._missing[key] = now
+                self.counters["unknown"] += 1
+        return found
+
+    async def _load(self, session: AsyncSession, keys: List[MetricKey]) -> None:
+        self.counters["loads"] += 1
+        # 设备编号 -> 测点编号：station_id 对应已有测点时用之，否则测点以 device_id 命名（见 device_simulator）
+        devices = {device for device, _ in keys}
+        aliases: Dict[str, List[str]] = {device: [device] for device in devices}
+        rows = await session.execute(
+            select(SimulatedDevice.device_id, SimulatedDevice.station_id).where(
+                SimulatedDevice.device_id.in_(list(devices)), SimulatedDevice.station_id.is_not(None)
+            )
+        )
+        for device_id, station_id in rows.all():
+            aliases[device_id].insert(0, station_id)
+
+        candidates = {(code, metric_key) for device, metric_key in keys for code in aliases[device]}
+        stmt = (
+            select(
+                Sensor.point_code,
+                SensorMetric.metric_key,
+                Sensor.id,
+                SensorMetric.id,
+                SensorMetric.unit,
+                Sensor.is_simulated,
+            )
+            .join(SensorMetric.sensor)
+            .where(tuple_(Sensor.point_code, SensorMetric.metric_key).in_(list(candidates)))
+            .order_by(SensorMetric.id)
+        )
+        metrics: Dict[MetricKey, Tuple[int, int, Optional[str], bool]] = {}
+        for point_code, metric_key, sensor_id, metric_id, unit, is_simulated in (await session.execute(stmt)).all():
+            metrics.setdefault((point_code, metric_key), (sensor_id, metric_id, unit, is_simulated))
+
+        matched: Dict[MetricKey, Tuple[int, int, Optional[str], bool]] = {}
+        sensors: Dict[int, Tuple[str, bool]] = {}
+        for device, metric_key in keys:
+            for code in aliases[device]:
+                hit = metrics.get((code, metric_key))
+                if hit is not None:
+                    matched[(device, metric_key)] = hit
+                    sensors.setdefault(hit[0], (code, hit[3]))
+                    break
+        sources = await ensure_live_sources(session, sensors)
+        for key, (sensor_id, metric_id, unit, is_simulated) in matched.items():
+            self._refs[key] = MetricRef(sensor_id, metric_id, sources[sensor_id], unit, is_simulated)
+            self._missing.pop(key, None)
+
+    def invalidate(self) -> None:
+        self._refs.clear()
+        self._missing.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cached": len(self._refs), "negative": len(self._missing), **dict(self.counters)}
+
+
+def build_rows(points: List[Point], refs: Dict[MetricKey, MetricRef]) -> Tuple[List[Dict[str, Any]], List[MetricKey]]:
+    """读数点 -> sensor_readings 行；返回 (rows, 未知键)。"""
+    rows, unknown = [], set()
+    for device, metric_key, reading_time, value_num, value_text, quality in points:
+        ref = refs.get((device, metric_key))
+        if ref is None:
+            unknown.add((device, metric_key))
+            continue
+        rows.append(
+            dict(
+                sensor_id=ref.sensor_id,
+                metric_id=ref.metric_id,
+                reading_time=reading_time,
+                value_num=value_num,
+                value_text=value_text,
+                unit=ref.unit,
+                quality_flag=quality or DEFAULT_QUALITY_FLAG,
+                source_file_id=ref.source_id,
+                is_simulated=ref.is_simulated,
+            )
+        )
+    return rows, sorted(unknown)
+
+
+def _create_writer() -> BatchedReadingWriter:
+    settings = get_settings()
+    return BatchedReadingWriter(
+        max_batch=settings.ingest_batch_size,
+        flush_interval=settings.ingest_flush_interval,
+        max_pending=settings.ingest_max_pending,
+        use_copy=settings.ingest_use_copy,
+    )
+
+
+metric_key_cache = MetricKeyCache()
+ingest_writer = _create_writer()
@@ -0,0 +1,158 @@
+"""
+最新读数：每个 metric 一条。
+
+- 查询默认读取 ``sensor_latest_values`` 投影表（主键 metric_id），与历史数据量无关；
+- ``from_readings=True`` 时直接从 ``sensor_readings`` 用 ``LEFT JOIN LATERAL`` 计算，
+  由 ``ix_readings_metric_time_desc`` (metric_id, reading_time DESC) 索引支撑；
+- 写入方（ExcelImporter、实时写入）调用 ``upsert_latest_values``，仅当 reading_time 更新时覆盖；
+  实际被更新的行在提交后以 ``readings`` 主题推送给 ``/api/stream`` 订阅者；
+- ``rebuild_latest_values`` 用 DISTINCT ON 从原始读数全量重建投影。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import Select, delete, desc, func, or_, select, text, true
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models import Sensor, SensorMetric, SensorReading, SensorLatestValue
+from app.utils.broker import publish_on_commit
+
+
+LatestRow = Tuple[Sensor, SensorMetric, Optional[Union[SensorLatestValue, SensorReading]]]
+
+LATEST_COLUMNS = ("sensor_id", "reading_time", "value_num", "value_text", "unit", "source_file_id", "is_simulated")
+
+
+def _apply_filters(stmt: Select, metric_keys: list[str] | None, is_simulated: bool | None, warn_only: bool) -> Select:
+    if metric_keys:
+        stmt = stmt.where(SensorMetric.metric_key.in_(metric_keys))
+    if warn_only:
+        stmt = stmt.where(or_(SensorMetric.warn_low.is_not(None), SensorMetric.warn_high.is_not(None)))
+    if is_simulated is not None:
+        stmt = stmt.where(Sensor.is_simulated == is_simulated)
+    return stmt
+
+
+def latest_values_stmt(
+    metric_keys: list[str] | None = None,
+    is_simulated: bool | None = None,
+    warn_only: bool = False,
+) -> Select:
+    """构造 (Sensor, SensorMetric, SensorLatestValue | None) 查询（投影表）。"""
+    stmt = (
+        select(Sensor, SensorMetric, SensorLatestValue)
+        .join(SensorMetric.sensor)
+        .outerjoin(SensorLatestValue, SensorLatestValue.metric_id == SensorMetric.id)
+        .order_by(SensorMetric.id)
+    )
+    return _apply_filters(stmt, metric_keys, is_simulated, warn_only)
+
+
+def latest_readings_stmt(
+    metric_keys: list[str] | None = None,
+    is_simulated: bool | None = None,
+    warn_only: bool = False,
+) -> Select:
+    """构造 (Sensor, SensorMetric, 最新 SensorReading | None) 查询（原始读数）。"""
+    latest = (
+        select(SensorReading)
+        .where(SensorReading.metric_id == SensorMetric.id)
+        .order_by(desc(SensorReading.reading_time))
+        .limit(1)
+        .lateral("latest_reading")
+    )
+    reading = aliased(SensorReading, latest)
+    stmt = (
+        select(Sensor, SensorMetric, reading)
+        .join(SensorMetric.sensor)
+        .outerjoin(latest, true())
+        .order_by(SensorMetric.id)
+    )
+    return _apply_filters(stmt, metric_keys, is_simulated, warn_only)
+
+
+async def fetch_latest_readings(
+    session: AsyncSession,
+    metric_keys: list[str] | None = None,
+    is_simulated: bool | None = None,
+    warn_only: bool = False,
+    from_readings: bool = False,
+) -> List[LatestRow]:
+    """返回 [(sensor, metric, latest)]，没有读数的 metric 对应 latest 为 None。
+
+    latest 具有 reading_time / value_num / value_text / unit 属性，与 SensorReading 一致。
+    """
+    build = latest_readings_stmt if from_readings else latest_values_stmt
+    rows = (await session.execute(build(metric_keys, is_simulated, warn_only))).all()
+    return [(sensor, metric, latest) for sensor, metric, latest in rows]
+
+
+def collect_latest(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """从待写入的读数 dict 中挑出每个 metric_id 的最新一条（用于 upsert 投影）。"""
+    latest: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        current = latest.get(row["metric_id"])
+        if current is None or row["reading_time"] > current["reading_time"]:
+            latest[row["metric_id"]] = row
+    return [
+        {"metric_id": metric_id, **{col: row.get(col) for col in LATEST_COLUMNS}}
+        for metric_id, row in latest.items()
+    ]
+
+
+def latest_event(row: Any) -> Dict[str, Any]:
+    """``readings`` 推送事件（JSON 可直接序列化）。"""
+    return {
+        "metric_id": row.metric_id,
+        "sensor_id": row.sensor_id,
+        "reading_time": row.reading_time.isoformat() if row.reading_time else None,
+        "value_num": row.value_num,
+        "value_text": row.value_text,
+        "unit": row.unit,
+        "is_simulated": row.is_simulated,
+    }
+
+
+async def upsert_latest_values(session: AsyncSession, rows: Iterable[Dict[str, Any]]) -> int:
+    """把新读数合并进投影；仅当 reading_time 比已有值更新时才覆盖。返回实际新增/更新的指标数。"""
+    values = collect_latest(rows)
+    if not values:
+        return 0
+    stmt = insert(SensorLatestValue).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SensorLatestValue.metric_id],
+        set_={**{col: stmt.excluded[col] for col in LATEST_COLUMNS}, "updated_at": func.now()},
+        where=SensorLatestValue.reading_time < stmt.excluded.reading_time,
+    )
+    # RETURNING 只返回真正写入的行，补导更早的数据不会推送
+    stmt = stmt.returning(SensorLatestValue.metric_id, *(getattr(SensorLatestValue, c) for c in LATEST_COLUMNS))
+    changed = (await session.execute(stmt)).all()
+    publish_on_commit(session, "readings", map(latest_event, changed))
+    return len(changed)
+
+
+REBUILD_SQL = """
+INSERT INTO sensor_latest_values
+    (metric_id, sensor_id, reading_time, value_num, value_text, unit, source_file_id, is_simulated, updated_at)
+SELECT DISTINCT ON (metric_id)
+    metric_id, sensor_id, reading_time, value_num, value_text, unit, source_file_id, is_simulated, now()
+FROM sensor_readings
+{where}
+ORDER BY metric_id, reading_time DESC
+"""
+
+
+async def rebuild_latest_values(session: AsyncSession, metric_ids: list[int] | None = None) -> int:
+    """从 sensor_readings 全量（或指定 metric）重建投影，返回写入行数。"""
+    if metric_ids is not None:
+        await session.execute(delete(SensorLatestValue).where(SensorLatestValue.metric_id.in_(metric_ids)))
+        stmt = text(REBUILD_SQL.format(where="WHERE metric_id = ANY(:metric_ids)")).bindparams(metric_ids=metric_ids)
+    else:
+        await session.execute(delete(SensorLatestValue))
+        stmt = text(REBUILD_SQL.format(where=""))
+    result = await session.execute(stmt)
+    return result.rowcount or 0
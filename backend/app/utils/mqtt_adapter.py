@@ -0,0 +1,217 @@
+"""
+MQTT 风格实时接入适配器：订阅 ``twin/{station_id}/{device_id}/{metric}`` 主题树，解码后批量写入 sensor_readings。
+
+- 负载：JSON（数值；``{"t"|"time", "v"|"value"}`` 或其数组；``{"time", "values": {...}}`` 多指标，此时主题可省略 metric 层）
+  或紧凑二进制（版本字节 0x01 + N 个 (int64 毫秒时间戳, float64 值)，大端，每个样本 16 字节）；
+- metric 名按 waterLevel -> water_level 归一，(device_id, metric_key) 经 ``MetricKeyCache`` 解析（与 /api/v1/ingest 相同）；
+- 至少一次：攒够 ``batch_size`` 条消息或等待 ``flush_interval`` 秒后，经 ``BatchedReadingWriter`` 提交成功才 ack；
+  写入失败不 ack，由 broker 超时重发；最多 ``max_inflight_batches`` 批同时等待提交；
+- 质量标记：JSON 可带 ``quality_flag``（校验同 /api/v1/ingest），缺省与二进制负载由 ``build_rows`` 取默认值 ``normal``；
+- 幂等：读数按唯一键 (metric_id, reading_time, source_file_id) 去重；负载不带时间戳时用 broker 的发布时间（重发不变），
+  因此重复投递不会产生重复读数；
+- 无法解码或键未知的消息同样 ack（计入 invalid / unknown，保留最近若干条供排查），避免毒消息无限重发。
+
+broker 只需提供 ``connect / subscribe / disconnect`` 与会话的 ``receive / ack``：
+测试与压测使用 ``app/utils/mqtt_broker.py`` 的进程内替身，接入真实 MQTT 服务时按同一接口包装客户端即可。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import struct
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.device_simulator import metric_key_of
+from app.utils.ingest import Point, build_rows, parse_quality, parse_time, parse_value
+from app.utils.mqtt_broker import Delivery, MqttSession
+
+
+TOPIC_PREFIX = "twin"
+BINARY_VERSION = 1
+SAMPLE = struct.Struct(">qd")
+RECENT_FAILURES = 50
+
+
+def topic_for(station_id: str, device_id: str, metric: Optional[str] = None, prefix: str = TOPIC_PREFIX) -> str:
+    return "/".join(part for part in (prefix, station_id, device_id, metric) if part)
+
+
+def encode_binary(samples: Iterable[Tuple[datetime, float]]) -> bytes:
+    """紧凑二进制负载：样本时间为 UTC naive datetime。"""
+    body = b"".join(
+        SAMPLE.pack(int(t.replace(tzinfo=timezone.utc).timestamp() * 1000), float(value)) for t, value in samples
+    )
+    return bytes([BINARY_VERSION]) + body
+
+
+def decode_binary(payload: bytes) -> List[Tuple[datetime, float]]:
+    if (len(payload) - 1) % SAMPLE.size:
+        raise ValueError(f"binary payload length {len(payload)} is not 1 + n*{SAMPLE.size}")
+    return [
+        (datetime.fromtimestamp(ms / 1000, timezone.utc).replace(tzinfo=None), value)
+        for ms, value in SAMPLE.iter_unpack(payload[1:])
+    ]
+
+
+def decode_message(topic: str, payload: bytes, published_at: datetime, prefix: str = TOPIC_PREFIX) -> List[Point]:
+    """一条消息 -> 读数点 (device, metric_key, reading_time, value_num, value_text, quality)。"""
+    levels = topic.split("/")
+    if levels[0] != prefix or len(levels) not in (3, 4):
+        raise ValueError(f"unexpected topic: {topic}")
+    device = levels[2]
+    metric = metric_key_of(levels[3]) if len(levels) == 4 else None
+
+    if payload[:1] == bytes([BINARY_VERSION]):
+        if metric is None:
+            raise ValueError("binary payload requires a metric topic level")
+        return [(device, metric, t, value, None, None) for t, value in decode_binary(payload)]
+
+    body = json.loads(payload)
+    samples = body if isinstance(body, list) else [body]
+    points: List[Point] = []
+    for sample in samples:
+        if isinstance(sample, dict):
+            reading_time = parse_time(sample.get("t", sample.get("time")), published_at)
+            quality = parse_quality(sample.get("quality_flag"))
+            if "values" in sample:
+                for name, value in sample["values"].items():
+                    points.append((device, metric_key_of(name), reading_time, *parse_value(value), quality))
+                continue
+            value = sample.get("v", sample.get("value"))
+        else:
+            reading_time, quality, value = published_at, None, sample
+        if metric is None:
+            raise ValueError("single-value payload requires a metric topic level")
+        points.append((device, metric, reading_time, *parse_value(value), quality))
+    return points
+
+
+class MqttIngestAdapter:
+    def __init__(
+        self,
+        broker: Any,
+        writer: Any,
+        resolver: Any,
+        topic_filter: str = f"{TOPIC_PREFIX}/#",
+        client_id: str = "twin-ingest",
+        batch_size: int = 500,
+        flush_interval: float = 0.2,
+        max_inflight_batches: int = 4,
+        prefix: str = TOPIC_PREFIX,
+    ):
+        self.broker = broker
+        self.writer = writer
+        self.resolver = resolver
+        self.topic_filter = topic_filter
+        self.client_id = client_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.prefix = prefix
+        self.counters: Counter = Counter()
+        self.failures: Deque[Dict[str, Any]] = deque(maxlen=RECENT_FAILURES)
+        self.session: Optional[MqttSession] = None
+        self._slots = asyncio.Semaphore(max_inflight_batches)
+        self._commits: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> "MqttIngestAdapter":
+        # 持久会话：适配器重启期间的消息不丢
+        self.session = self.broker.connect(self.client_id, clean=False)
+        self.broker.subscribe(self.session, self.topic_filter, qos=1)
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self) -> None:
+        """停止接收，等待已攒批次提交后断开；未 ack 的消息留在 broker 会话中。"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._commits:
+            await asyncio.gather(*self._commits, return_exceptions=True)
+        if self.session is not None:
+            self.broker.disconnect(self.session)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self.session.receive()
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                delivery = await self.session.receive(remaining)
+                if delivery is None:
+                    break
+                batch.append(delivery)
+            await self._slots.acquire()
+            task = asyncio.create_task(self._commit(batch))
+            self._commits.add(task)
+            task.add_done_callback(self._commits.discard)
+
+    def _fail(self, kind: str, delivery: Delivery, error: str) -> None:
+        self.counters[kind] += 1
+        self.failures.append({"kind": kind, "topic": delivery.message.topic, "error": error})
+
+    async def _commit(self, batch: List[Delivery]) -> None:
+        try:
+            self.counters["messages"] += len(batch)
+            self.counters["redelivered"] += sum(1 for d in batch if d.dup)
+            points: List[Point] = []
+            owners: List[Tuple[Delivery, List[Point]]] = []
+            for delivery in batch:
+                message = delivery.message
+                try:
+                    decoded = decode_message(message.topic, message.payload, message.published_at, self.prefix)
+                except (ValueError, TypeError, KeyError, AttributeError, OverflowError) as exc:
+                    self._fail("invalid", delivery, str(exc))
+                    continue
+                points.extend(decoded)
+                owners.append((delivery, decoded))
+            try:
+                refs = await self.resolver.resolve({(device, metric) for device, metric, *_ in points})
+                rows, unknown = build_rows(points, refs)
+                inserted = await self.writer.put(rows, wait_commit=True) if rows else 0
+            except Exception as exc:  # 键解析或写库失败：不 ack，等待 broker 重发
+                self.counters["commit_failed"] += 1
+                self.failures.append({"kind": "commit_failed", "topic": None, "error": f"{type(exc).__name__}: {exc}"})
+                return
+            if unknown:
+                missing = set(unknown)
+                for delivery, decoded in owners:
+                    if any((p[0], p[1]) in missing for p in decoded):
+                        self._fail("unknown", delivery, "unknown device/metric")
+            self.counters["rows"] += len(rows)
+            self.counters["rows_inserted"] += inserted
+            for delivery in batch:
+                self.session.ack(delivery.packet_id)
+            self.counters["acked"] += len(batch)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **{
+                name: self.counters[name]
+                for name in (
+                    "messages",
+                    "redelivered",
+                    "rows",
+                    "rows_inserted",
+                    "acked",
+                    "invalid",
+                    "unknown",
+                    "commit_failed",
+                )
+            },
+            "inflight_batches": len(self._commits),
+            "recent_failures": list(self.failures)[-5:],
+        }
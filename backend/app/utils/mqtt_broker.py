@@ -0,0 +1,202 @@
+"""
+进程内 MQTT 风格 broker 替身：没有外部 MQTT 服务时，供实时接入适配器做吞吐与丢失测试。
+
+- 主题过滤：``+`` 匹配单层，``#`` 匹配其后所有层（只能出现在末尾，``a/#`` 同时匹配 ``a``）；
+- QoS 1（至少一次）：投递后进入会话的 inflight 表，``ack(packet_id)`` 前超过 ``ack_timeout`` 秒以 dup=True 重发；
+  每个会话 inflight 上限 ``receive_maximum``，超出的消息留在 backlog 中等待（流控）；QoS 0 投递即忘；
+- 持久会话：``connect(client_id, clean=False)`` 的会话断开后保留未确认与未投递的消息，重连后重新投递；
+- 故障注入：``drop_rate`` 按概率丢弃投递（模拟链路丢包，由超时重发补偿），``duplicate_rate`` 按概率重复投递。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    levels = topic.split("/")
+    for i, part in enumerate(topic_filter.split("/")):
+        if part == "#":
+            return True
+        if i >= len(levels) or (part != "+" and part != levels[i]):
+            return False
+    return len(topic_filter.split("/")) == len(levels)
+
+
+@dataclass(frozen=True)
+class Message:
+    topic: str
+    payload: bytes
+    qos: int
+    # 发布时间（UTC），重发时不变；负载不带时间戳时用作读数时间
+    published_at: datetime
+
+
+@dataclass(frozen=True)
+class Delivery:
+    packet_id: int
+    message: Message
+    dup: bool = False
+
+
+@dataclass
+class MqttSession:
+    client_id: str
+    clean: bool
+    filters: List[Tuple[str, int]] = field(default_factory=list)
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    backlog: Deque[Message] = field(default_factory=deque)
+    inflight: Dict[int, Tuple[Message, float]] = field(default_factory=dict)
+    connected: bool = True
+    broker: Optional["EmbeddedMqttBroker"] = None
+
+    async def receive(self, timeout: Optional[float] = None) -> Optional[Delivery]:
+        """下一条投递；timeout 秒内没有时返回 None。"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def ack(self, packet_id: int) -> None:
+        """PUBACK：从 inflight 移除并补投 backlog；重复或过期的 ack 忽略。"""
+        if self.inflight.pop(packet_id, None) is not None:
+            self.broker.counters["acked"] += 1
+            self.broker._pump(self)
+
+
+class EmbeddedMqttBroker:
+    def __init__(
+        self,
+        ack_timeout: float = 5.0,
+        receive_maximum: int = 1000,
+        drop_rate: float = 0.0,
+        duplicate_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.ack_timeout = ack_timeout
+        self.receive_maximum = receive_maximum
+        self.drop_rate = drop_rate
+        self.duplicate_rate = duplicate_rate
+        self.rng = random.Random(seed)
+        self.sessions: Dict[str, MqttSession] = {}
+        self.counters: Counter = Counter()
+        self._packet_ids = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+
+    # --- 客户端 ---
+
+    def connect(self, client_id: str, clean: bool = True) -> MqttSession:
+        session = self.sessions.get(client_id)
+        if session is None or clean:
+            session = MqttSession(client_id, clean, broker=self)
+            self.sessions[client_id] = session
+        session.connected = True
+        self._pump(session)
+        return session
+
+    def disconnect(self, session: MqttSession) -> None:
+        session.connected = False
+        if session.clean:
+            self.sessions.pop(session.client_id, None)
+            return
+        # 未确认的消息按原顺序放回 backlog 队首，重连后重新投递
+        for packet_id in sorted(session.inflight, reverse=True):
+            session.backlog.appendleft(session.inflight[packet_id][0])
+        session.inflight.clear()
+        session.queue = asyncio.Queue()
+
+    def subscribe(self, session: MqttSession, topic_filter: str, qos: int = 1) -> None:
+        if "#" in topic_filter[:-1]:
+            raise ValueError(f"'#' must be the last level: {topic_filter}")
+        session.filters = [f for f in session.filters if f[0] != topic_filter] + [(topic_filter, qos)]
+
+    def publish(self, topic: str, payload: bytes, qos: int = 1) -> int:
+        """发布到所有匹配的会话（离线的持久会话进入 backlog），返回匹配的会话数。"""
+        if "+" in topic or "#" in topic:
+            raise ValueError(f"wildcards are not allowed in topic names: {topic}")
+        published_at = datetime.utcnow()
+        self.counters["published"] += 1
+        matched = 0
+        for session in self.sessions.values():
+            granted = max((q for f, q in session.filters if topic_matches(f, topic)), default=None)
+            if granted is None:
+                continue
+            matched += 1
+            message = Message(topic, payload, min(qos, granted), published_at)
+            if message.qos == 0:
+                if session.connected:
+                    self._send(session, Delivery(0, message))
+                continue
+            session.backlog.append(message)
+            self._pump(session)
+        return matched
+
+    # --- 投递 ---
+
+    def _send(self, session: MqttSession, delivery: Delivery) -> None:
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            self.counters["dropped"] += 1
+            return
+        session.queue.put_nowait(delivery)
+        self.counters["delivered"] += 1
+        if self.duplicate_rate and self.rng.random() < self.duplicate_rate:
+            session.queue.put_nowait(Delivery(delivery.packet_id, delivery.message, dup=True))
+            self.counters["duplicated"] += 1
+
+    def _pump(self, session: MqttSession) -> None:
+        while session.connected and session.backlog and len(session.inflight) < self.receive_maximum:
+            message = session.backlog.popleft()
+            packet_id = next(self._packet_ids)
+            session.inflight[packet_id] = (message, time.monotonic())
+            self._send(session, Delivery(packet_id, message))
+
+    def redeliver(self) -> int:
+        """重发超时未确认的消息，返回重发条数。"""
+        now = time.monotonic()
+        count = 0
+        for session in self.sessions.values():
+            if not session.connected:
+                continue
+            for packet_id, (message, sent_at) in list(session.inflight.items()):
+                if now - sent_at >= self.ack_timeout:
+                    session.inflight[packet_id] = (message, now)
+                    self._send(session, Delivery(packet_id, message, dup=True))
+                    count += 1
+        self.counters["redelivered"] += count
+        return count
+
+    async def _redeliver_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.ack_timeout / 4)
+            self.redeliver()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._redeliver_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **{
+                name: self.counters[name]
+                for name in ("published", "delivered", "acked", "redelivered", "dropped", "duplicated")
+            },
+            "sessions": len(self.sessions),
+            "inflight": sum(len(s.inflight) for s in self.sessions.values()),
+            "backlog": sum(len(s.backlog) for s in self.sessions.values()),
+        }
@@ -0,0 +1,177 @@
+"""
+sensor_readings 按 reading_time 月度范围分区的维护。
+
+- 分区命名 ``sensor_readings_pYYYYMM``，范围 [月初, 下月初)；另有 ``sensor_readings_default`` 兜底；
+- 索引/唯一约束定义在父表上，PostgreSQL 自动为每个分区建立对应索引；
+- ``ensure_partitions`` 创建当前月到未来 N 个月的分区，``ensure_partitions_for`` 为一批读数涉及的月份建分区
+  （导入历史 Excel 时必须先建，否则数据落入 default 分区）；若 default 中已有该月数据，先迁入新分区再挂载；
+- ``apply_retention`` 按保留月数把过期分区 detach，随后按策略归档到 ``archive`` schema 或删除。
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+PARENT = "sensor_readings"
+DEFAULT_PARTITION = f"{PARENT}_default"
+ARCHIVE_SCHEMA = "archive"
+RETENTION_POLICIES = ("detach", "archive", "drop")
+
+LIST_PARTITIONS_SQL = """
+SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound, c.reltuples::bigint AS est_rows
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+JOIN pg_class p ON p.oid = i.inhparent
+WHERE p.relname = :parent
+ORDER BY c.relname
+"""
+
+# 已知存在的分区（进程内缓存），避免每批写入都查系统表。
+# 本事务新建/确认的分区先暂存在 session.info，提交后才并入缓存：回滚会撤销 CREATE TABLE，
+# 若提前缓存，之后的批次会跳过建表，读数落入 default 分区。
+_known: Set[str] = set()
+PENDING_KEY = "pending_partitions"
+
+
+def month_start(value: datetime | date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_p{month:%Y%m}"
+
+
+def create_partition_sql(month: date) -> str:
+    upper = add_months(month, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+    )
+
+
+def create_default_partition_sql() -> str:
+    return f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"
+
+
+async def list_partitions(session: AsyncSession) -> List[Dict[str, Any]]:
+    rows = (await session.execute(text(LIST_PARTITIONS_SQL).bindparams(parent=PARENT))).mappings().all()
+    return [dict(r) for r in rows]
+
+
+async def _relation_exists(session: AsyncSession, name: str) -> bool:
+    return bool(await session.scalar(text("SELECT to_regclass(:name) IS NOT NULL").bindparams(name=name)))
+
+
+async def _create_partition(session: AsyncSession, month: date) -> bool:
+    """建月分区；default 分区中已有该月数据时先建独立表、搬迁数据再 ATTACH。返回是否新建。"""
+    name = partition_name(month)
+    if await _relation_exists(session, name):
+        return False
+    in_range = f"reading_time >= '{month:%Y-%m-%d}' AND reading_time < '{add_months(month, 1):%Y-%m-%d}'"
+    in_default = await _relation_exists(session, DEFAULT_PARTITION) and await session.scalar(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})")
+    )
+    if not in_default:
+        await session.execute(text(create_partition_sql(month)))
+        return True
+    await session.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS)"))
+    await session.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        )
+    )
+    bound = create_partition_sql(month).split(" FOR VALUES ", 1)[1]
+    await session.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES {bound}"))
+    return True
+
+
+async def ensure_months(session: AsyncSession, months: Iterable[date]) -> List[str]:
+    """确保给定月份的分区存在，返回新建的分区名。"""
+    created = []
+    pending = session.info.setdefault(PENDING_KEY, set())
+    for month in sorted(set(months)):
+        name = partition_name(month)
+        if name in _known or name in pending:
+            continue
+        if await _create_partition(session, month):
+            created.append(name)
+        pending.add(name)
+    return created
+
+
+async def ensure_partitions(session: AsyncSession, months_ahead: int = 3, today: Optional[date] = None) -> List[str]:
+    """当前月及未来 months_ahead 个月的分区，以及 default 分区。"""
+    await session.execute(text(create_default_partition_sql()))
+    current = month_start(today or date.today())
+    return await ensure_months(session, (add_months(current, i) for i in range(months_ahead + 1)))
+
+
+async def ensure_partitions_for(session: AsyncSession, rows: Iterable[Dict[str, Any]]) -> List[str]:
+    """写入前为本批读数涉及的月份建分区（已知分区直接跳过，不访问数据库）。"""
+    months = {month_start(row["reading_time"]) for row in rows if row.get("reading_time") is not None}
+    pending = session.info.get(PENDING_KEY, ())
+    if all(partition_name(m) in _known or partition_name(m) in pending for m in months):
+        return []
+    return await ensure_months(session, months)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    _known.update(session.info.pop(PENDING_KEY, None) or ())
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_transaction_end(session: Session, transaction) -> None:
+    # 回滚 / 未提交即关闭：丢弃暂存的分区名
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+def _upper_bound(bound: str) -> Optional[date]:
+    # 形如 FOR VALUES FROM ('2024-01-01 00:00:00') TO ('2024-02-01 00:00:00')
+    if "TO ('" not in bound:
+        return None
+    return datetime.fromisoformat(bound.split("TO ('", 1)[1].split("'", 1)[0]).date()
+
+
+async def apply_retention(
+    session: AsyncSession,
+    keep_months: int,
+    policy: str = "archive",
+    today: Optional[date] = None,
+    dry_run: bool = False,
+) -> List[Dict[str, Any]]:
+    """detach 上界早于 (当前月 - keep_months) 的月分区；policy=archive 移入 archive schema，drop 直接删除。
+
+    汇总表（sensor_readings_1h/1d）与最新值投影不受影响，历史趋势仍可查询。
+    """
+    if policy not in RETENTION_POLICIES:
+        raise ValueError(f"Unknown retention policy: {policy}")
+    cutoff = add_months(month_start(today or date.today()), -keep_months)
+    expired = [
+        p for p in await list_partitions(session) if (upper := _upper_bound(p["bound"])) is not None and upper <= cutoff
+    ]
+    if dry_run:
+        return expired
+    if policy == "archive" and expired:
+        await session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+    for p in expired:
+        await session.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {p['relname']}"))
+        if policy == "archive":
+            await session.execute(text(f"ALTER TABLE {p['relname']} SET SCHEMA {ARCHIVE_SCHEMA}"))
+        elif policy == "drop":
+            await session.execute(text(f"DROP TABLE {p['relname']}"))
+        _known.discard(p["relname"])
+    return expired
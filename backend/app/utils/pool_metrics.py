@@ -0,0 +1,69 @@
+"""
+连接池使用情况：QueuePool 的即时状态 + 通过池事件累计的计数。
+
+- ``checked_out`` / ``overflow`` 接近 ``pool_size + max_overflow`` 说明池偏小，请求会排队直到 pool_timeout；
+- ``peak_checked_out`` 为进程启动以来的最大并发借出数，用于确定 DB_POOL_SIZE；
+- ``invalidated`` 增长通常意味着 pre-ping 发现了断开的连接（数据库重启、空闲超时）。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidated = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+
+    def attach(self, engine: AsyncEngine) -> "PoolMetrics":
+        pool = engine.sync_engine.pool
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+        event.listen(pool, "invalidate", self._on_invalidate)
+        return self
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self.checkouts += 1
+        self.checked_out += 1
+        self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        self.checkins += 1
+        self.checked_out = max(self.checked_out - 1, 0)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        self.invalidated += 1
+
+    def stats(self, engine: AsyncEngine) -> Dict[str, Any]:
+        pool = engine.sync_engine.pool
+        snapshot: Dict[str, Any] = {"pool": type(pool).__name__}
+        # NullPool/StaticPool 等没有容量概念
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            fn = getattr(pool, name, None)
+            if callable(fn):
+                snapshot[name] = fn()
+        capacity = snapshot.get("size", 0) + getattr(pool, "_max_overflow", 0)
+        if capacity > 0 and "checkedout" in snapshot:
+            snapshot["capacity"] = capacity
+            snapshot["utilization"] = round(snapshot["checkedout"] / capacity, 4)
+        snapshot["timeout_seconds"] = getattr(pool, "_timeout", None)
+        snapshot.update(
+            connects=self.connects,
+            checkouts=self.checkouts,
+            checkins=self.checkins,
+            invalidated=self.invalidated,
+            peak_checked_out=self.peak_checked_out,
+        )
+        return snapshot
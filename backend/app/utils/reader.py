@@ -1,10 +1,225 @@
-import pandas as pd
+import hashlib
+import json
 import os
-from typing import Dict, List, Any
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+
+import pandas as pd
+
+from app.config import get_settings
+
+try:  # Parquet 旁路文件为可选功能，需要 pyarrow
+    import pyarrow  # noqa: F401
+
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+# --- 解析结果缓存 ---
+# 以 (绝对路径, mtime_ns, size) 为 key 的 LRU，按估算内存占用淘汰；文件被修改后 key 变化，旧条目自然失效。
+# 配置了 workbook_cache_sidecar_dir 且安装 pyarrow 时，解析后的表另存为 Parquet，
+# 新进程冷启动时直接读 Parquet，不再经过 openpyxl。
+
+WorkbookKey = Tuple[str, int, int]
+
+
+@dataclass
+class WorkbookEntry:
+    key: WorkbookKey
+    frame: pd.DataFrame
+    nbytes: int
+    _result: Optional[Dict[str, Any]] = field(default=None, repr=False)
+    _times: Optional[pd.Series] = field(default=None, repr=False)
+
+    def times(self) -> pd.Series:
+        """首列（时间列）解析为 datetime，用于 start/end 过滤；无法解析的为 NaT。"""
+        if self._times is None:
+            if self.frame.empty:
+                self._times = pd.Series([], dtype="datetime64[ns]")
+            else:
+                self._times = pd.to_datetime(self.frame.iloc[:, 0], errors="coerce", format="mixed")
+        return self._times
+
+    def result(self) -> Dict[str, Any]:
+        """read_excel_data 的返回结构，首次访问时构建并随条目缓存（调用方不可修改）。"""
+        if self._result is None:
+            self._result = {
+                "columns": self.frame.columns.tolist(),
+                "data": self.frame.to_dict(orient="records"),
+                "meta": {"filename": os.path.basename(self.key[0]), "row_count": len(self.frame)},
+            }
+        return self._result
+
+
+class WorkbookCache:
+    def __init__(self, max_bytes: int, sidecar_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.sidecar_dir = sidecar_dir if sidecar_dir and HAS_PYARROW else None
+        self._entries: "OrderedDict[str, WorkbookEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.stale = 0
+        self.sidecar_hits = 0
+        self.sidecar_writes = 0
+        self.sidecar_errors = 0
+
+    @staticmethod
+    def key_for(path: str) -> WorkbookKey:
+        st = os.stat(path)
+        return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+    def get(self, path: str) -> WorkbookEntry:
+        """返回缓存的解析结果；未命中时解析（或读 Parquet 旁路文件）并放入缓存。文件不存在时抛 OSError。"""
+        key = self.key_for(path)
+        with self._lock:
+            entry = self._entries.get(key[0])
+            if entry is not None:
+                if entry.key == key:
+                    self._entries.move_to_end(key[0])
+                    self.hits += 1
+                    return entry
+                self._remove(key[0])
+                self.stale += 1
+            self.misses += 1
+
+        frame = self._read_sidecar(key)
+        if frame is None:
+            frame = _load_frame(key[0])
+            self._write_sidecar(key, frame)
+        entry = WorkbookEntry(key=key, frame=frame, nbytes=_estimate_bytes(frame))
+        with self._lock:
+            self._store(entry)
+        return entry
+
+    def _store(self, entry: WorkbookEntry) -> None:
+        if entry.nbytes > self.max_bytes:
+            return  # 超过整个预算的表不缓存
+        if entry.key[0] in self._entries:
+            self._remove(entry.key[0])
+        while self._entries and self.bytes + entry.nbytes > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self.bytes -= old.nbytes
+            self.evictions += 1
+            self.evicted_bytes += old.nbytes
+        self._entries[entry.key[0]] = entry
+        self.bytes += entry.nbytes
+
+    def _remove(self, path: str) -> None:
+        old = self._entries.pop(path)
+        self.bytes -= old.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _sidecar_path(self, key: WorkbookKey) -> str:
+        digest = hashlib.sha1(key[0].encode("utf-8")).hexdigest()
+        return os.path.join(self.sidecar_dir, f"{digest}-{key[1]}-{key[2]}.parquet")
+
+    def _read_sidecar(self, key: WorkbookKey) -> Optional[pd.DataFrame]:
+        if not self.sidecar_dir:
+            return None
+        path = self._sidecar_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            frame = pd.read_parquet(path)
+        except Exception:
+            self.sidecar_errors += 1
+            return None
+        self.sidecar_hits += 1
+        # Parquet 读回的缺失值为 NaN/None 混合，与直接解析保持一致
+        return frame.astype(object).where(pd.notnull(frame), None)
+
+    def _write_sidecar(self, key: WorkbookKey, frame: pd.DataFrame) -> None:
+        if not self.sidecar_dir or not all(isinstance(c, str) for c in frame.columns):
+            return  # Parquet 列名必须是字符串
+        target = self._sidecar_path(key)
+        prefix = os.path.basename(target).split("-", 1)[0]
+        try:
+            os.makedirs(self.sidecar_dir, exist_ok=True)
+            tmp = f"{target}.tmp"
+            frame.to_parquet(tmp, index=False)
+            os.replace(tmp, target)
+            # 同一文件的旧版本旁路文件不再有用
+            for name in os.listdir(self.sidecar_dir):
+                if name.startswith(prefix + "-") and name != os.path.basename(target):
+                    os.remove(os.path.join(self.sidecar_dir, name))
+        except Exception:
+            # 混合类型列等无法写 Parquet 的表只走内存缓存
+            self.sidecar_errors += 1
+            return
+        self.sidecar_writes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "sidecar_dir": self.sidecar_dir,
+            "sidecar_hits": self.sidecar_hits,
+            "sidecar_writes": self.sidecar_writes,
+            "sidecar_errors": self.sidecar_errors,
+        }
+
+
+def _estimate_bytes(frame: pd.DataFrame) -> int:
+    """估算条目内存：DataFrame 深度占用 + 记录列表（每行一个 dict）的开销。"""
+    frame_bytes = int(frame.memory_usage(deep=True).sum())
+    if frame.empty:
+        return frame_bytes
+    row_dict = sys.getsizeof(dict.fromkeys(frame.columns))
+    return frame_bytes * 2 + len(frame) * row_dict
+
+
+def _load_frame(file_path: str) -> pd.DataFrame:
+    # 读取 Excel，默认读取第一个 sheet
+    # header=0 假设第一行为表头。如果实际数据表头复杂，需要根据实际情况调整
+    df = pd.read_excel(file_path, header=0)
+
+    # 处理日期列：尝试转换第一列或名为 '日期'/'Date'/'Time' 的列
+    # 这里做一个简单的启发式处理：如果第一列看起来像日期，就格式化它
+    if not df.empty:
+        first_col = df.columns[0]
+        # 尝试转换为 datetime 格式，无效的转为 NaT
+        try:
+            df[first_col] = pd.to_datetime(df[first_col])
+            # 格式化为字符串，避免 JSON 序列化问题
+            df[first_col] = df[first_col].dt.strftime('%Y-%m-%d %H:%M:%S')
+        except:
+            pass # 如果转换失败，保留原样
+
+    # 处理 NaN 值，替换为 None (JSON null)；先转 object，pandas 3 的字符串列 where(None) 会保留 NaN
+    return df.astype(object).where(pd.notnull(df), None)
+
+
+_settings = get_settings()
+workbook_cache = WorkbookCache(
+    max_bytes=_settings.workbook_cache_max_mb * 1024 * 1024,
+    sidecar_dir=_settings.workbook_cache_sidecar_dir,
+)
+
 
 def read_excel_data(file_path: str) -> Dict[str, Any]:
     """
-    读取 Excel 文件内容，返回标准化数据格式
+    读取 Excel 文件内容，返回标准化数据格式（解析结果经 workbook_cache 缓存）
     {
         "columns": ["时间", "测值1", ...],
         "data": [
@@ -18,37 +233,66 @@ def read_excel_data(file_path: str) -> Dict[str, Any]:
         return {"error": "File not found"}
 
     try:
-        # 读取 Excel，默认读取第一个 sheet
-        # header=0 假设第一行为表头。如果实际数据表头复杂，需要根据实际情况调整
-        df = pd.read_excel(file_path, header=0)
-        
-        # 处理日期列：尝试转换第一列或名为 '日期'/'Date'/'Time' 的列
-        # 这里做一个简单的启发式处理：如果第一列看起来像日期，就格式化它
-        if not df.empty:
-            first_col = df.columns[0]
-            # 尝试转换为 datetime 格式，无效的转为 NaT
-            try:
-                df[first_col] = pd.to_datetime(df[first_col])
-                # 格式化为字符串，避免 JSON 序列化问题
-                df[first_col] = df[first_col].dt.strftime('%Y-%m-%d %H:%M:%S')
-            except:
-                pass # 如果转换失败，保留原样
-
-        # 处理 NaN 值，替换为 None (JSON null)
-        df = df.where(pd.notnull(df), None)
-
-        # 转换为记录列表
-        data = df.to_dict(orient='records')
-        columns = df.columns.tolist()
-
-        return {
-            "columns": columns,
-            "data": data,
-            "meta": {
-                "filename": os.path.basename(file_path),
-                "row_count": len(df)
-            }
-        }
-
+        return workbook_cache.get(file_path).result()
     except Exception as e:
         return {"error": str(e)}
+
+
+def read_latest_record(file_path: str) -> Optional[Dict[str, Any]]:
+    """只取最后一行记录（看板最新值），不构建整表的记录列表；文件缺失/无数据/解析失败时返回 None。"""
+    try:
+        frame = workbook_cache.get(file_path).frame
+    except Exception:
+        return None
+    if frame.empty:
+        return None
+    return frame.iloc[-1:].to_dict(orient="records")[0]
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """带时区的 start/end 转为 UTC naive，与时间列（naive）可比较；naive 值原样返回。"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def query_excel_data(
+    file_path: str,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Tuple[pd.DataFrame, int]:
+    """按时间范围过滤、分页并投影列，返回 (结果 DataFrame, 过滤后的总行数)。
+
+    时间过滤作用于首列（与 read_excel_data 的时间列启发式一致），start/end 均为闭区间；带时区时先转为 UTC。
+    未知列名抛 KeyError；只切片缓存中的 DataFrame，不构建整表的记录列表。
+    """
+    entry = workbook_cache.get(file_path)
+    frame = entry.frame
+    start, end = _naive_utc(start), _naive_utc(end)
+    if start is not None or end is not None:
+        times = entry.times()
+        mask = times.notna()
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times <= end
+        frame = frame[mask.to_numpy()]
+    total = len(frame)
+    stop = None if limit is None else offset + limit
+    frame = frame.iloc[offset:stop]
+    if columns:
+        missing = [c for c in columns if c not in frame.columns]
+        if missing:
+            raise KeyError(", ".join(missing))
+        frame = frame[columns]
+    return frame, total
+
+
+def iter_ndjson(frame: pd.DataFrame, chunk_size: int = 500) -> Iterator[bytes]:
+    """逐块把 DataFrame 转为 NDJSON 行，内存占用与块大小相关而与表长无关。"""
+    for i in range(0, len(frame), chunk_size):
+        records = frame.iloc[i : i + chunk_size].to_dict(orient="records")
+        yield "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records).encode("utf-8")
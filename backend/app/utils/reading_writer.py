@@ -0,0 +1,397 @@
+"""
+实时读数批量写入：设备模拟器、实时接入等多个生产者提交读数，单个后台任务攒批写入 ``sensor_readings``。
+
+- 攒批：缓冲达到 ``max_batch`` 条，或最早一条已等待 ``flush_interval`` 秒即写入；
+- 每批一个事务：预建分区 -> COPY（或多行 INSERT）合并进 sensor_readings（唯一键冲突跳过，重复投递不会重复写入）
+  -> 告警评估 -> 最新值投影 -> 汇总表，提交后由 broker 推送增量；
+- 背压：缓冲上限 ``max_pending`` 条，``offer`` 满时返回 False（调用方据此限流），``put`` 等待空位；
+- 连接/数据库暂时不可用等错误整批按退避重试 ``max_retries`` 次，仍失败则计入 ``rows_failed``；
+  数据错误（类型/长度/NOT NULL 等，重试无意义）不重试，二分拆批定位坏行，只丢弃坏行并计入 ``rows_invalid``，
+  同批其他生产者的读数照常写入；
+- 读数的 ``source_file_id`` 指向每个测点一条的实时来源（``ingest_files.checksum = 'live'``），
+  使唯一键 (metric_id, reading_time, source_file_id) 对实时读数同样生效；
+- 统计：最近 ``RATE_WINDOW_SECONDS`` 秒的持续写入速率、提交延迟分位数（入队 -> 提交）与 ingest lag（reading_time -> 提交）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import asyncpg
+from sqlalchemy import exc as sa_exc
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models import IngestFile, SensorReading
+from app.utils.alerting import alert_evaluator
+from app.utils.bulk_copy import copy_readings
+from app.utils.latest_readings import upsert_latest_values
+from app.utils.partitions import ensure_partitions_for
+from app.utils.rollups import refresh_rollups
+
+
+LIVE_CHECKSUM = "live"
+RATE_WINDOW_SECONDS = 10.0
+LATENCY_SAMPLES = 4096
+RETRY_BACKOFF_SECONDS = (0.5, 1.0, 2.0, 5.0)
+# SQLSTATE 类别：22 数据异常 / 23 完整性约束；08 连接 / 40 事务回滚（死锁、串行化）/ 53 资源不足 / 57 管理员干预
+DATA_SQLSTATE_CLASSES = ("22", "23")
+TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+
+logger = logging.getLogger(__name__)
+
+
+def live_source_path(point_code: str) -> str:
+    return f"live/{point_code}"
+
+
+async def ensure_live_sources(session: AsyncSession, sensors: Dict[int, Tuple[str, bool]]) -> Dict[int, int]:
+    """{sensor_id: (point_code, is_simulated)} -> {sensor_id: 实时来源 ingest_files.id}，缺失的批量创建。"""
+    if not sensors:
+        return {}
+    rows = [
+        dict(
+            sensor_id=sensor_id,
+            path=live_source_path(point_code),
+            checksum=LIVE_CHECKSUM,
+            status="live",
+            rows_imported=0,
+            is_simulated=is_simulated,
+        )
+        for sensor_id, (point_code, is_simulated) in sensors.items()
+    ]
+    stmt = insert(IngestFile).values(rows).on_conflict_do_nothing(index_elements=["sensor_id", "checksum"])
+    await session.execute(stmt)
+    found = await session.execute(
+        select(IngestFile.sensor_id, IngestFile.id).where(
+            IngestFile.sensor_id.in_(list(sensors)), IngestFile.checksum == LIVE_CHECKSUM
+        )
+    )
+    return dict(found.all())
+
+
+def _error_chain(error: BaseException) -> List[BaseException]:
+    """异常本身、SQLAlchemy 包装的驱动异常（orig）及 __cause__ 链。"""
+    chain, current = [], error
+    while current is not None and current not in chain and len(chain) < 8:
+        chain.append(current)
+        current = getattr(current, "orig", None) or current.__cause__
+    return chain
+
+
+def _sqlstate(error: BaseException) -> str:
+    for item in _error_chain(error):
+        state = getattr(item, "sqlstate", None)
+        if isinstance(state, str):
+            return state
+    return ""
+
+
+def is_data_error(error: BaseException) -> bool:
+    """由读数内容导致、重试不会成功的错误。"""
+    if _sqlstate(error)[:2] in DATA_SQLSTATE_CLASSES:
+        return True
+    return any(
+        isinstance(item, (sa_exc.DataError, sa_exc.IntegrityError))
+        # asyncpg 客户端编码失败（参数/COPY 记录类型不符）
+        or (isinstance(item, asyncpg.InterfaceError) and isinstance(item, ValueError))
+        for item in _error_chain(error)
+    )
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """连接断开、超时、死锁等，可以退避后重试的错误。"""
+    if is_data_error(error):
+        return False
+    if _sqlstate(error)[:2] in TRANSIENT_SQLSTATE_CLASSES:
+        return True
+    return any(
+        isinstance(
+            item,
+            (
+                sa_exc.OperationalError,
+                sa_exc.InterfaceError,
+                sa_exc.DisconnectionError,
+                sa_exc.TimeoutError,
+                asyncpg.InterfaceError,
+                OSError,
+                asyncio.TimeoutError,
+            ),
+        )
+        or (isinstance(item, sa_exc.DBAPIError) and item.connection_invalidated)
+        for item in _error_chain(error)
+    )
+
+
+@dataclass
+class _Chunk:
+    rows: List[Dict[str, Any]]
+    enqueued: float
+    done: Optional[asyncio.Future] = None
+
+
+def _percentiles(samples: Iterable[float]) -> Dict[str, Optional[float]]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 2)}
+
+
+class BatchedReadingWriter:
+    def __init__(
+        self,
+        session_factory: Optional[async_sessionmaker[AsyncSession]] = None,
+        max_batch: int = 5000,
+        flush_interval: float = 0.2,
+        max_pending: int = 100_000,
+        use_copy: bool = True,
+        max_retries: int = 3,
+    ):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.use_copy = use_copy
+        self.max_retries = max_retries
+        self.pending = 0
+        self.counters: Counter = Counter()
+        self.last_error: Optional[str] = None
+        self.ingest_lag_seconds: Optional[float] = None
+        self._chunks: Deque[_Chunk] = deque()
+        self._arrived = asyncio.Event()
+        self._full = asyncio.Event()
+        self._space = asyncio.Event()
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._flush_ms: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._written: Deque[Tuple[float, int]] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    # --- 生产者 ---
+
+    def has_room(self, count: int) -> bool:
+        # 单批超过上限时，缓冲为空也放行，避免永久阻塞
+        return self.pending + count <= self.max_pending or self.pending == 0
+
+    def _enqueue(self, rows: List[Dict[str, Any]], done: Optional[asyncio.Future] = None) -> None:
+        self._chunks.append(_Chunk(rows, time.monotonic(), done))
+        self.pending += len(rows)
+        self.counters["rows_submitted"] += len(rows)
+        self._arrived.set()
+        if self.pending >= self.max_batch:
+            self._full.set()
+
+    def offer(self, rows: Sequence[Dict[str, Any]]) -> bool:
+        """非阻塞提交；缓冲已满时返回 False 且不接收任何一行。"""
+        if not rows:
+            return True
+        if self._closing or not self.has_room(len(rows)):
+            self.counters["rows_rejected"] += len(rows)
+            return False
+        self._enqueue(list(rows))
+        return True
+
+    async def put(self, rows: Sequence[Dict[str, Any]], wait_commit: bool = False) -> int:
+        """提交读数，缓冲满时等待空位；wait_commit=True 时等到本批提交，返回实际插入行数（否则返回 0）。"""
+        if not rows:
+            return 0
+        while not self.has_room(len(rows)):
+            self._space.clear()
+            started = time.monotonic()
+            await self._space.wait()
+            self.counters["backpressure_ms"] += int((time.monotonic() - started) * 1000)
+        if self._closing:
+            raise RuntimeError("writer is closed")
+        done = asyncio.get_running_loop().create_future() if wait_commit else None
+        self._enqueue(list(rows), done)
+        return await done if done is not None else 0
+
+    # --- 后台写入 ---
+
+    def start(self) -> "BatchedReadingWriter":
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def close(self) -> None:
+        """停止接收并写完缓冲中的读数。"""
+        self._closing = True
+        self._arrived.set()
+        self._full.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            if not self._chunks:
+                if self._closing:
+                    return
+                self._arrived.clear()
+                await self._arrived.wait()
+                continue
+            wait = self._chunks[0].enqueued + self.flush_interval - time.monotonic()
+            if wait > 0 and self.pending < self.max_batch and not self._closing:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            await self._flush(self._take())
+
+    def _take(self) -> List[_Chunk]:
+        batch, count = [], 0
+        while self._chunks and (not batch or count + len(self._chunks[0].rows) <= self.max_batch):
+            chunk = self._chunks.popleft()
+            batch.append(chunk)
+            count += len(chunk.rows)
+        return batch
+
+    async def _flush(self, batch: List[_Chunk]) -> None:
+        rows = [row for chunk in batch for row in chunk.rows]
+        progress: Counter = Counter()
+        error: Optional[BaseException] = None
+        started = time.monotonic()
+        try:
+            inserted = await self._write_isolating(rows, progress)
+        except Exception as exc:
+            error = exc
+        committed = time.monotonic()
+        self.pending -= len(rows)
+        self._space.set()
+        self.counters["rows_written"] += progress["inserted"]
+        self.counters["rows_duplicate"] += progress["written"] - progress["inserted"]
+        if error is not None:
+            # 二分过程中已提交的部分计入 rows_written，其余计为失败
+            self.counters["rows_failed"] += len(rows) - progress["written"] - progress["invalid"]
+            self.counters["batches_failed"] += 1
+            for chunk in batch:
+                if chunk.done is not None and not chunk.done.done():
+                    chunk.done.set_exception(error)
+            return
+
+        self.counters["batches"] += 1
+        self._flush_ms.append((committed - started) * 1000)
+        self._written.append((committed, progress["written"]))
+        for chunk in batch:
+            self._latencies.append((committed - chunk.enqueued) * 1000)
+            if chunk.done is not None and not chunk.done.done():
+                chunk.done.set_result(inserted)
+        newest = max((row["reading_time"] for row in rows), default=None)
+        if newest is not None:
+            self.ingest_lag_seconds = (datetime.utcnow() - newest).total_seconds()
+
+    async def _write_with_retry(self, rows: List[Dict[str, Any]]) -> int:
+        """写入一批；只有暂时性错误（连接、超时、死锁）退避重试，其他错误直接抛出。"""
+        attempt = 0
+        while True:
+            try:
+                return await self._write(rows)
+            except Exception as exc:
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                if attempt >= self.max_retries or not is_transient_error(exc):
+                    raise
+            self.counters["retries"] += 1
+            await asyncio.sleep(RETRY_BACKOFF_SECONDS[min(attempt, len(RETRY_BACKOFF_SECONDS) - 1)])
+            attempt += 1
+
+    async def _write_isolating(self, rows: List[Dict[str, Any]], progress: Counter) -> int:
+        """写入一批；数据错误时二分拆批，只丢弃无法写入的单行。返回插入行数。"""
+        try:
+            inserted = await self._write_with_retry(rows)
+        except Exception as exc:
+            if not is_data_error(exc):
+                raise
+            if len(rows) == 1:
+                progress["invalid"] += 1
+                self.counters["rows_invalid"] += 1
+                logger.warning("dropped invalid reading %s: %s", rows[0], self.last_error)
+                return 0
+            self.counters["splits"] += 1
+            middle = len(rows) // 2
+            left = await self._write_isolating(rows[:middle], progress)
+            return left + await self._write_isolating(rows[middle:], progress)
+        progress["written"] += len(rows)
+        progress["inserted"] += inserted
+        return inserted
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> int:
+        async with self.session_factory() as session:
+            await ensure_partitions_for(session, rows)
+            if self.use_copy:
+                inserted = await copy_readings(session, rows)
+            else:
+                inserted = 0
+                for i in range(0, len(rows), 1000):
+                    stmt = (
+                        insert(SensorReading)
+                        .values(rows[i : i + 1000])
+                        .on_conflict_do_nothing(index_elements=["metric_id", "reading_time", "source_file_id"])
+                    )
+                    result = await session.execute(stmt)
+                    inserted += max(result.rowcount or 0, 0)
+            # 告警评估以 sensor_latest_values 为水位线，须在更新投影之前
+            if get_settings().alerts_enabled:
+                await alert_evaluator.evaluate(session, rows)
+            await upsert_latest_values(session, rows)
+            await refresh_rollups(session, rows)
+            await session.commit()
+        return inserted
+
+    # --- 统计 ---
+
+    def rate(self) -> float:
+        """最近 RATE_WINDOW_SECONDS 秒内每秒提交的读数。"""
+        now = time.monotonic()
+        while self._written and self._written[0][0] < now - RATE_WINDOW_SECONDS:
+            self._written.popleft()
+        return round(sum(count for _, count in self._written) / RATE_WINDOW_SECONDS, 1)
+
+    def retry_after(self) -> int:
+        """缓冲满时建议客户端等待的秒数：按当前写入速率估算排空缓冲的时间（1~30s）。"""
+        rate = self.rate()
+        if rate <= 0:
+            return 30
+        return max(1, min(30, math.ceil(self.pending / rate)))
+
+    def stats(self) -> Dict[str, Any]:
+        flush_ms = list(self._flush_ms)
+        return {
+            **{
+                name: self.counters[name]
+                for name in (
+                    "rows_submitted",
+                    "rows_written",
+                    "rows_duplicate",
+                    "rows_rejected",
+                    "rows_invalid",
+                    "rows_failed",
+                    "batches",
+                    "batches_failed",
+                    "retries",
+                    "splits",
+                    "backpressure_ms",
+                )
+            },
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rows_per_second": self.rate(),
+            "commit_latency_ms": _percentiles(self._latencies),
+            "flush_ms_avg": round(sum(flush_ms) / len(flush_ms), 2) if flush_ms else None,
+            "ingest_lag_seconds": self.ingest_lag_seconds,
+            "last_error": self.last_error,
+        }
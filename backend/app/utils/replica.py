@@ -0,0 +1,109 @@
+"""
+只读查询的副本路由：配置了 ``database_url_replica`` 时，GET 接口的会话优先落到只读副本。
+
+- 复制延迟按 ``replica_lag_check_seconds`` 间隔探测一次（并发请求共用同一次探测），
+  超过 ``replica_max_lag_seconds`` 或副本不可达时回退主库，下个探测周期再尝试副本；
+- 延迟取 ``now() - pg_last_xact_replay_timestamp()``，WAL 已全部回放时视为 0（主库空闲时回放时间戳会变旧）；
+- ``replica_simulated_lag_seconds`` 用于本地联调：不查询复制状态，直接把该值当作延迟
+  （副本 URL 可以指向同一个实例），配合 ``scripts/check_replica_routing.py`` 验证回退逻辑。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+
+LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+# 副本探测超时：副本宕机时最多让触发探测的那个请求多等这么久
+PROBE_TIMEOUT_SECONDS = 2.0
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        primary: async_sessionmaker[AsyncSession],
+        replica: Optional[async_sessionmaker[AsyncSession]] = None,
+        replica_engine: Optional[AsyncEngine] = None,
+        max_lag_seconds: float = 5.0,
+        check_seconds: float = 2.0,
+        simulated_lag_seconds: Optional[float] = None,
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.replica_engine = replica_engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self.simulated_lag_seconds = simulated_lag_seconds
+        self.lag_seconds: Optional[float] = None
+        self.healthy = replica is not None
+        self.last_error: Optional[str] = None
+        self._checked_at = float("-inf")
+        self._probe: Optional[asyncio.Task] = None
+        self.routed: Counter = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.replica is not None
+
+    async def measure_lag(self) -> float:
+        async with self.replica_engine.connect() as conn:
+            if self.simulated_lag_seconds is not None:
+                await conn.execute(text("SELECT 1"))
+                return self.simulated_lag_seconds
+            return float((await conn.execute(text(LAG_SQL))).scalar() or 0)
+
+    async def _refresh(self) -> None:
+        try:
+            self.lag_seconds = await asyncio.wait_for(self.measure_lag(), timeout=PROBE_TIMEOUT_SECONDS)
+            self.healthy, self.last_error = True, None
+        except Exception as exc:  # 副本不可达/超时：本周期回退主库
+            self.healthy, self.last_error = False, f"{type(exc).__name__}: {exc}"
+        finally:
+            self._checked_at = time.monotonic()
+
+    async def _ensure_fresh(self) -> None:
+        if time.monotonic() - self._checked_at < self.check_seconds:
+            return
+        if self._probe is None or self._probe.done():
+            self._probe = asyncio.ensure_future(self._refresh())
+        await asyncio.shield(self._probe)
+
+    async def session_factory(self) -> async_sessionmaker[AsyncSession]:
+        """本次只读请求应使用的会话工厂。"""
+        if not self.enabled:
+            self.routed["primary"] += 1
+            return self.primary
+        await self._ensure_fresh()
+        if not self.healthy:
+            self.routed["fallback_unavailable"] += 1
+            return self.primary
+        if self.lag_seconds is not None and self.lag_seconds > self.max_lag_seconds:
+            self.routed["fallback_lag"] += 1
+            return self.primary
+        self.routed["replica"] += 1
+        return self.replica
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "check_seconds": self.check_seconds,
+            "simulated": self.simulated_lag_seconds is not None,
+            "last_error": self.last_error,
+            "routed": dict(self.routed),
+        }
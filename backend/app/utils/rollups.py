@@ -0,0 +1,185 @@
+"""
+读数汇总表（连续聚合）：sensor_readings_1h / sensor_readings_1d。
+
+- 每个 (metric_id, 桶) 一行：count/min/max/sum/last，avg 由 sum/count 得出；
+- 小时表从原始读数计算，日表从小时表上卷；
+- 写入方（ExcelImporter、种子/实时写入）写完读数后调用 ``refresh_rollups``，只重算本批读数涉及的桶；
+  重算前按 metric 取事务级 advisory 锁：并发写同一 metric 的事务串行重算，后提交者能看到先提交者的读数，
+  不会用缺少对方读数的聚合覆盖对方结果；
+- ``rebuild_rollups`` 全量（或按 metric）重建，见 ``scripts/rebuild_rollups.py``；
+- ``rollup_bucket_stmt`` 供 /api/v1/readings/aggregate 在分辨率与时间边界都对齐时读取最粗的汇总表。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Type
+
+from sqlalchemy import Float, Select, cast, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import SensorReadingDaily, SensorReadingHourly
+from app.utils.downsample import BUCKETS
+
+
+ROLLUP_COLUMNS = "metric_id, bucket_start, count, min, max, sum, last_value, last_time"
+
+HOURLY_SQL = f"""
+INSERT INTO sensor_readings_1h ({ROLLUP_COLUMNS})
+SELECT r.metric_id, date_trunc('hour', r.reading_time), count(*), min(r.value_num), max(r.value_num),
+       sum(r.value_num), (array_agg(r.value_num ORDER BY r.reading_time DESC))[1], max(r.reading_time)
+FROM sensor_readings r
+{{join}}
+WHERE r.value_num IS NOT NULL {{where}}
+GROUP BY 1, 2
+{{conflict}}
+"""
+
+DAILY_SQL = f"""
+INSERT INTO sensor_readings_1d ({ROLLUP_COLUMNS})
+SELECT h.metric_id, date_trunc('day', h.bucket_start), sum(h.count), min(h.min), max(h.max),
+       sum(h.sum), (array_agg(h.last_value ORDER BY h.last_time DESC))[1], max(h.last_time)
+FROM sensor_readings_1h h
+{{join}}
+WHERE true {{where}}
+GROUP BY 1, 2
+{{conflict}}
+"""
+
+UPSERT = """
+ON CONFLICT (metric_id, bucket_start) DO UPDATE SET
+    count = EXCLUDED.count, min = EXCLUDED.min, max = EXCLUDED.max, sum = EXCLUDED.sum,
+    last_value = EXCLUDED.last_value, last_time = EXCLUDED.last_time
+"""
+
+# advisory 锁命名空间（两参数形式的第一个 key），避免与其他模块的 advisory 锁冲突
+ROLLUP_LOCK_NAMESPACE = 15
+
+# 按 metric_id 升序加锁，多个事务加锁顺序一致，不会互相死锁
+LOCK_SQL = """
+SELECT pg_advisory_xact_lock(:namespace, m)
+FROM (SELECT DISTINCT m FROM unnest(CAST(:metric_ids AS integer[])) AS m ORDER BY m) AS ordered
+"""
+
+# 只重算涉及的桶：(metric_id, 桶起点) 数组 unnest 后与明细按半开区间关联，可走 (metric_id, reading_time) 索引
+TOUCHED_JOIN = """
+JOIN unnest(CAST(:metric_ids AS integer[]), CAST(:buckets AS timestamp[])) AS t(metric_id, bucket_start)
+  ON {alias}.metric_id = t.metric_id
+ AND {alias}.{time_col} >= t.bucket_start AND {alias}.{time_col} < t.bucket_start + interval '{width}'
+"""
+
+
+def touched_buckets(rows: Iterable[Dict[str, Any]]) -> Set[Tuple[int, datetime]]:
+    """本批读数涉及的 (metric_id, 小时桶起点)；value_num 为空的读数不进入汇总。"""
+    return {
+        (row["metric_id"], row["reading_time"].replace(minute=0, second=0, microsecond=0))
+        for row in rows
+        if row.get("value_num") is not None and row.get("reading_time") is not None
+    }
+
+
+async def _refresh(session: AsyncSession, sql: str, alias: str, time_col: str, width: str, keys: Sequence[Tuple[int, datetime]]) -> int:
+    if not keys:
+        return 0
+    stmt = text(
+        sql.format(join=TOUCHED_JOIN.format(alias=alias, time_col=time_col, width=width), where="", conflict=UPSERT)
+    ).bindparams(metric_ids=[k[0] for k in keys], buckets=[k[1] for k in keys])
+    result = await session.execute(stmt)
+    return result.rowcount or 0
+
+
+async def lock_metrics(session: AsyncSession, metric_ids: Iterable[int]) -> None:
+    """对汇总表中这些 metric 的重算加事务级锁，提交或回滚时释放。"""
+    ids = sorted(set(metric_ids))
+    if ids:
+        await session.execute(text(LOCK_SQL).bindparams(namespace=ROLLUP_LOCK_NAMESPACE, metric_ids=ids))
+
+
+async def refresh_rollups(session: AsyncSession, rows: Iterable[Dict[str, Any]]) -> int:
+    """按本批写入的读数增量刷新小时表与日表，返回刷新的小时桶数。与写入在同一事务内执行。"""
+    hours = sorted(touched_buckets(rows))
+    if not hours:
+        return 0
+    # 读已提交隔离级别下，拿到锁之后的重算语句使用新快照，包含先提交事务的读数
+    await lock_metrics(session, (metric_id for metric_id, _ in hours))
+    await _refresh(session, HOURLY_SQL, "r", "reading_time", "1 hour", hours)
+    days = sorted({(metric_id, hour.replace(hour=0)) for metric_id, hour in hours})
+    await _refresh(session, DAILY_SQL, "h", "bucket_start", "1 day", days)
+    return len(hours)
+
+
+async def rebuild_rollups(session: AsyncSession, metric_ids: Optional[List[int]] = None) -> Tuple[int, int]:
+    """清空并从 sensor_readings 全量（或指定 metric）重建两张汇总表，返回 (小时行数, 日行数)。"""
+    counts = []
+    if metric_ids is not None:
+        await lock_metrics(session, metric_ids)
+    for table, sql, alias in (("sensor_readings_1h", HOURLY_SQL, "r"), ("sensor_readings_1d", DAILY_SQL, "h")):
+        if metric_ids is not None:
+            await session.execute(
+                text(f"DELETE FROM {table} WHERE metric_id = ANY(:metric_ids)").bindparams(metric_ids=metric_ids)
+            )
+            stmt = text(sql.format(join="", where=f"AND {alias}.metric_id = ANY(:metric_ids)", conflict="")).bindparams(
+                metric_ids=metric_ids
+            )
+        else:
+            await session.execute(text(f"DELETE FROM {table}"))
+            stmt = text(sql.format(join="", where="", conflict=""))
+        result = await session.execute(stmt)
+        counts.append(result.rowcount or 0)
+    return counts[0], counts[1]
+
+
+# --- 读取 ---
+
+ROLLUP_TABLES: Dict[str, Type] = {"1h": SensorReadingHourly, "1d": SensorReadingDaily}
+ROLLUP_WIDTHS = {"1h": timedelta(hours=1), "1d": timedelta(days=1)}
+BUCKET_WIDTHS = {"1h": timedelta(hours=1), "1d": timedelta(days=1), "1w": timedelta(weeks=1)}
+
+
+def _aligned(value: Optional[datetime], rollup: str) -> bool:
+    if value is None:
+        return True
+    if rollup == "1h":
+        return value == value.replace(minute=0, second=0, microsecond=0)
+    return value == value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def pick_rollup(bucket: str, start: Optional[datetime], end: Optional[datetime]) -> Optional[str]:
+    """满足请求分辨率的最粗汇总表（1w 由日表上卷）；[start, end) 未对齐到桶边界时返回 None（回退明细）。"""
+    for rollup in ("1d", "1h"):
+        if ROLLUP_WIDTHS[rollup] <= BUCKET_WIDTHS[bucket] and _aligned(start, rollup) and _aligned(end, rollup):
+            return rollup
+    return None
+
+
+def rollup_bucket_stmt(
+    rollup: str,
+    metric_ids: Sequence[int],
+    bucket: str,
+    aggs: Sequence[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Select:
+    """从汇总表按 (metric_id, 时间桶) 聚合，返回列与 downsample.bucket_stmt 一致。"""
+    table = ROLLUP_TABLES[rollup]
+    unit = literal_column(f"'{BUCKETS[bucket]}'")
+    bucket_start = func.date_trunc(unit, table.bucket_start).label("bucket_start")
+    columns = {
+        "avg": func.sum(table.sum) / cast(func.nullif(func.sum(table.count), 0), Float),
+        "min": func.min(table.min),
+        "max": func.max(table.max),
+        "count": func.sum(table.count),
+        "last": array_agg(aggregate_order_by(table.last_value, table.last_time.desc()))[1],
+    }
+    stmt = (
+        select(table.metric_id, bucket_start, *[columns[a].label(a) for a in aggs])
+        .where(table.metric_id.in_(metric_ids))
+        .group_by(table.metric_id, bucket_start)
+        .order_by(table.metric_id, bucket_start)
+    )
+    if start:
+        stmt = stmt.where(table.bucket_start >= start)
+    if end:
+        stmt = stmt.where(table.bucket_start < end)
+    return stmt
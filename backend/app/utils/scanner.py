@@ -1,5 +1,12 @@
+import asyncio
 import os
-from typing import List, Dict, Any
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from app.config import get_settings
 
 # 数据根目录路径 (相对于 backend 运行时的路径，或者使用绝对路径)
 # 假设我们在 backend 目录下运行 uvicorn，且项目根目录在上一级
@@ -68,3 +75,167 @@ def get_relative_path(absolute_path: str) -> str:
     将绝对路径转换为相对于数据根目录的路径，作为 ID 使用
     """
     return os.path.relpath(absolute_path, DATA_ROOT)
+
+
+# --- 目录索引 ---
+# 启动时遍历一次数据根目录，之后 /api/stations 与按关键词/前缀查找文件都读内存索引。
+# 刷新方式：安装了 watchfiles 时由后台 watcher 推送变更；否则在查询时按间隔比对各目录 mtime
+# （文件增删/改名会改变所在目录的 mtime），有变化才重新遍历。
+
+SENSOR_PREFIX_RE = re.compile(r"^([A-Za-z]+\d*[A-Za-z]*-)")
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    filename: str
+    relative_path: str  # 相对 DATA_ROOT，与树节点 path 一致
+    full_path: str
+
+    @property
+    def parent_dir(self) -> str:
+        return os.path.basename(os.path.dirname(self.full_path))
+
+
+class DirectoryIndex:
+    def __init__(self, root: str = DATA_ROOT, max_depth: int = 10, poll_interval: float = 5.0):
+        self.root = root
+        self.max_depth = max_depth
+        self.poll_interval = poll_interval
+        self.watching = False  # watcher 运行时不再轮询 mtime
+        self.version = 0
+        self.builds = 0
+        self._lock = threading.Lock()
+        self._built = False
+        self._checked_at = 0.0
+        self._tree: List[Dict[str, Any]] = []
+        self._files: List[FileEntry] = []
+        self._by_prefix: Dict[str, List[FileEntry]] = {}
+        self._dir_mtimes: Dict[str, float] = {}
+        self._lookups: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], List[FileEntry]] = {}
+
+    def build(self) -> None:
+        """完整遍历一次根目录并替换索引。"""
+        dir_mtimes: Dict[str, float] = {}
+        files: List[FileEntry] = []
+        if not os.path.exists(self.root):
+            print(f"Warning: Data path does not exist: {self.root}")
+            tree: List[Dict[str, Any]] = []
+        else:
+            tree = self._walk(self.root, self.max_depth, dir_mtimes, files)
+        by_prefix: Dict[str, List[FileEntry]] = {}
+        for entry in files:
+            match = SENSOR_PREFIX_RE.match(entry.filename)
+            if match:
+                by_prefix.setdefault(match.group(1), []).append(entry)
+        with self._lock:
+            self._tree, self._files, self._by_prefix = tree, files, by_prefix
+            self._dir_mtimes = dir_mtimes
+            self._lookups = {}
+            self._built = True
+            self._checked_at = time.monotonic()
+            self.version += 1
+            self.builds += 1
+
+    def _walk(
+        self, path: str, depth: int, dir_mtimes: Dict[str, float], files: List[FileEntry]
+    ) -> List[Dict[str, Any]]:
+        if depth < 0:
+            return []
+        try:
+            dir_mtimes[path] = os.stat(path).st_mtime
+            entries = sorted(os.scandir(path), key=lambda e: e.name)
+        except (OSError, PermissionError) as e:
+            print(f"Error accessing directory {path}: {e}")
+            return []
+        tree = []
+        for entry in entries:
+            if entry.name.startswith(".") or entry.name == "System Volume Information" or entry.is_symlink():
+                continue
+            rel = os.path.relpath(entry.path, DATA_ROOT)
+            if entry.is_dir():
+                children = self._walk(entry.path, depth - 1, dir_mtimes, files)
+                tree.append({"label": entry.name, "type": "directory", "path": rel, "children": children})
+            elif entry.name.endswith((".xlsx", ".xls")):
+                tree.append(
+                    {"label": entry.name, "type": "file", "path": rel, "extension": entry.name.split(".")[-1]}
+                )
+                files.append(FileEntry(filename=entry.name, relative_path=rel, full_path=entry.path))
+        return tree
+
+    def _changed(self) -> bool:
+        for path, mtime in self._dir_mtimes.items():
+            try:
+                if os.stat(path).st_mtime != mtime:
+                    return True
+            except OSError:
+                return True
+        return not self._dir_mtimes and os.path.exists(self.root)
+
+    def ensure_fresh(self) -> None:
+        """首次访问时构建；未启用 watcher 时每 poll_interval 秒最多比对一次目录 mtime。"""
+        if not self._built:
+            self.build()
+            return
+        if self.watching or time.monotonic() - self._checked_at < self.poll_interval:
+            return
+        self._checked_at = time.monotonic()
+        if self._changed():
+            self.build()
+
+    def tree(self) -> List[Dict[str, Any]]:
+        self.ensure_fresh()
+        return self._tree
+
+    def files(self) -> List[FileEntry]:
+        self.ensure_fresh()
+        return self._files
+
+    def by_prefix(self, prefix: str) -> List[FileEntry]:
+        """按测点前缀（如 "Df-"、"Pcg-"）查找文件。"""
+        self.ensure_fresh()
+        return list(self._by_prefix.get(prefix, []))
+
+    def find(self, keywords: Iterable[str], exclude_keywords: Optional[Iterable[str]] = None) -> List[FileEntry]:
+        """相对路径包含任一关键词且不含排除词的文件；结果按 (关键词, 排除词) 缓存到下次刷新。"""
+        self.ensure_fresh()
+        key = (tuple(keywords), tuple(exclude_keywords or ()))
+        found = self._lookups.get(key)
+        if found is None:
+            include, exclude = key
+            found = [
+                entry
+                for entry in self._files
+                if any(k in entry.relative_path for k in include)
+                and not any(k in entry.relative_path for k in exclude)
+            ]
+            self._lookups[key] = found
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "root": self.root,
+            "files": len(self._files),
+            "directories": len(self._dir_mtimes),
+            "prefixes": sorted(self._by_prefix),
+            "version": self.version,
+            "builds": self.builds,
+            "watching": self.watching,
+        }
+
+    async def watch(self) -> None:
+        """后台任务：有 watchfiles 时监听根目录变更并重建索引，否则直接返回（沿用 mtime 轮询）。"""
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            return
+        if not os.path.isdir(self.root):
+            return
+        self.watching = True
+        try:
+            async for _ in awatch(self.root, recursive=True):
+                await asyncio.to_thread(self.build)
+        finally:
+            self.watching = False
+
+
+directory_index = DirectoryIndex(poll_interval=get_settings().dir_index_poll_seconds)
@@ -1,52 +1,25 @@
 import os
 import pandas as pd
 from typing import Dict, Any, List, Optional
-from .scanner import DATA_ROOT, scan_data_directory, get_relative_path
-from .reader import read_excel_data
+from .scanner import directory_index
+from .reader import read_latest_record
 from .mock_data import get_mock_stations_by_type
 
 # --- Helper to find specific files ---
 def find_files_by_keywords(keywords: List[str], exclude_keywords: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     """
-    扫描数据目录，根据关键词查找文件
-    返回文件节点列表，包含 full_path 和 relative_path
+    从目录索引中按关键词查找文件（匹配相对数据根目录的路径）
+    返回文件节点列表，包含 full_path（绝对路径）和 relative_path
     """
-    all_nodes = scan_data_directory(DATA_ROOT)
-    found_files = []
-
-    def traverse(nodes, current_path_parts: List[str]):
-        for node in nodes:
-            node_name = node['label']
-            
-            # Construct a path string for keyword matching
-            current_full_name = "/".join(current_path_parts + [node_name])
-            
-            if node['type'] == 'directory':
-                # Check directory name first
-                if any(k in node_name for k in keywords):
-                    traverse(node.get('children', []), current_path_parts + [node_name])
-                else: # If directory itself doesn't match, still check its children for file matches
-                    traverse(node.get('children', []), current_path_parts + [node_name])
-            elif node['type'] == 'file':
-                file_name = node['label']
-                # Check if file path (including parent directories) contains any keyword
-                if any(k in current_full_name for k in keywords):
-                    # Check for exclude keywords
-                    if exclude_keywords and any(k in current_full_name for k in exclude_keywords):
-                        continue # Skip if excluded
-                    found_files.append({
-                        "full_path": node['path'],
-                        "relative_path": get_relative_path(node['path']),
-                        "filename": file_name,
-                        "parent_dir": os.path.basename(os.path.dirname(node['path']))
-                    })
-    
-    # Start traversal from the top-level nodes of the data root
-    data_root_nodes = scan_data_directory(DATA_ROOT)
-    for node in data_root_nodes:
-        traverse([node], []) 
-    
-    return found_files
+    return [
+        {
+            "full_path": entry.full_path,
+            "relative_path": entry.relative_path,
+            "filename": entry.filename,
+            "parent_dir": entry.parent_dir,
+        }
+        for entry in directory_index.find(keywords, exclude_keywords)
+    ]
 
 
 # --- 统计总览数据 ---
@@ -89,9 +62,8 @@ def calculate_overview_stats() -> Dict[str, Any]:
 
     # Real Data
     for file_meta in water_level_files:
-        excel_data = read_excel_data(file_meta["full_path"])
-        if excel_data and "data" in excel_data and excel_data["data"]:
-            latest_record = excel_data["data"][-1]
+        latest_record = read_latest_record(file_meta["full_path"])
+        if latest_record:
             level_key = next((col for col in latest_record if "水位" in col or "Level" in col), None)
             if level_key and latest_record[level_key] is not None:
                 try:
@@ -122,9 +94,8 @@ def calculate_overview_stats() -> Dict[str, Any]:
                                     
     # Real
     for file_meta in rain_files:
-        excel_data = read_excel_data(file_meta["full_path"])
-        if excel_data and "data" in excel_data and excel_data["data"]:
-            latest_record = excel_data["data"][-1]
+        latest_record = read_latest_record(file_meta["full_path"])
+        if latest_record:
             rain_key = next((col for col in latest_record if "降雨量" in col or "Rainfall" in col), None)
             if rain_key and latest_record[rain_key] is not None:
                 try:
@@ -157,9 +128,8 @@ def get_water_level_data() -> List[Dict[str, Any]]:
     # 1. Real Data from Files
     water_level_files = find_files_by_keywords(["水位", "Df-"])
     for file_meta in water_level_files:
-        excel_data = read_excel_data(file_meta["full_path"])
-        if excel_data and "data" in excel_data and excel_data["data"]:
-            latest_record = excel_data["data"][-1]
+        latest_record = read_latest_record(file_meta["full_path"])
+        if latest_record:
             level_key = next((col for col in latest_record if "水位" in col or "Level" in col), None)
             time_key = next((col for col in latest_record if "时间" in col or "Time" in col or "日期" in col), None)
             
@@ -209,9 +179,8 @@ def get_rainfall_data() -> List[Dict[str, Any]]:
     # 1. Real Data
     rain_files = find_files_by_keywords(["雨量", "降雨", "rain"], exclude_keywords=["渗压"])
     for file_meta in rain_files:
-        excel_data = read_excel_data(file_meta["full_path"])
-        if excel_data and "data" in excel_data and excel_data["data"]:
-            latest_record = excel_data["data"][-1]
+        latest_record = read_latest_record(file_meta["full_path"])
+        if latest_record:
             rain_key = next((col for col in latest_record if "降雨量" in col or "Rainfall" in col), None)
             time_key = next((col for col in latest_record if "时间" in col or "Time" in col or "日期" in col), None)
             
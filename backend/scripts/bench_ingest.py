@@ -0,0 +1,132 @@
+"""
+实时接入压测：在进程内直接调用 ASGI 应用的 ``POST /api/v1/ingest``（不经网络栈，不需要额外的 HTTP 客户端依赖），
+测量单个 worker 的接入上限：解码 + 键解析 + 攒批写库。
+
+读数针对库中已有的 (point_code, metric_key)，时间从当前时刻起按毫秒递增，不会与已有读数冲突。
+遇到 429 时按 Retry-After 等待后重发，结束时输出已接受/已写入的读数、rows/s（按实际写入计）、429 次数与写入方统计；
+写入方有失败或被丢弃的读数（rows_failed / rows_invalid）时非零退出。
+
+用法：
+    PYTHONPATH=. python3 -m scripts.bench_ingest --requests 200 --batch 2000 --concurrency 8
+    PYTHONPATH=. python3 -m scripts.bench_ingest --format ndjson --metrics 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.main import app
+from app.models import Sensor, SensorMetric
+from app.utils.ingest import ingest_writer
+
+
+async def post(body: bytes, content_type: str):
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/ingest",
+        "query_string": b"",
+        "headers": [(b"content-type", content_type.encode())],
+        "http_version": "1.1",
+        "scheme": "http",
+        "server": ("bench", 80),
+        "client": ("bench", 0),
+        "root_path": "",
+        "app": app,
+    }
+    await app(scope, receive, send)
+    headers = dict(sent[0]["headers"])
+    return sent[0]["status"], int(headers.get(b"retry-after", b"0")), json.loads(sent[1]["body"])
+
+
+def make_body(keys, batch: int, start: datetime, offset: int, fmt: str) -> bytes:
+    records = [
+        {
+            "point_code": keys[i % len(keys)][0],
+            "metric_key": keys[i % len(keys)][1],
+            "time": (start + timedelta(milliseconds=offset + i)).isoformat(),
+            "value": round((offset + i) % 1000 * 0.01, 3),
+        }
+        for i in range(batch)
+    ]
+    if fmt == "ndjson":
+        return "\n".join(json.dumps(r) for r in records).encode()
+    return json.dumps(records).encode()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark POST /api/v1/ingest in-process")
+    parser.add_argument("--requests", type=int, default=100, help="请求数")
+    parser.add_argument("--batch", type=int, default=2000, help="每个请求的读数条数")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发请求数")
+    parser.add_argument("--metrics", type=int, default=200, help="使用的 (测点, 指标) 个数")
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as session:
+        stmt = select(Sensor.point_code, SensorMetric.metric_key).join(SensorMetric.sensor).limit(args.metrics)
+        keys = [tuple(row) for row in (await session.execute(stmt)).all()]
+    if not keys:
+        print("No sensor metrics found; import data or run scripts.seed_data first")
+        return
+
+    content_type = "application/x-ndjson" if args.format == "ndjson" else "application/json"
+    start = datetime.utcnow()
+    bodies = [make_body(keys, args.batch, start, i * args.batch, args.format) for i in range(args.requests)]
+    queue: asyncio.Queue = asyncio.Queue()
+    for body in bodies:
+        queue.put_nowait(body)
+    totals = {"accepted": 0, "throttled": 0, "failed": 0}
+
+    async def worker():
+        while not queue.empty():
+            body = queue.get_nowait()
+            while True:
+                status, retry_after, payload = await post(body, content_type)
+                if status != 429:
+                    break
+                totals["throttled"] += 1
+                await asyncio.sleep(retry_after)
+            if status == 202:
+                totals["accepted"] += payload["accepted"]
+            else:
+                totals["failed"] += 1
+                print(status, payload)
+
+    ingest_writer.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    accepted_s = time.perf_counter() - started
+    await ingest_writer.close()
+    elapsed = time.perf_counter() - started
+
+    stats = ingest_writer.stats()
+    written = stats["rows_written"]
+    print(
+        f"{totals['accepted']} readings accepted in {accepted_s:.1f}s, {written} written in {elapsed:.1f}s "
+        f"({written / elapsed:.0f} rows/s), 429 x{totals['throttled']}, failed requests {totals['failed']}, "
+        f"failed rows {stats['rows_failed']}, invalid rows {stats['rows_invalid']}"
+    )
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    if stats["rows_failed"] or stats["rows_invalid"] or totals["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""
+对比“每个 metric 最新读数”的三种查询方式：旧的 N+1 循环、LATERAL 单查询、
+sensor_latest_values 投影表。
+
+在一个事务内写入合成的传感器/指标/读数，逐级增加 metric 数量，记录
+各方式的 SQL 语句数与耗时，结束后回滚，不会污染数据库。
+
+用法：
+    PYTHONPATH=. python3 -m scripts.bench_latest_readings --sizes 10,50,100,500 --readings 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import desc, event, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import selectinload
+
+from app.database import AsyncSessionLocal, engine
+from app.models import MonitoringFacility, MonitoringSection, Sensor, SensorMetric, SensorReading, SensorType
+from app.utils.latest_readings import fetch_latest_readings, rebuild_latest_values
+
+BENCH_METRIC_KEY = "bench_latest"
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+async def legacy_latest(session, metric_keys: List[str]):
+    metrics_stmt = (
+        select(SensorMetric)
+        .options(selectinload(SensorMetric.sensor))
+        .where(SensorMetric.metric_key.in_(metric_keys))
+    )
+    metrics = (await session.execute(metrics_stmt)).scalars().all()
+    results = []
+    for metric in metrics:
+        reading_stmt = (
+            select(SensorReading)
+            .where(SensorReading.metric_id == metric.id)
+            .order_by(desc(SensorReading.reading_time))
+            .limit(1)
+        )
+        reading = (await session.execute(reading_stmt)).scalars().first()
+        results.append((metric.sensor, metric, reading))
+    return results
+
+
+async def lateral_latest(session, metric_keys: List[str]):
+    return await fetch_latest_readings(session, metric_keys, from_readings=True)
+
+
+async def projection_latest(session, metric_keys: List[str]):
+    return await fetch_latest_readings(session, metric_keys)
+
+
+async def seed_metrics(session, section_id: int, type_id: int, start: int, stop: int, readings: int):
+    base = datetime(2024, 1, 1)
+    for i in range(start, stop):
+        sensor = Sensor(
+            section_id=section_id,
+            sensor_type_id=type_id,
+            point_code=f"BENCH-{i}",
+            is_simulated=True,
+        )
+        metric = SensorMetric(sensor=sensor, metric_key=BENCH_METRIC_KEY, unit="m", is_simulated=True)
+        session.add_all([sensor, metric])
+        await session.flush()
+        rows = [
+            dict(
+                sensor_id=sensor.id,
+                metric_id=metric.id,
+                reading_time=base + timedelta(hours=h),
+                value_num=float(h),
+                is_simulated=True,
+                quality_flag="normal",
+            )
+            for h in range(readings)
+        ]
+        for j in range(0, len(rows), 1000):
+            await session.execute(insert(SensorReading).values(rows[j : j + 1000]))
+
+
+async def timed(session, counter: QueryCounter, fn, repeat: int):
+    counter.count = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        rows = await fn(session, [BENCH_METRIC_KEY])
+    elapsed = (time.perf_counter() - started) / repeat
+    return rows, counter.count // repeat, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark latest-reading-per-metric queries")
+    parser.add_argument("--sizes", type=str, default="10,50,100,250,500", help="逗号分隔的 metric 数量梯度")
+    parser.add_argument("--readings", type=int, default=200, help="每个 metric 的合成读数条数")
+    parser.add_argument("--repeat", type=int, default=3, help="每种方式重复次数，取平均")
+    args = parser.parse_args()
+    sizes = sorted(int(x) for x in args.sizes.split(",") if x.strip())
+
+    counter = QueryCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    try:
+        async with AsyncSessionLocal() as session:
+            facility = MonitoringFacility(code="BENCH_FAC", name="bench", is_simulated=True)
+            stype = SensorType(code="bench_latest", name="bench", is_simulated=True)
+            session.add_all([facility, stype])
+            await session.flush()
+            section = MonitoringSection(facility_id=facility.id, code="BENCH_SEC", name="bench", is_simulated=True)
+            session.add(section)
+            await session.flush()
+
+            print(
+                f"{'metrics':>8} {'legacy_q':>9} {'legacy_ms':>10} {'lateral_q':>10} {'lateral_ms':>11}"
+                f" {'proj_q':>7} {'proj_ms':>8}"
+            )
+            seeded = 0
+            for size in sizes:
+                await seed_metrics(session, section.id, stype.id, seeded, size, args.readings)
+                seeded = size
+                await rebuild_latest_values(session)
+                legacy_rows, legacy_q, legacy_s = await timed(session, counter, legacy_latest, args.repeat)
+                lateral_rows, lateral_q, lateral_s = await timed(session, counter, lateral_latest, args.repeat)
+                proj_rows, proj_q, proj_s = await timed(session, counter, projection_latest, args.repeat)
+                assert len(legacy_rows) == len(lateral_rows) == len(proj_rows) == size
+                expected = {m.id: r.reading_time for _, m, r in legacy_rows}
+                assert expected == {m.id: r.reading_time for _, m, r in lateral_rows}
+                assert expected == {m.id: r.reading_time for _, m, r in proj_rows}
+                print(
+                    f"{size:>8} {legacy_q:>9} {legacy_s * 1000:>10.1f} {lateral_q:>10} {lateral_s * 1000:>11.1f}"
+                    f" {proj_q:>7} {proj_s * 1000:>8.1f}"
+                )
+            await session.rollback()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""
+Excel 解析对照与基准：逐行 iterrows 旧路径 vs 按列向量化路径。
+
+对每个文件分别用两种路径解析，比较展开后的 sensor_readings 行（即写库内容）
+与 raw_values 是否完全一致，并输出两种路径的耗时。任一文件不一致时以非零状态退出。
+不需要数据库连接。
+
+用法：
+    PYTHONPATH=. python3 -m scripts.bench_parse_excel --root "../安全监测数据-MMK发电引水洞/4 发电引水洞"
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from app.utils.excel_importer import DATA_ROOT_DEFAULT, ExcelImporter
+from scripts.import_excel import collect_files
+
+
+def _timed_parse(importer: ExcelImporter, path: str):
+    started = time.perf_counter()
+    parsed = importer._parse_excel(path)
+    return parsed, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare row-wise and vectorized Excel parsing")
+    parser.add_argument("--root", type=str, default=DATA_ROOT_DEFAULT, help="数据根目录")
+    parser.add_argument("--limit", type=int, default=None, help="最多比较的文件数")
+    args = parser.parse_args()
+
+    files = collect_files(args.root)[: args.limit]
+    if not files:
+        print(f"No Excel files found under {args.root}")
+        return
+
+    legacy = ExcelImporter(session=None, data_root=args.root, vectorized=False)
+    vectorized = ExcelImporter(session=None, data_root=args.root, vectorized=True)
+    total_legacy = total_vectorized = 0.0
+    total_rows = 0
+    mismatches = []
+    for path in files:
+        old, old_s = _timed_parse(legacy, path)
+        new, new_s = _timed_parse(vectorized, path)
+        metric_ids = {key: i + 1 for i, key in enumerate(old.metrics)}
+        old_rows = legacy._build_reading_objs(1, metric_ids, old, 1)
+        new_rows = vectorized._build_reading_objs(1, metric_ids, new, 1)
+        same = old_rows == new_rows and old.raw_values == new.raw_values and list(old.metrics) == list(new.metrics)
+        if not same:
+            mismatches.append(path)
+        total_legacy += old_s
+        total_vectorized += new_s
+        total_rows += len(old_rows)
+        print(
+            f"{'OK ' if same else 'DIFF'} {len(old_rows):>7} readings  iterrows {old_s:6.2f}s"
+            f"  vectorized {new_s:6.2f}s  {path}"
+        )
+
+    speedup = total_legacy / total_vectorized if total_vectorized else 0
+    print(
+        f"\n{len(files)} files, {total_rows} readings: iterrows {total_legacy:.1f}s, "
+        f"vectorized {total_vectorized:.1f}s ({speedup:.1f}x)"
+    )
+    if mismatches:
+        print(f"{len(mismatches)} file(s) differ:")
+        for path in mismatches:
+            print(f"  {path}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
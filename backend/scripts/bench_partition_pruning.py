@@ -0,0 +1,112 @@
+"""
+分区裁剪检查：对 /api/v1/readings 列表查询的不同时间范围做 EXPLAIN，统计计划中
+实际扫描的 sensor_readings 分区数与总分区数。
+
+默认在一个事务内为最近 N 个月建分区并写入合成读数，结束后回滚（分区 DDL 一并回滚）；
+``--existing`` 时直接在现有数据上 EXPLAIN，不写任何数据。
+
+用法：
+    PYTHONPATH=. python3 -m scripts.bench_partition_pruning --months 24 --per-day 24
+    PYTHONPATH=. python3 -m scripts.bench_partition_pruning --existing --analyze
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.api.v1.readings import _apply_filters, _apply_keyset, _encode_cursor
+from app.database import AsyncSessionLocal
+from app.models import MonitoringFacility, MonitoringSection, Sensor, SensorMetric, SensorReading, SensorType
+from app.utils.explain import explain, scanned_relations
+from app.utils.partitions import PARENT, add_months, ensure_months, list_partitions, month_start
+
+BENCH_METRIC_KEY = "bench_partition"
+
+
+async def seed(session, months: int, per_day: int) -> datetime:
+    facility = MonitoringFacility(code="BENCH_PART_FAC", name="bench", is_simulated=True)
+    stype = SensorType(code="bench_partition", name="bench", is_simulated=True)
+    session.add_all([facility, stype])
+    await session.flush()
+    section = MonitoringSection(facility_id=facility.id, code="BENCH_PART_SEC", name="bench", is_simulated=True)
+    session.add(section)
+    await session.flush()
+    sensor = Sensor(section_id=section.id, sensor_type_id=stype.id, point_code="BENCH-PART", is_simulated=True)
+    metric = SensorMetric(sensor=sensor, metric_key=BENCH_METRIC_KEY, unit="m", is_simulated=True)
+    session.add_all([sensor, metric])
+    await session.flush()
+
+    end = datetime.combine(month_start(datetime.now()), datetime.min.time())
+    first = add_months(end.date(), -months)
+    await ensure_months(session, (add_months(first, i) for i in range(months + 1)))
+    step = timedelta(days=1) / per_day
+    current = datetime.combine(first, datetime.min.time())
+    rows = []
+    while current < end:
+        rows.append(
+            dict(
+                sensor_id=sensor.id,
+                metric_id=metric.id,
+                reading_time=current,
+                value_num=float(len(rows)),
+                is_simulated=True,
+                quality_flag="normal",
+            )
+        )
+        current += step
+    for i in range(0, len(rows), 1000):
+        await session.execute(insert(SensorReading).values(rows[i : i + 1000]))
+    print(f"seeded {len(rows)} readings over {months} month(s)")
+    return end
+
+
+def list_stmt(metric_key, start=None, end=None, cursor=None, limit=100):
+    stmt = select(SensorReading).join(SensorMetric)
+    stmt = _apply_filters(stmt, None, metric_key, start, end, None)
+    return _apply_keyset(stmt, "desc", cursor).limit(limit + 1)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Check partition pruning of the readings list query")
+    parser.add_argument("--months", type=int, default=24, help="合成数据覆盖的月数")
+    parser.add_argument("--per-day", type=int, default=24, help="每天的合成读数条数")
+    parser.add_argument("--existing", action="store_true", help="不写合成数据，直接在现有数据上检查")
+    parser.add_argument("--analyze", action="store_true", help="使用 EXPLAIN ANALYZE 并输出耗时")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as session:
+        if args.existing:
+            metric_key, end = None, datetime.now()
+        else:
+            metric_key, end = BENCH_METRIC_KEY, await seed(session, args.months, args.per_day)
+            await (await session.connection()).exec_driver_sql(f"ANALYZE {PARENT}")
+        total = len(await list_partitions(session))
+
+        cases = [
+            ("no range", list_stmt(metric_key)),
+            ("last day", list_stmt(metric_key, end - timedelta(days=1), end)),
+            ("last 7 days", list_stmt(metric_key, end - timedelta(days=7), end)),
+            ("last month", list_stmt(metric_key, end - timedelta(days=31), end)),
+            ("last quarter", list_stmt(metric_key, end - timedelta(days=92), end)),
+            ("cursor page", list_stmt(metric_key, cursor=_encode_cursor(end - timedelta(days=40), 0))),
+        ]
+        print(f"{'case':<14} {'partitions':>12} {'ms':>9}  scans")
+        for label, stmt in cases:
+            started = time.perf_counter()
+            plan = await explain(session, stmt, analyze=args.analyze)
+            elapsed = (time.perf_counter() - started) * 1000
+            scans = [s for s in scanned_relations(plan) if s["relation"].startswith(PARENT)]
+            touched = sorted({s["relation"] for s in scans})
+            nodes = sorted({s["node"] for s in scans})
+            print(f"{label:<14} {len(touched):>5} / {total:<4} {elapsed:>9.1f}  {', '.join(nodes)}")
+        await session.rollback()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,142 @@
+"""
+查询计划回归检查：对各读数接口实际使用的查询构造函数做 EXPLAIN，
+计划中出现对 sensor_readings（含其分区）的 Seq Scan 即失败（非零退出）。
+
+默认在一个事务内写入合成的测点/指标/读数并 ANALYZE，结束后回滚；合成数据量小，
+规划器本会倾向顺序扫描，因此默认 ``SET LOCAL enable_seqscan = off``——此时仍出现
+Seq Scan 说明没有可用索引。``--existing`` 时直接用现有数据与统计信息检查。
+
+用法：
+    PYTHONPATH=. python3 -m scripts.check_query_plans
+    PYTHONPATH=. python3 -m scripts.check_query_plans --existing --allow-seqscan
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.api.v1.readings import _apply_filters, _apply_keyset, _encode_cursor
+from app.database import AsyncSessionLocal
+from app.models import MonitoringFacility, MonitoringSection, Sensor, SensorMetric, SensorReading, SensorType
+from app.utils.downsample import AGGREGATES, bucket_stmt, raw_points_stmt
+from app.utils.explain import explain, iter_nodes
+from app.utils.latest_readings import latest_readings_stmt
+from app.utils.partitions import PARENT, ensure_partitions_for
+
+CHECK_METRIC_KEY = "plan_check"
+
+
+async def seed(session, sensors: int, readings: int):
+    """写入 sensors 个测点（一半为模拟数据），每个一个指标、readings 条小时读数。"""
+    facility = MonitoringFacility(code="PLAN_FAC", name="plan check", is_simulated=True)
+    stype = SensorType(code="plan_check", name="plan check", is_simulated=True)
+    session.add_all([facility, stype])
+    await session.flush()
+    section = MonitoringSection(facility_id=facility.id, code="PLAN_SEC", name="plan check", is_simulated=True)
+    session.add(section)
+    await session.flush()
+
+    base = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=readings)
+    metrics = []
+    for i in range(sensors):
+        simulated = i % 2 == 0
+        sensor = Sensor(section_id=section.id, sensor_type_id=stype.id, point_code=f"PLAN-{i}", is_simulated=simulated)
+        metric = SensorMetric(sensor=sensor, metric_key=CHECK_METRIC_KEY, unit="m", is_simulated=simulated)
+        session.add_all([sensor, metric])
+        await session.flush()
+        rows = [
+            dict(
+                sensor_id=sensor.id,
+                metric_id=metric.id,
+                reading_time=base + timedelta(hours=h),
+                value_num=float(h),
+                is_simulated=simulated,
+                quality_flag="normal",
+            )
+            for h in range(readings)
+        ]
+        await ensure_partitions_for(session, rows)
+        for j in range(0, len(rows), 1000):
+            await session.execute(insert(SensorReading).values(rows[j : j + 1000]))
+        metrics.append(metric)
+    return metrics, base + timedelta(hours=readings)
+
+
+def list_stmt(sensor_id=None, metric_key=None, start=None, end=None, is_simulated=None, cursor=None, limit=100):
+    """与 GET /api/v1/readings 相同的查询构造。"""
+    stmt = select(SensorReading).join(SensorMetric)
+    stmt = _apply_filters(stmt, sensor_id, metric_key, start, end, is_simulated)
+    return _apply_keyset(stmt, "desc", cursor).limit(limit + 1)
+
+
+def build_cases(metric: SensorMetric, end: datetime):
+    week = end - timedelta(days=7)
+    return [
+        ("latest (lateral), one key", latest_readings_stmt([metric.metric_key])),
+        ("latest (lateral), all", latest_readings_stmt()),
+        ("list, unfiltered", list_stmt()),
+        ("list, by sensor", list_stmt(sensor_id=metric.sensor_id)),
+        ("list, by metric_key", list_stmt(metric_key=metric.metric_key)),
+        ("list, simulated only", list_stmt(is_simulated=True)),
+        ("list, time range", list_stmt(start=week, end=end)),
+        ("list, sensor + range", list_stmt(sensor_id=metric.sensor_id, start=week, end=end)),
+        ("list, cursor page", list_stmt(cursor=_encode_cursor(end - timedelta(days=2), 0))),
+        ("aggregate, 1h buckets", bucket_stmt([metric.id], "1h", AGGREGATES, week, end)),
+        ("aggregate, raw points", raw_points_stmt(metric.id, week, end)),
+    ]
+
+
+def reading_scans(plan):
+    """计划中扫描 sensor_readings 父表或分区的节点（汇总表 sensor_readings_1h/1d 不算）。"""
+    for node in iter_nodes(plan):
+        relation = node.get("Relation Name", "")
+        if relation == PARENT or relation.startswith((f"{PARENT}_p", f"{PARENT}_default")):
+            yield node
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Fail when a reading query plans a sequential scan")
+    parser.add_argument("--sensors", type=int, default=6, help="合成测点数")
+    parser.add_argument("--readings", type=int, default=24 * 60, help="每个测点的合成小时读数条数")
+    parser.add_argument("--existing", action="store_true", help="不写合成数据，直接检查现有数据")
+    parser.add_argument("--allow-seqscan", action="store_true", help="不关闭 enable_seqscan（按真实代价选择计划）")
+    args = parser.parse_args()
+
+    failures = []
+    async with AsyncSessionLocal() as session:
+        conn = await session.connection()
+        if args.existing:
+            metric = (await session.execute(select(SensorMetric).order_by(SensorMetric.id).limit(1))).scalar_one()
+            end = datetime.now()
+        else:
+            metrics, end = await seed(session, args.sensors, args.readings)
+            metric = metrics[-1]
+            await conn.exec_driver_sql(f"ANALYZE {PARENT}")
+            await conn.exec_driver_sql("ANALYZE sensor_metrics")
+        if not args.allow_seqscan:
+            await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+        for label, stmt in build_cases(metric, end):
+            plan = await explain(session, stmt)
+            seq = [n["Relation Name"] for n in reading_scans(plan) if n["Node Type"] == "Seq Scan"]
+            indexes = sorted({n["Index Name"] for n in iter_nodes(plan) if "Index Name" in n})
+            status = "FAIL" if seq else "ok"
+            detail = f"seq scan on {', '.join(sorted(set(seq)))}" if seq else ", ".join(indexes) or "-"
+            print(f"{status:<4} {label:<28} {detail}")
+            if seq:
+                failures.append(label)
+        await session.rollback()
+
+    if failures:
+        print(f"\n{len(failures)} query plan(s) scan sensor_readings sequentially")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+只读副本路由联调：按几种场景构造 ReplicaRouter，确认只读会话落到预期的实例。
+
+- 副本延迟 0：应路由到副本；
+- 延迟超过上限：应回退主库；
+- 副本不可达（指向一个没有监听的端口）：应回退主库。
+
+连接落在哪个实例通过 application_name 区分（主库/副本引擎各自设置），因此副本 URL 可以指向
+同一个 PostgreSQL 实例，用模拟延迟代替真实复制；有两个实例时传入真实副本 URL 并加 ``--real-lag``
+额外检查一次真实复制延迟。任一场景不符合预期时以非零状态退出。
+
+用法：
+    PYTHONPATH=. python3 -m scripts.check_replica_routing
+    PYTHONPATH=. python3 -m scripts.check_replica_routing --replica-url postgresql+asyncpg://user:pw@replica:5432/water_twin --real-lag
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from app.config import get_settings
+from app.database import ReadSessionLocal, _create_engine, _session_factory, engine
+from app.utils.replica import ReplicaRouter
+
+
+async def routed_to(router: ReplicaRouter) -> str:
+    factory = await router.session_factory()
+    async with factory() as session:
+        name = await session.scalar(text("SELECT current_setting('application_name')"))
+    return "replica" if name.endswith("-replica") else "primary"
+
+
+async def check(label: str, replica_url: str, simulated_lag, max_lag: float, expected: str) -> bool:
+    settings = get_settings()
+    replica_engine = _create_engine(replica_url, f"{settings.db_application_name}-replica")
+    router = ReplicaRouter(
+        ReadSessionLocal,
+        _session_factory(replica_engine.execution_options(postgresql_readonly=True)),
+        replica_engine,
+        max_lag_seconds=max_lag,
+        check_seconds=60,
+        simulated_lag_seconds=simulated_lag,
+    )
+    try:
+        target = await routed_to(router)
+    finally:
+        await replica_engine.dispose()
+    ok = target == expected
+    lag = "-" if router.lag_seconds is None else f"{router.lag_seconds:.2f}s"
+    error = f"  ({router.last_error})" if router.last_error else ""
+    print(f"{'ok ' if ok else 'FAIL'} {label:<28} lag={lag:<8} -> {target} (expected {expected}){error}")
+    return ok
+
+
+async def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Check read-replica routing and primary fallback")
+    parser.add_argument(
+        "--replica-url",
+        type=str,
+        default=settings.database_url_replica or settings.database_url,
+        help="副本连接串，默认 DATABASE_URL_REPLICA，未配置时用主库模拟",
+    )
+    parser.add_argument("--max-lag", type=float, default=settings.replica_max_lag_seconds, help="可容忍的延迟（秒）")
+    parser.add_argument("--real-lag", action="store_true", help="额外按真实复制延迟检查一次（需要真实副本）")
+    args = parser.parse_args()
+
+    unreachable = make_url(args.replica_url).set(host="127.0.0.1", port=1).render_as_string(hide_password=False)
+    results = [
+        await check("simulated lag 0", args.replica_url, 0.0, args.max_lag, "replica"),
+        await check("simulated lag over limit", args.replica_url, args.max_lag + 1, args.max_lag, "primary"),
+        await check("replica unreachable", unreachable, 0.0, args.max_lag, "primary"),
+    ]
+    if args.real_lag:
+        results.append(await check("real replication lag", args.replica_url, None, args.max_lag, "replica"))
+    await engine.dispose()
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
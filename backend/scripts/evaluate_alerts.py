@@ -0,0 +1,76 @@
+"""
+按时间顺序重放历史读数，重建 alerts（首次上线告警评估、调整规则/阈值后使用）。
+
+逐个 metric 删除其已有告警后，按 reading_time 分块读取读数交给 AlertEvaluator（replay 模式，
+不参考最新值水位线），每个 metric 提交一次。已确认（acknowledged_by 非空）的告警默认保留。
+
+用法：
+    PYTHONPATH=. python3 -m scripts.evaluate_alerts
+    PYTHONPATH=. python3 -m scripts.evaluate_alerts --metric-id 12 --metric-id 13 --include-acknowledged
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from sqlalchemy import delete, select
+
+from app.database import AsyncSessionLocal
+from app.models import Alert, SensorMetric, SensorReading
+from app.utils.alerting import AlertEvaluator
+from app.utils.cache import invalidate_cache
+
+CHUNK_SIZE = 20000
+
+
+async def replay_metric(session, evaluator: AlertEvaluator, metric_id: int, include_acknowledged: bool) -> Counter:
+    stmt = delete(Alert).where(Alert.metric_id == metric_id)
+    if not include_acknowledged:
+        stmt = stmt.where(Alert.acknowledged_by.is_(None))
+    await session.execute(stmt)
+    evaluator.reset([metric_id])
+    totals: Counter = Counter()
+    after = None
+    while True:
+        query = (
+            select(SensorReading.metric_id, SensorReading.reading_time, SensorReading.value_num)
+            .where(SensorReading.metric_id == metric_id, SensorReading.value_num.is_not(None))
+            .order_by(SensorReading.reading_time)
+            .limit(CHUNK_SIZE)
+        )
+        if after is not None:
+            query = query.where(SensorReading.reading_time > after)
+        rows = [dict(r) for r in (await session.execute(query)).mappings().all()]
+        if not rows:
+            break
+        totals.update(await evaluator.evaluate(session, rows, replay=True))
+        after = rows[-1]["reading_time"]
+    await session.commit()
+    return totals
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild alerts by replaying historical readings")
+    parser.add_argument("--metric-id", type=int, action="append", help="仅重放指定 metric，可重复传入")
+    parser.add_argument("--include-acknowledged", action="store_true", help="同时删除已确认的告警")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    evaluator = AlertEvaluator()
+    totals: Counter = Counter()
+    async with AsyncSessionLocal() as session:
+        metric_ids = args.metric_id or (await session.scalars(select(SensorMetric.id).order_by(SensorMetric.id))).all()
+        for metric_id in metric_ids:
+            totals.update(await replay_metric(session, evaluator, metric_id, args.include_acknowledged))
+    invalidate_cache()
+    print(
+        f"replayed {totals['evaluated']} readings of {len(metric_ids)} metric(s) in {time.perf_counter() - started:.1f}s: "
+        f"{totals['raised']} alerts raised, {totals['resolved']} resolved"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
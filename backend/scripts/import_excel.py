@@ -3,6 +3,10 @@
 
 用法：
     python3 -m scripts.import_excel --root "../安全监测数据-MMK发电引水洞/4 发电引水洞"
+    python3 -m scripts.import_excel --workers 8   # 多进程解析 Excel，单个异步写库
+    python3 -m scripts.import_excel --copy        # 读数经 COPY 批量写入
+    python3 -m scripts.import_excel --force       # 跳过 mtime/size 预检，全部重新解析导入
+    python3 -m scripts.import_excel --incremental # 追加型文件只导入水位线之后的新行
 """
 
 from __future__ import annotations
@@ -10,11 +14,15 @@ from __future__ import annotations
 import argparse
 import asyncio
 import os
-from typing import List
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 from sqlalchemy import text
 from app.database import AsyncSessionLocal
-from app.utils.excel_importer import ExcelImporter, DATA_ROOT_DEFAULT
+from app.utils.excel_importer import ExcelImporter, ParsedExcel, DATA_ROOT_DEFAULT, parse_excel_file
 
 
 def collect_files(root: str) -> List[str]:
@@ -27,16 +35,76 @@ def collect_files(root: str) -> List[str]:
     return sorted(excel_files)
 
 
+def _parse_worker(
+    path: str, data_root: str, skip_rows: int = 0, after: Optional[datetime] = None
+) -> Tuple[str, Optional[ParsedExcel], Optional[str]]:
+    try:
+        return path, parse_excel_file(path, data_root, skip_rows=skip_rows, after=after), None
+    except Exception as exc:  # 子进程异常带回主进程汇报，不中断其余文件
+        return path, None, f"{type(exc).__name__}: {exc}"
+
+
+def report(result: Dict[str, Any], totals: Dict[str, Any]) -> None:
+    status = result.get("status")
+    totals["outcomes"][status if status != "skipped" else f"skipped:{result.get('reason')}"] += 1
+    if status == "skipped" and result.get("reason") in ("unchanged", "unchanged_content"):
+        return  # 未变化的文件不逐条打印，只计入汇总
+    print(result)
+    if status == "success":
+        totals["rows"] += result.get("rows", 0)
+        totals["insert_seconds"] += result.get("insert_seconds", 0.0)
+
+
+async def import_parallel(
+    importer: ExcelImporter, files: List[str], workers: int, totals: Dict[str, Any], force: bool = False
+) -> None:
+    """子进程并行解析，解析结果按完成顺序流回主进程，由单个会话串行写库。
+
+    提交解析前先做 stat 预检，未变化的文件不进入进程池。
+    """
+    loop = asyncio.get_running_loop()
+    pending_files = []
+    for path in files:
+        skipped = await importer.precheck(path, force=force)
+        if skipped is not None:
+            report(skipped, totals)
+        else:
+            window = (0, None) if force else await importer.parse_window(path)
+            pending_files.append((path, *window))
+    in_flight = set()
+    # 限制在途任务数，避免解析远快于写库时结果堆积在内存
+    max_in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending_files or in_flight:
+            while pending_files and len(in_flight) < max_in_flight:
+                path, skip_rows, after = pending_files.pop(0)
+                in_flight.add(loop.run_in_executor(pool, _parse_worker, path, importer.data_root, skip_rows, after))
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                path, parsed, error = fut.result()
+                if error:
+                    report({"status": "failed", "reason": "parse_error", "path": path, "error": error}, totals)
+                    continue
+                result = await importer.import_file(path, parsed=parsed, force=force)
+                report(result, totals)
+
+
 async def main():
     parser = argparse.ArgumentParser(description="Import monitoring Excel files into PostgreSQL")
     parser.add_argument("--root", type=str, default=DATA_ROOT_DEFAULT, help="数据根目录")
     parser.add_argument("--retry-zero", action="store_true", help="仅重导 rows_imported=0 的 ingest_files 记录")
+    parser.add_argument("--workers", type=int, default=1, help="解析 Excel 的进程数，>1 时启用进程池")
+    parser.add_argument("--copy", action="store_true", help="使用 COPY 临时表 + 合并写入读数")
+    parser.add_argument("--force", action="store_true", help="忽略 mtime/size/checksum 预检，强制重新导入")
+    parser.add_argument(
+        "--incremental", action="store_true", help="按 ingest_files 水位线只导入文件尾部新增行，每个文件保持一条来源记录"
+    )
     args = parser.parse_args()
 
     root_abs = os.path.abspath(args.root)
     if args.retry_zero:
         async with AsyncSessionLocal() as session:
-            importer = ExcelImporter(session=session, data_root=root_abs)
+            importer = ExcelImporter(session=session, data_root=root_abs, use_copy=args.copy)
             rows = (await session.execute(text("select path from ingest_files where rows_imported = 0"))).all()
             files = [r[0] for r in rows]
             if not files:
@@ -53,11 +121,33 @@ async def main():
         print(f"No Excel files found under {root_abs}")
         return
 
+    started = time.perf_counter()
+    totals: Dict[str, Any] = {"rows": 0, "insert_seconds": 0.0, "outcomes": Counter()}
     async with AsyncSessionLocal() as session:
-        importer = ExcelImporter(session=session, data_root=root_abs)
-        for path in files:
-            result = await importer.import_file(path)
-            print(result)
+        importer = ExcelImporter(
+            session=session, data_root=root_abs, use_copy=args.copy, incremental=args.incremental
+        )
+        if args.workers > 1:
+            await import_parallel(importer, files, args.workers, totals, force=args.force)
+        else:
+            for path in files:
+                result = await importer.import_file(path, force=args.force)
+                report(result, totals)
+    rate = totals["rows"] / totals["insert_seconds"] if totals["insert_seconds"] else 0
+    outcomes = totals["outcomes"]
+    skipped = sum(n for key, n in outcomes.items() if key.startswith("skipped"))
+    print(
+        f"Scanned {len(files)} files in {time.perf_counter() - started:.1f}s "
+        f"(workers={args.workers}, mode={'copy' if args.copy else 'insert'}, force={args.force}, "
+        f"incremental={args.incremental}): "
+        f"{outcomes['success']} imported, {skipped} skipped, {outcomes['failed']} failed; "
+        f"{totals['rows']} rows written at {rate:.0f} rows/s"
+    )
+    for key, n in sorted(outcomes.items()):
+        if key.startswith("skipped"):
+            print(f"  {key}: {n}")
+    dims = importer.dimensions.stats()
+    print(f"  dimension cache: {dims['queries']} queries, {dims['created']} rows created")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+"""
+sensor_readings 月分区维护：查看分区、预建未来分区、按保留期归档/删除旧分区。
+
+建议每月由定时任务执行一次 ensure（以及配置了保留期时的 retention）。
+
+用法：
+    PYTHONPATH=. python3 -m scripts.manage_partitions list
+    PYTHONPATH=. python3 -m scripts.manage_partitions ensure --ahead 3
+    PYTHONPATH=. python3 -m scripts.manage_partitions retention --keep-months 24 --policy archive --dry-run
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.utils.partitions import RETENTION_POLICIES, apply_retention, ensure_partitions, list_partitions
+
+
+async def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Maintain monthly sensor_readings partitions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出分区及估算行数")
+    ensure = sub.add_parser("ensure", help="创建 default 分区及当前月到未来 N 个月的分区")
+    ensure.add_argument("--ahead", type=int, default=settings.readings_partitions_ahead, help="预建月数")
+    retention = sub.add_parser("retention", help="detach 超出保留期的月分区并归档或删除")
+    retention.add_argument(
+        "--keep-months", type=int, default=settings.readings_retention_months, help="保留最近 N 个月"
+    )
+    retention.add_argument(
+        "--policy", choices=RETENTION_POLICIES, default=settings.readings_retention_policy, help="过期分区处理方式"
+    )
+    retention.add_argument("--dry-run", action="store_true", help="只列出将处理的分区")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as session:
+        if args.command == "list":
+            for p in await list_partitions(session):
+                print(f"{p['relname']:<32} {p['est_rows']:>12}  {p['bound']}")
+            return
+        if args.command == "ensure":
+            created = await ensure_partitions(session, args.ahead)
+            await session.commit()
+            print(f"created {len(created)} partition(s): {', '.join(created) or '-'}")
+            return
+        if args.keep_months is None:
+            parser.error("--keep-months is required (or set READINGS_RETENTION_MONTHS)")
+        expired = await apply_retention(session, args.keep_months, args.policy, dry_run=args.dry_run)
+        if not args.dry_run:
+            await session.commit()
+        action = "would process" if args.dry_run else args.policy
+        print(f"{action} {len(expired)} partition(s): {', '.join(p['relname'] for p in expired) or '-'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
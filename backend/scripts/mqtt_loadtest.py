@@ -0,0 +1,245 @@
+"""
+MQTT 接入吞吐与丢失测试：进程内 broker 替身（EmbeddedMqttBroker）+ MqttIngestAdapter，不需要外部 MQTT 服务。
+
+每轮为每台设备的每个指标发布一条消息（主题 ``twin/{station_id}/{device_id}/{metric}``），
+可注入链路丢包（--drop-rate）、重复投递（--duplicate-rate）与写入失败（--fail-rate，仅 --offline）；
+等 broker 中没有未确认/未投递的消息后，核对写入的唯一读数与发布的样本数：
+丢失数 = 样本数 - 唯一读数，应为 0（有丢失时退出码为 1）；重复投递由唯一键去重，不产生重复读数。
+
+默认连库：设备与 simulate_devices 相同（--synthetic N 补足压测设备），经 MetricKeyCache 与 BatchedReadingWriter 写入，
+唯一读数按发布前后库中本批设备、时间窗内的行数之差统计；写入方有失败或被丢弃的读数时同样非零退出。
+--offline 不连库：静态键解析 + 内存写入方（按 (metric_id, reading_time, source_file_id) 去重），只测适配器与 broker；
+内存写入方按 sensor_readings 的 NOT NULL 与长度约束校验每行，违反约束的批次失败且计入 schema_violations（非零退出）。
+
+用法：
+    PYTHONPATH=. python3 -m scripts.mqtt_loadtest --offline --devices 2000 --rounds 20 --drop-rate 0.01 --fail-rate 0.05 --ack-timeout 1
+    PYTHONPATH=. python3 -m scripts.mqtt_loadtest --synthetic 1000 --rounds 10 --duplicate-rate 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+
+from app.database import AsyncSessionLocal
+from app.utils.device_simulator import (
+    SYNTHETIC_METRICS,
+    SYNTHETIC_PREFIX,
+    DeviceSpec,
+    SimMetric,
+    create_synthetic_devices,
+    load_devices,
+    metric_key_of,
+    provision_devices,
+    signal_for,
+)
+from app.models import SensorReading
+from app.utils.bulk_copy import READING_COLUMNS
+from app.utils.ingest import MetricKey, MetricKeyCache, MetricRef
+from app.utils.mqtt_adapter import MqttIngestAdapter, encode_binary, topic_for
+from app.utils.mqtt_broker import EmbeddedMqttBroker
+from app.utils.reading_writer import BatchedReadingWriter
+
+
+class StaticResolver:
+    def __init__(self, refs: Dict[MetricKey, MetricRef]):
+        self.refs = refs
+
+    async def resolve(self, keys: Iterable[MetricKey]) -> Dict[MetricKey, MetricRef]:
+        return {key: self.refs[key] for key in keys if key in self.refs}
+
+
+def schema_violation(row: Dict[str, Any]) -> Optional[str]:
+    """按 sensor_readings 的 NOT NULL 与 varchar 长度约束校验一行（与 COPY 写入的列一致）。"""
+    for name in READING_COLUMNS:
+        column, value = SensorReading.__table__.c[name], row.get(name)
+        if value is None:
+            if not column.nullable:
+                return f"{name} is NULL"
+        elif isinstance(value, str) and getattr(column.type, "length", None) and len(value) > column.type.length:
+            return f"{name} longer than {column.type.length}"
+    return None
+
+
+class SinkWriter:
+    """内存写入方：按唯一键去重，按 fail_rate 概率整批失败（模拟写库异常）；违反表约束的批次同样失败。"""
+
+    def __init__(self, fail_rate: float, seed: int):
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.keys: Set[Tuple[int, datetime, int]] = set()
+        self.failed_batches = 0
+        self.schema_violations = 0
+        self.last_violation: Optional[str] = None
+
+    async def put(self, rows: List[Dict[str, Any]], wait_commit: bool = False) -> int:
+        await asyncio.sleep(0.002)
+        violations = [v for v in map(schema_violation, rows) if v]
+        if violations:
+            self.schema_violations += len(violations)
+            self.last_violation = violations[0]
+            raise ValueError(f"{len(violations)} row(s) violate sensor_readings constraints: {violations[0]}")
+        if self.fail_rate and self.rng.random() < self.fail_rate:
+            self.failed_batches += 1
+            raise RuntimeError("injected write failure")
+        before = len(self.keys)
+        self.keys.update((r["metric_id"], r["reading_time"], r["source_file_id"]) for r in rows)
+        return len(self.keys) - before
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "unique_rows": len(self.keys),
+            "failed_batches": self.failed_batches,
+            "schema_violations": self.schema_violations,
+            "last_violation": self.last_violation,
+        }
+
+
+def offline_devices(count: int, seed: int) -> Tuple[List[Tuple[str, DeviceSpec]], StaticResolver]:
+    devices, refs = [], {}
+    metric_id = 0
+    for i in range(1, count + 1):
+        device_id = f"{SYNTHETIC_PREFIX}{i:05d}"
+        rng = random.Random(f"{seed}:{device_id}")
+        spec = DeviceSpec(device_id, sensor_id=i, source_id=i, freq_sec=10.0, is_simulated=True)
+        for name in SYNTHETIC_METRICS[i % len(SYNTHETIC_METRICS)]:
+            metric_id += 1
+            key = metric_key_of(name)
+            spec.metrics.append(SimMetric(metric_id, key, None, signal_for(key, rng)))
+            refs[(device_id, key)] = MetricRef(i, metric_id, i, None, True)
+        devices.append(("SIM", spec))
+    return devices, StaticResolver(refs)
+
+
+async def db_devices(args) -> List[Tuple[str, DeviceSpec]]:
+    async with AsyncSessionLocal() as session:
+        if args.synthetic:
+            await create_synthetic_devices(session, args.synthetic, 10)
+        devices = await load_devices(session, synthetic_only=args.synthetic_only)
+        specs = await provision_devices(session, devices, seed=args.seed)
+    stations = {d.device_id: d.station_id or "SIM" for d in devices}
+    return [(stations[spec.device_id], spec) for spec in specs][: args.devices or None]
+
+
+async def count_readings(devices: List[Tuple[str, DeviceSpec]], start: datetime, end: datetime) -> int:
+    """库中这些设备的实时来源在 [start, end] 内的读数行数。"""
+    metric_ids = [metric.metric_id for _, spec in devices for metric in spec.metrics]
+    source_ids = sorted({spec.source_id for _, spec in devices})
+    stmt = select(func.count()).where(
+        SensorReading.metric_id.in_(metric_ids),
+        SensorReading.source_file_id.in_(source_ids),
+        SensorReading.reading_time.between(start, end),
+    )
+    async with AsyncSessionLocal() as session:
+        return await session.scalar(stmt)
+
+
+def payload(fmt: str, at: datetime, value: float) -> bytes:
+    if fmt == "json":
+        return json.dumps({"t": at.isoformat(), "v": round(value, 4)}).encode()
+    return encode_binary([(at, value)])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Throughput and loss test for the MQTT ingest adapter")
+    parser.add_argument("--offline", action="store_true", help="不连库：静态键解析 + 内存写入方")
+    parser.add_argument("--devices", type=int, default=1000, help="设备数（连库时为上限，0 不限）")
+    parser.add_argument("--synthetic", type=int, default=0, help="连库时补足 N 台 sim_load_* 压测设备")
+    parser.add_argument("--synthetic-only", action="store_true", help="连库时只使用压测设备")
+    parser.add_argument("--rounds", type=int, default=10, help="发布轮数（每轮每个指标一条消息）")
+    parser.add_argument("--interval", type=float, default=0.0, help="轮间隔（秒）")
+    parser.add_argument("--format", choices=["binary", "json"], default="binary", help="负载格式")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="broker 投递丢包概率")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="broker 重复投递概率")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="写入整批失败概率（仅 --offline）")
+    parser.add_argument("--ack-timeout", type=float, default=5.0, help="未 ack 重发超时（秒）")
+    parser.add_argument("--batch", type=int, default=500, help="适配器每批消息数")
+    parser.add_argument("--timeout", type=float, default=120.0, help="等待全部确认的最长时间（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.offline:
+        devices, resolver = offline_devices(args.devices, args.seed)
+        writer = SinkWriter(args.fail_rate, args.seed)
+    else:
+        devices = await db_devices(args)
+        resolver = MetricKeyCache()
+        writer = BatchedReadingWriter().start()
+    if not devices:
+        print("No online simulated devices; run scripts.seed_data or pass --synthetic N")
+        return
+
+    broker = EmbeddedMqttBroker(
+        ack_timeout=args.ack_timeout,
+        drop_rate=args.drop_rate,
+        duplicate_rate=args.duplicate_rate,
+        seed=args.seed,
+    )
+    await broker.start()
+    adapter = MqttIngestAdapter(broker, writer, resolver, batch_size=args.batch).start()
+
+    # 样本时间按毫秒错开，与库中已有读数及前几次运行都不冲突
+    base = datetime.utcnow().replace(microsecond=0)
+    window_end = base + timedelta(seconds=args.rounds * max(spec.freq_sec for _, spec in devices), milliseconds=1000)
+    before = 0 if args.offline else await count_readings(devices, base, window_end)
+    samples = 0
+    started = time.perf_counter()
+    for r in range(args.rounds):
+        for i, (station, spec) in enumerate(devices):
+            at = base + timedelta(seconds=r * spec.freq_sec, milliseconds=i % 1000)
+            for metric in spec.metrics:
+                broker.publish(topic_for(station, spec.device_id, metric.metric_key), payload(args.format, at, metric.signal(at)))
+                samples += 1
+                if samples % args.batch == 0:
+                    # 让适配器及时取走消息，避免 inflight 因发布端占用事件循环而超时重发
+                    await asyncio.sleep(0)
+        await asyncio.sleep(args.interval)
+    published_s = time.perf_counter() - started
+
+    deadline = time.monotonic() + args.timeout
+    drained = False
+    while time.monotonic() < deadline:
+        state = broker.stats()
+        if not state["inflight"] and not state["backlog"] and not adapter.stats()["inflight_batches"]:
+            drained = True
+            break
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    await adapter.stop()
+    await broker.stop()
+    if not args.offline:
+        await writer.close()
+
+    ingest, written = adapter.stats(), writer.stats()
+    if args.offline:
+        unique, dropped = written["unique_rows"], written["schema_violations"]
+    else:
+        unique = await count_readings(devices, base, window_end) - before
+        dropped = written["rows_failed"] + written["rows_invalid"]
+    lost = samples - unique
+    print(
+        f"{samples} samples published in {published_s:.2f}s, {'all acked' if drained else 'timed out'} in {elapsed:.2f}s "
+        f"({samples / elapsed:.0f} msgs/s); unique rows {unique}, lost {lost}, dropped by writer {dropped}, "
+        f"redelivered {ingest['redelivered']}, duplicate rows suppressed {ingest['rows'] - unique}"
+    )
+    print(
+        json.dumps(
+            {"broker": broker.stats(), "adapter": ingest, "writer": written},
+            ensure_ascii=False,
+            indent=2,
+            default=str,
+        )
+    )
+    if lost or dropped:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
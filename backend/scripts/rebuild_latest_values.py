@@ -0,0 +1,30 @@
+"""
+从 sensor_readings 重建 sensor_latest_values 最新值投影。
+
+用法：
+    PYTHONPATH=. python3 -m scripts.rebuild_latest_values
+    PYTHONPATH=. python3 -m scripts.rebuild_latest_values --metric-id 12 --metric-id 13
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from app.database import AsyncSessionLocal
+from app.utils.latest_readings import rebuild_latest_values
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild the sensor_latest_values projection")
+    parser.add_argument("--metric-id", type=int, action="append", help="仅重建指定 metric，可重复传入")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as session:
+        rows = await rebuild_latest_values(session, args.metric_id)
+        await session.commit()
+    print(f"sensor_latest_values rebuilt: {rows} rows")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
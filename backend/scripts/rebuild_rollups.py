@@ -0,0 +1,32 @@
+"""
+从 sensor_readings 重建小时/日汇总表（sensor_readings_1h / sensor_readings_1d）。
+
+用法：
+    PYTHONPATH=. python3 -m scripts.rebuild_rollups
+    PYTHONPATH=. python3 -m scripts.rebuild_rollups --metric-id 12 --metric-id 13
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app.database import AsyncSessionLocal
+from app.utils.rollups import rebuild_rollups
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild the hourly/daily reading rollups")
+    parser.add_argument("--metric-id", type=int, action="append", help="仅重建指定 metric，可重复传入")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        hourly, daily = await rebuild_rollups(session, args.metric_id)
+        await session.commit()
+    print(f"rollups rebuilt in {time.perf_counter() - started:.1f}s: sensor_readings_1h={hourly}, sensor_readings_1d={daily}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -23,6 +23,11 @@ from app.models import (
 from app.utils.mock_data import MOCK_STATIONS, MOCK_FLOOD_EVENTS, MOCK_RAIN_GRID_FRAMES, MOCK_3D_RESOURCES
 from app.utils.mock_data import MOCK_IOT_DEVICES
 from app.models.sensor import SimulatedDevice
+from app.utils.alerting import alert_evaluator
+from app.utils.latest_readings import upsert_latest_values
+from app.utils.partitions import ensure_partitions_for
+from app.utils.rollups import refresh_rollups
+from app.utils.cache import invalidate_cache
 
 
 async def seed_sensor_types(session):
@@ -106,16 +111,20 @@ async def seed_sensors(session, section_id: int):
             select(SensorReading.id).where(SensorReading.sensor_id == sensor.id, SensorReading.metric_id == metric.id)
         )
         if not has_reading:
-            session.add(
-                SensorReading(
-                    sensor_id=sensor.id,
-                    metric_id=metric.id,
-                    reading_time=datetime.utcnow(),
-                    value_num=s.get("waterLevel") or s.get("rainfall") or 0,
-                    unit=metric.unit,
-                    is_simulated=True,
-                )
+            reading = dict(
+                sensor_id=sensor.id,
+                metric_id=metric.id,
+                reading_time=datetime.utcnow(),
+                value_num=s.get("waterLevel") or s.get("rainfall") or 0,
+                unit=metric.unit,
+                is_simulated=True,
             )
+            await ensure_partitions_for(session, [reading])
+            session.add(SensorReading(**reading))
+            await session.flush()
+            await alert_evaluator.evaluate(session, [reading])
+            await upsert_latest_values(session, [reading])
+            await refresh_rollups(session, [reading])
 
 
 async def seed_products(session):
@@ -209,6 +218,7 @@ async def main():
         await seed_products(session)
         await seed_iot_devices(session)
         await session.commit()
+    invalidate_cache()
 
 
 if __name__ == "__main__":
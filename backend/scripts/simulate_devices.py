@@ -0,0 +1,85 @@
+"""
+IoT 设备模拟与实时写入压测：按 simulated_devices 的 freq_sec 周期生成读数，经 BatchedReadingWriter 写入。
+
+运行期间每 --report-every 秒输出一次：生成/写入速率、缓冲、提交延迟分位数与 ingest lag；结束时输出汇总。
+写入速率持续低于生成速率（缓冲增长、backpressure_ms 上升）说明已超出当前写入能力。
+
+用法：
+    # 种子数据中的在线设备，实时周期
+    PYTHONPATH=. python3 -m scripts.simulate_devices --duration 60
+    # 5000 台压测设备、每 10s 上报，60 倍速（约 5000*1.5*6 = 45k 读数/秒）
+    PYTHONPATH=. python3 -m scripts.simulate_devices --synthetic 5000 --freq 10 --time-scale 60 --duration 120
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+from app.database import AsyncSessionLocal
+from app.utils.device_simulator import DeviceSimulator, create_synthetic_devices, load_devices, provision_devices
+from app.utils.reading_writer import BatchedReadingWriter
+
+
+async def report(simulator: DeviceSimulator, writer: BatchedReadingWriter, every: float) -> None:
+    while True:
+        await asyncio.sleep(every)
+        sim, stats = simulator.stats(), writer.stats()
+        latency = stats["commit_latency_ms"]
+        print(
+            f"generated {sim['readings']:>9}  written {stats['rows_written']:>9}  "
+            f"{stats['rows_per_second']:>9.1f} rows/s  pending {stats['pending']:>6}  "
+            f"latency p50/p95/p99 {latency['p50']}/{latency['p95']}/{latency['p99']} ms  "
+            f"lag {stats['ingest_lag_seconds']}s  late_ticks {sim['late_ticks']}",
+            flush=True,
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Simulate IoT devices writing live readings")
+    parser.add_argument("--duration", type=float, default=60.0, help="运行秒数")
+    parser.add_argument("--synthetic", type=int, default=0, help="补足 N 台 sim_load_* 压测设备")
+    parser.add_argument("--synthetic-only", action="store_true", help="只运行压测设备")
+    parser.add_argument("--freq", type=int, default=10, help="压测设备上报周期（秒）")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="模拟时钟倍速")
+    parser.add_argument("--tick", type=float, default=0.1, help="时间轮 tick（秒）")
+    parser.add_argument("--batch", type=int, default=5000, help="每批最多写入读数")
+    parser.add_argument("--flush-interval", type=float, default=0.2, help="攒批最长等待（秒）")
+    parser.add_argument("--max-pending", type=int, default=100_000, help="写入缓冲上限（读数）")
+    parser.add_argument("--no-copy", action="store_true", help="用多行 INSERT 代替 COPY")
+    parser.add_argument("--report-every", type=float, default=5.0, help="进度输出间隔（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as session:
+        if args.synthetic:
+            await create_synthetic_devices(session, args.synthetic, args.freq)
+        devices = await load_devices(session, synthetic_only=args.synthetic_only)
+        if not devices:
+            print("No online simulated devices; run scripts.seed_data or pass --synthetic N")
+            return
+        started = time.perf_counter()
+        specs = await provision_devices(session, devices, seed=args.seed)
+        print(f"provisioned {len(specs)} devices in {time.perf_counter() - started:.1f}s")
+
+    writer = BatchedReadingWriter(
+        max_batch=args.batch,
+        flush_interval=args.flush_interval,
+        max_pending=args.max_pending,
+        use_copy=not args.no_copy,
+    ).start()
+    simulator = DeviceSimulator(writer, specs, tick=args.tick, time_scale=args.time_scale, seed=args.seed)
+    reporter = asyncio.create_task(report(simulator, writer, args.report_every))
+    try:
+        await simulator.run(args.duration)
+    finally:
+        reporter.cancel()
+        await writer.close()
+
+    print(json.dumps({"simulator": simulator.stats(), "writer": writer.stats()}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())